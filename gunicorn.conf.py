@@ -0,0 +1,80 @@
+"""
+Gunicorn configuration for serving wsgi:application in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Every setting can be overridden with the GUNICORN_* environment variables below.
+See Docs/Deployment.md for tuning notes and load-test results.
+"""
+import multiprocessing
+import os
+import shutil
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Dash callbacks spend most of their time waiting on MongoDB/Redis, so threads
+# give far more concurrency per worker than the default sync worker.
+# "gevent" is also supported if the gevent package is installed.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = _env_int("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+threads = _env_int("GUNICORN_THREADS", 4)
+worker_connections = _env_int("GUNICORN_WORKER_CONNECTIONS", 1000)  # gevent only
+
+timeout = _env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# Recycle workers periodically; the jitter keeps them from restarting together
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 2000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 200)
+
+# Import the app once in the master so workers fork with Dash's layout and
+# page registry already built; connections are re-created in post_fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+# Heartbeat files on tmpfs; a disk-backed /tmp can stall workers under Docker
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # Start every deployment with empty Prometheus multiprocess files
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if preload_app:
+        # The master does not serve requests; leave health probing to the workers
+        from modules.health import get_health_monitor
+        from modules.time_tracking import get_time_event_log
+        get_health_monitor().stop()
+        get_time_event_log().stop()
+
+
+def post_fork(server, worker):
+    # Clients inherited from the master share its sockets; give each worker its own
+    from modules.connections import reset_connections_after_fork
+    from modules.health import get_health_monitor
+    from modules.time_tracking import get_time_event_log
+
+    reset_connections_after_fork()
+    get_health_monitor().start()
+    get_time_event_log().start()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,560 @@
+import asyncio
+import os
+import threading
+import time
+
+import dotenv
+import pymongo
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from modules.change_feed import is_tracked, record_change
+from modules.connections import get_async_database, get_database
+from modules.custom_logger import create_logger
+from modules.customORM import (
+    DEFAULT_BATCH_SIZE,
+    BatchResult,
+    _batched,
+    _with_sort_key,
+    encode_resume_token,
+    keyset_query,
+    upsert_operations,
+)
+from modules.health import get_health_monitor
+from modules.indexes import check_query_plan, explain_mode
+from modules.orm_logging import get_operation_logger
+from modules.query_cache import get_query_cache
+from modules.rollups import apply_rollup_changes, has_rollups, rollup_fields, schedule_rebuild
+
+dotenv.load_dotenv()
+
+
+logger = create_logger()
+op_log = get_operation_logger()
+
+
+async def _invalidate(collection_name):
+    await asyncio.to_thread(get_query_cache().invalidate, collection_name)
+
+
+async def _record_change(collection_name, op, ids=()):
+    # The change log lives behind the sync client; keep it off the event loop
+    if is_tracked(collection_name):
+        await asyncio.to_thread(record_change, get_database(), collection_name, op, list(ids))
+
+
+async def _apply_rollups(collection_name, removed=(), added=()):
+    if has_rollups(collection_name):
+        await asyncio.to_thread(apply_rollup_changes, get_database(), collection_name, list(removed), list(added))
+
+
+async def _rebuild_rollups(collection_name):
+    if has_rollups(collection_name):
+        await asyncio.to_thread(schedule_rebuild, get_database(), collection_name)
+
+
+class AsyncCustomORM:
+    """
+    asyncio-native counterpart of CustomORM, built on pymongo's AsyncMongoClient.
+
+    Method names, arguments and return values mirror CustomORM, so code can move
+    between the two. Independent queries can be awaited concurrently with gather().
+    Attributes:
+        db (AsyncDatabase): The MongoDB database instance for the running event loop.
+    """
+
+    def __init__(self):
+        self.db = get_async_database()
+
+    def check_connection_health(self):
+        """
+        Check the health of the database connection using the shared health monitor.
+
+        Returns:
+            bool: True if the last ping was successful, False otherwise.
+        """
+        return get_health_monitor().is_healthy()
+
+    async def ping(self):
+        """
+        Ping the database directly.
+
+        Returns:
+            float: The round-trip time in milliseconds, or None if the ping failed.
+        """
+        started = time.perf_counter()
+        try:
+            await self.db.command("ping")
+            return (time.perf_counter() - started) * 1000
+        except Exception as e:
+            logger.error(f"Failed to connect to MongoDB: {e}")
+            return None
+
+    @staticmethod
+    async def gather(*awaitables, **named):
+        """
+        Run independent queries concurrently.
+
+        Args:
+            *awaitables: Awaitables whose results are returned as a list, in order.
+            **named: Awaitables whose results are returned as a dict under the same names.
+
+        Returns:
+            list | dict: The results.
+        """
+        if named:
+            results = await asyncio.gather(*named.values())
+            return dict(zip(named, results))
+        return list(await asyncio.gather(*awaitables))
+
+    async def _check_plan(self, collection_name, query, sort=None):
+        # No-op unless ORM_EXPLAIN is set (dev/test); see modules.indexes
+        if explain_mode():
+            await asyncio.to_thread(check_query_plan, get_database(), collection_name, query, sort)
+
+    async def query_collection(self, collection_name, projection=None, limit=0):
+        """
+        Query a collection in the database.
+
+        Args:
+            collection_name (str): The name of the collection to query.
+            projection (dict | list, optional): The fields to return.
+            limit (int, optional): The maximum number of documents to return (0 means no limit).
+
+        Returns:
+            list: The documents in the collection.
+        """
+        started = time.perf_counter()
+        documents = await self.db[collection_name].find({}, projection, limit=limit).to_list(None)
+        op_log.success("query_collection", collection_name, started, count=len(documents))
+        return documents
+
+    async def count_documents(self, collection_name, query=None, estimate=False):
+        """
+        Count the documents in a collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict, optional): The query the documents must match.
+            estimate (bool, optional): Use the collection metadata instead of scanning; only valid without a query.
+
+        Returns:
+            int: The number of matching documents, or None on failure.
+        """
+        started = time.perf_counter()
+        await self._check_plan(collection_name, query)
+        try:
+            if estimate and not query:
+                count = await self.db[collection_name].estimated_document_count()
+            else:
+                count = await self.db[collection_name].count_documents(query or {})
+            op_log.success("count_documents", collection_name, started, count=count)
+            return count
+        except Exception as e:
+            op_log.failure("count_documents", collection_name, started, e)
+            return None
+
+    async def find_page(self, collection_name, query=None, projection=None, sort_key="_id",
+                        direction=pymongo.DESCENDING, limit=50, resume_token=None):
+        """
+        Fetch one page of documents using keyset (cursor) pagination; see CustomORM.find_page.
+
+        Returns:
+            dict: {"documents": list, "next_token": str or None}, or None on failure.
+        """
+        started = time.perf_counter()
+        mongo_query = keyset_query(query, sort_key, direction, resume_token)
+
+        sort = [(sort_key, direction), ("_id", direction)]
+        await self._check_plan(collection_name, mongo_query, sort)
+        try:
+            cursor = self.db[collection_name].find(
+                mongo_query,
+                _with_sort_key(projection, sort_key),
+                sort=sort,
+                limit=limit + 1,
+            )
+            documents = await cursor.to_list(None)
+        except Exception as e:
+            op_log.failure("find_page", collection_name, started, e)
+            return None
+
+        next_token = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_token = encode_resume_token(last.get(sort_key), last["_id"])
+        op_log.success("find_page", collection_name, started, count=len(documents))
+        return {"documents": documents, "next_token": next_token}
+
+    async def find_one(self, collection_name, query):
+        """
+        Find a document in a collection.
+
+        Returns:
+            dict: The document if found, None otherwise.
+        """
+        started = time.perf_counter()
+        await self._check_plan(collection_name, query)
+        try:
+            document = await self.db[collection_name].find_one(query)
+            op_log.success("find_one", collection_name, started, count=int(document is not None))
+            return document
+        except Exception as e:
+            op_log.failure("find_one", collection_name, started, e)
+            return None
+
+    async def find_many(self, collection_name, query, projection=None, sort=None, limit=0):
+        """
+        Find multiple documents in a collection.
+
+        Returns:
+            list: The documents if found, None otherwise.
+        """
+        started = time.perf_counter()
+        await self._check_plan(collection_name, query, sort)
+        try:
+            cursor = self.db[collection_name].find(query, projection, sort=sort, limit=limit)
+            documents = await cursor.to_list(None)
+            op_log.success("find_many", collection_name, started, count=len(documents))
+            return documents
+        except Exception as e:
+            op_log.failure("find_many", collection_name, started, e)
+            return None
+
+    async def iter_batches(self, collection_name, query, projection=None, sort=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Iterate over the matching documents in batches without holding the whole result in memory.
+
+        Yields:
+            list: The next batch of documents.
+        """
+        started = time.perf_counter()
+        await self._check_plan(collection_name, query, sort)
+        count = 0
+        try:
+            cursor = self.db[collection_name].find(query, projection, sort=sort, batch_size=batch_size)
+            while batch := await cursor.to_list(batch_size):
+                count += len(batch)
+                yield batch
+        except Exception as e:
+            op_log.failure("iter_batches", collection_name, started, e)
+            raise
+        op_log.success("iter_batches", collection_name, started, count=count)
+
+    async def insert_one(self, collection_name, document):
+        """
+        Insert a document into a collection.
+
+        Returns:
+            bool: True if the document was inserted, False otherwise.
+        """
+        started = time.perf_counter()
+        try:
+            result = await self.db[collection_name].insert_one(document)
+            await _record_change(collection_name, "upsert", [result.inserted_id])
+            await _apply_rollups(collection_name, added=[document])
+            await _invalidate(collection_name)
+            op_log.success("insert_one", collection_name, started, count=1)
+            return True
+        except Exception as e:
+            op_log.failure("insert_one", collection_name, started, e)
+            return False
+
+    async def insert_many(self, collection_name, documents, batch_size=DEFAULT_BATCH_SIZE, ordered=True):
+        """
+        Insert documents into a collection in batches.
+
+        Returns:
+            list: One BatchResult per batch sent.
+        """
+        operations = (InsertOne(document) for document in documents)
+        return [result async for result in self.iter_bulk_write(collection_name, operations, batch_size, ordered)]
+
+    async def update_one(self, collection_name, query, update):
+        """
+        Update a document in a collection.
+
+        Returns:
+            bool: True if the document was updated, False otherwise.
+        """
+        started = time.perf_counter()
+        await self._check_plan(collection_name, query)
+        try:
+            collection = self.db[collection_name]
+            if is_tracked(collection_name) or has_rollups(collection_name):
+                # Resolve the _id first so the change log knows which row changed;
+                # rollups also need the values before and after the update
+                projection = rollup_fields(collection_name)
+                target = await collection.find_one(query, projection)
+                if target is not None:
+                    query = {"_id": target["_id"]}
+                result = await collection.update_one(query, update)
+                changed_id = target["_id"] if target is not None else result.upserted_id
+                if changed_id is not None and (result.modified_count or result.upserted_id is not None):
+                    await _record_change(collection_name, "upsert", [changed_id])
+                    if has_rollups(collection_name):
+                        updated = await collection.find_one({"_id": changed_id}, rollup_fields(collection_name))
+                        await _apply_rollups(
+                            collection_name, removed=[target] if target is not None else [],
+                            added=[updated] if updated else [],
+                        )
+            else:
+                await collection.update_one(query, update)
+            await _invalidate(collection_name)
+            op_log.success("update_one", collection_name, started)
+            return True
+        except Exception as e:
+            op_log.failure("update_one", collection_name, started, e)
+            return False
+
+    async def update_many(self, collection_name, query, update, upsert=False):
+        """
+        Update every document that matches a query.
+
+        Returns:
+            BatchResult: The matched/modified/upserted counts, with the error if the update failed.
+        """
+        started = time.perf_counter()
+        batch = BatchResult(batch=0, offset=0, size=1)
+        try:
+            result = await self.db[collection_name].update_many(query, update, upsert=upsert)
+            batch.matched = result.matched_count
+            batch.modified = result.modified_count
+            batch.upserted = int(result.upserted_id is not None)
+            if batch.modified or batch.upserted:
+                await _record_change(collection_name, "reset")
+                await _rebuild_rollups(collection_name)
+            await _invalidate(collection_name)
+            op_log.success("update_many", collection_name, started, count=batch.modified)
+        except Exception as e:
+            batch.errors.append({"index": 0, "code": getattr(e, "code", None), "message": str(e)})
+            op_log.failure("update_many", collection_name, started, e)
+        return batch
+
+    async def delete_one(self, collection_name, query):
+        """
+        Delete a document from a collection.
+
+        Returns:
+            bool: True if the document was deleted, False otherwise.
+        """
+        started = time.perf_counter()
+        await self._check_plan(collection_name, query)
+        try:
+            projection = rollup_fields(collection_name)
+            deleted = await self.db[collection_name].find_one_and_delete(query, projection)
+            if deleted is not None:
+                await _record_change(collection_name, "delete", [deleted["_id"]])
+                await _apply_rollups(collection_name, removed=[deleted])
+            await _invalidate(collection_name)
+            op_log.success("delete_one", collection_name, started)
+            return True
+        except Exception as e:
+            op_log.failure("delete_one", collection_name, started, e)
+            return False
+
+    async def delete_many(self, collection_name, query):
+        """
+        Delete multiple documents from a collection.
+
+        Returns:
+            bool: True if the documents were deleted, False otherwise.
+        """
+        started = time.perf_counter()
+        await self._check_plan(collection_name, query)
+        try:
+            collection = self.db[collection_name]
+            if has_rollups(collection_name):
+                documents = await collection.find(query, rollup_fields(collection_name)).to_list()
+                ids = [document["_id"] for document in documents]
+                if ids:
+                    await collection.delete_many({"_id": {"$in": ids}})
+                    await _record_change(collection_name, "delete", ids)
+                    await _apply_rollups(collection_name, removed=documents)
+            elif is_tracked(collection_name):
+                ids = await collection.distinct("_id", query)
+                if ids:
+                    await collection.delete_many({"_id": {"$in": ids}})
+                    await _record_change(collection_name, "delete", ids)
+            else:
+                await collection.delete_many(query)
+            await _invalidate(collection_name)
+            op_log.success("delete_many", collection_name, started)
+            return True
+        except Exception as e:
+            op_log.failure("delete_many", collection_name, started, e)
+            return False
+
+    async def drop_collection(self, collection_name):
+        """
+        Drop a collection from the database.
+
+        Returns:
+            bool: True if the collection was dropped, False otherwise.
+        """
+        started = time.perf_counter()
+        try:
+            await self.db[collection_name].drop()
+            await _record_change(collection_name, "reset")
+            await _rebuild_rollups(collection_name)
+            await _invalidate(collection_name)
+            op_log.success("drop_collection", collection_name, started)
+            return True
+        except Exception as e:
+            op_log.failure("drop_collection", collection_name, started, e)
+            return False
+
+    async def iter_bulk_write(self, collection_name, operations, batch_size=DEFAULT_BATCH_SIZE, ordered=True):
+        """
+        Send write operations to a collection in batches, yielding each batch's result as it completes.
+
+        Yields:
+            BatchResult: The result of each batch.
+        """
+        started = time.perf_counter()
+        collection = self.db[collection_name]
+        offset = 0
+        # Updates/deletes in bulk have no pre-images, so the rollups are rebuilt once at the end
+        rebuild = False
+        for number, batch in enumerate(_batched(operations, batch_size)):
+            result = BatchResult(batch=number, offset=offset, size=len(batch))
+            try:
+                details = (await collection.bulk_write(batch, ordered=ordered)).bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+                result.errors = [
+                    {"index": offset + error["index"], "code": error.get("code"), "message": error.get("errmsg")}
+                    for error in details.get("writeErrors", [])
+                ]
+            except Exception as e:
+                details = {}
+                result.errors = [{"index": offset, "code": getattr(e, "code", None), "message": str(e)}]
+            result.inserted = details.get("nInserted", 0)
+            result.matched = details.get("nMatched", 0)
+            result.modified = details.get("nModified", 0)
+            result.upserted = details.get("nUpserted", 0)
+            result.deleted = details.get("nRemoved", 0)
+
+            if result.inserted or result.modified or result.upserted or result.deleted:
+                await _invalidate(collection_name)
+                if all(isinstance(operation, InsertOne) for operation in batch):
+                    ids = [operation._doc["_id"] for operation in batch if "_id" in operation._doc]
+                    await _record_change(collection_name, "upsert", ids)
+                    failed = {error["index"] - offset for error in result.errors}
+                    last = min(failed) if ordered and failed else len(batch)
+                    await _apply_rollups(collection_name, added=[
+                        operation._doc for index, operation in enumerate(batch[:last]) if index not in failed
+                    ])
+                else:
+                    await _record_change(collection_name, "reset")
+                    rebuild = True
+
+            if result.ok:
+                op_log.success("bulk_write", collection_name, started, count=result.size, batch=number)
+            else:
+                op_log.failure(
+                    "bulk_write", collection_name, started, f"batch {number}: {len(result.errors)} failed operations"
+                )
+            yield result
+            started = time.perf_counter()
+            offset += len(batch)
+            if ordered and not result.ok:
+                break
+        if rebuild:
+            await _rebuild_rollups(collection_name)
+
+    async def bulk_write(self, collection_name, operations, batch_size=DEFAULT_BATCH_SIZE, ordered=True):
+        """
+        Send write operations to a collection in batches.
+
+        Returns:
+            list: One BatchResult per batch sent.
+        """
+        return [result async for result in self.iter_bulk_write(collection_name, operations, batch_size, ordered)]
+
+    async def upsert_many(self, collection_name, documents, key_fields, batch_size=DEFAULT_BATCH_SIZE, ordered=False):
+        """
+        Insert or update documents matched on a set of key fields.
+
+        Returns:
+            list: One BatchResult per batch sent.
+        """
+        operations = upsert_operations(documents, key_fields)
+        return [result async for result in self.iter_bulk_write(collection_name, operations, batch_size, ordered)]
+
+
+class _LoopThread:
+    # One event loop per process, running in a daemon thread, for sync callers
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-orm-loop", daemon=True)
+        self.thread.start()
+
+
+_loop_thread = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+def run_sync(coroutine, timeout=None):
+    """
+    Run a coroutine on the process's background event loop and wait for its result.
+
+    Lets sync code (Dash callbacks, Flask routes, gunicorn sync workers) use
+    AsyncCustomORM, e.g. to fan out independent queries with gather().
+
+    Args:
+        coroutine: The coroutine to run.
+        timeout (float, optional): Seconds to wait before raising TimeoutError.
+
+    Returns:
+        The coroutine's result.
+    """
+    global _loop_thread, _loop_pid
+    with _loop_lock:
+        if _loop_thread is None or _loop_pid != os.getpid():
+            _loop_thread = _LoopThread()
+            _loop_pid = os.getpid()
+    return asyncio.run_coroutine_threadsafe(coroutine, _loop_thread.loop).result(timeout)
+
+
+class SyncAsyncORM:
+    """
+    Thin blocking adapter over AsyncCustomORM with the same method names.
+
+    Every call runs on the shared background event loop, so several adapters
+    and threads share one AsyncMongoClient pool.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        method = getattr(AsyncCustomORM, name)
+        if not asyncio.iscoroutinefunction(method):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            async def run():
+                return await getattr(AsyncCustomORM(), name)(*args, **kwargs)
+            return run_sync(run(), self.timeout)
+        return call
+
+    def gather(self, **named):
+        """
+        Run named ORM calls concurrently, e.g.
+        gather(tasks=("find_many", "tasks", {"owner": user}), goals=("find_many", "goals", {"owner": user})).
+
+        Args:
+            **named: name -> (method name, *args) tuples.
+
+        Returns:
+            dict: The results under the same names.
+        """
+        async def run():
+            orm = AsyncCustomORM()
+            return await orm.gather(**{
+                key: getattr(orm, call[0])(*call[1:]) for key, call in named.items()
+            })
+        return run_sync(run(), self.timeout)
@@ -2,45 +2,188 @@
 from dash import callback_context, html
 import dash
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output, State, ALL
+from dash.dependencies import Input, Output, State
 from bson import ObjectId
-import json
-from datetime import datetime
+import os
+import uuid
+from datetime import datetime, timedelta
 
-from flask import session, redirect, url_for, request, g
+import plotly.graph_objects as go
+
+from flask import Response, session, redirect, stream_with_context, url_for, request, g
 
 from modules.custom_logger import create_logger
+from modules.change_feed import changes_since, current_sequence
+from modules.credentials import get_credential_store
 from modules.customORM import CustomORM
-def load_credentials():
-    try:
-        with open('credentials.json') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading credentials: {e}")
-        return {}
-
-raw_credentials = load_credentials()
+from modules.exports import (
+    DATASETS,
+    FORMATS as EXPORT_FORMATS,
+    export_chunks,
+    export_filename,
+    parquet_available,
+    parse_day,
+)
+from modules.goals import GoalManager
+from modules.health import get_health_monitor
+from modules.metrics import timed_callback
+from modules.mood_analytics import (
+    ROLLUP_COLLECTION,
+    distribution,
+    ensure_rollups,
+    period_start,
+    rolling_mean,
+    trend_points,
+)
+from modules.rate_limit import LOGIN_REQUEST_LIMIT, SlidingWindowLimiter, limiter, login_keys
+from modules.tasks import DONE, TaskManager
+from modules.time_tracking import TimeTracker
 
 logger = create_logger()
-USER_PWD = {user_info['username']: user_info['password'] for user_info in raw_credentials.values()}
-USER_GROUPS = {user_info['username']: user_info['group'] for user_info in raw_credentials.values()}
+
+MOOD_JOURNAL_COLUMNS = ["date", "mood", "notes"]
+MOOD_JOURNAL_PAGE_SIZE = int(os.getenv("MOOD_JOURNAL_PAGE_SIZE", 25))
+MOOD_ROLLING_WINDOW_DAYS = 7
+TASK_OPTION_LIMIT = 50
+
+
+def _goal_options(goals):
+    # Goals arrive in tree order; indent sub-goals so the hierarchy shows in the dropdown
+    return [
+        {"label": "\u2014 " * goal["depth"] + (goal.get("title") or "(untitled)"), "value": str(goal["_id"])}
+        for goal in goals
+    ]
+
+
+def _goal_row(goal):
+    progress = goal["progress"]
+    summary = f"{goal.get('done', 0)}/{goal.get('total', 0)} tasks done"
+    if goal.get("due_date"):
+        summary += f", due {goal['due_date']}"
+    return html.Div(
+        dbc.Row(
+            [
+                dbc.Col(html.Strong(goal.get("title") or "(untitled)"), md=4),
+                dbc.Col(
+                    dbc.Progress(
+                        value=progress or 0,
+                        label=f"{progress:.0f}%" if progress is not None else "",
+                        color="success" if progress == 100 else "primary"
+                    ),
+                    md=5
+                ),
+                dbc.Col(html.Small(summary, className="text-muted"), md=3)
+            ],
+            className="align-items-center"
+        ),
+        className="py-1 border-bottom",
+        style={"marginLeft": f"{goal['depth'] * 1.5}rem"}
+    )
+
+
+def _format_duration(seconds):
+    minutes = int(round(seconds / 60))
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+def _task_row(graph, task_id):
+    task = graph.tasks[task_id]
+    blockers = [graph.tasks[blocker].get("title") or "" for blocker in graph.blockers(task_id)]
+    waiting_on = ", ".join(blockers[:3]) + (f" +{len(blockers) - 3}" if len(blockers) > 3 else "")
+    return {
+        "id": str(task_id),
+        "title": task.get("title"),
+        "status": task.get("status"),
+        "priority": task.get("priority"),
+        "due_date": task.get("due_date"),
+        "waiting_on": waiting_on,
+    }
+
+def _mood_journal_record(doc):
+    # DataTable rows are plain records; "id" lets the table report selected_row_ids
+    record = {col: doc.get(col, 'N/A') for col in MOOD_JOURNAL_COLUMNS}
+    record["id"] = str(doc["_id"])
+    return record
+
+
+def _mood_journal_page_info(orm, page, row_count):
+    if not row_count:
+        return ""
+    total = orm.count_documents("mood_journal", estimate=True) or 0
+    first = page * MOOD_JOURNAL_PAGE_SIZE + 1
+    return f"Entries {first}-{first + row_count - 1} of {total}"
+
+
+def _patch_mood_journal(orm, page_state):
+    """
+    Bring the rendered page up to date using the change log instead of re-querying it.
+
+    Returns:
+        tuple: The callback outputs (a row-level Patch of the table data for updates/deletes
+        of visible rows), or None if the page must be re-rendered.
+    """
+    changes = changes_since(orm.db, "mood_journal", page_state.get("seq"))
+    if changes is None:
+        return None
+    if not changes["upserted"] and not changes["deleted"]:
+        raise dash.exceptions.PreventUpdate
+
+    row_ids = list(page_state["row_ids"])
+    upserted = [str(doc_id) for doc_id in changes["upserted"]]
+    deleted = {str(doc_id) for doc_id in changes["deleted"]}
+    # New rows may belong anywhere in the sort order, so let the caller re-render the page
+    if any(doc_id not in row_ids for doc_id in upserted):
+        return None
+
+    patch = dash.Patch()
+    if upserted:
+        fresh = orm.find_many(
+            "mood_journal",
+            {"_id": {"$in": [ObjectId(doc_id) for doc_id in upserted]}},
+            projection=MOOD_JOURNAL_COLUMNS,
+        ) or []
+        for doc in fresh:
+            patch[row_ids.index(str(doc["_id"]))] = _mood_journal_record(doc)
+    # Delete from the bottom up so earlier indexes stay valid
+    visible_deletes = sorted((i for i, doc_id in enumerate(row_ids) if doc_id in deleted), reverse=True)
+    for index in visible_deletes:
+        del patch[index]
+        del row_ids[index]
+    if not row_ids:
+        return None
+
+    page_state = {**page_state, "seq": changes["seq"], "row_ids": row_ids}
+    page_info = _mood_journal_page_info(orm, page_state["page"], len(row_ids))
+    if not upserted and not visible_deletes:
+        return dash.no_update, dash.no_update, page_state, page_info, dash.no_update, dash.no_update
+    # Row indexes shift on delete, so a selection would point at the wrong rows
+    selected = [] if visible_deletes else dash.no_update
+    return patch, selected, page_state, page_info, dash.no_update, dash.no_update
+
 
 def register_callbacks(app, server, redis_client):
+    def callback(*args, **kwargs):
+        # app.callback that also records the callback's latency (see modules.metrics)
+        return lambda function: app.callback(*args, **kwargs)(timed_callback(function))
+
     # Callback to update the database connection alert
-    @app.callback(
+    @callback(
         Output('db-alert', 'is_open'),
         Output('db-alert', 'children'),
         Output('db-alert', 'color'),
         Input('interval-component', 'n_intervals')
     )
     def update_alert(_):
-        if CustomORM().check_connection_health():
-            return False, "Connected to the database.", "success"
+        status = get_health_monitor().status()
+        if status.healthy:
+            return False, f"Connected to the database ({status.latency_ms:.0f} ms).", "success"
+        elif status.healthy is None:
+            return True, "Checking the database connection...", "secondary"
         else:
             return True, "Failed to connect to the database.", "danger"
 
     # Callback to handle modal visibility and form reset
-    @app.callback(
+    @callback(
         Output('add-entry-modal', 'is_open'),
         Output('date-input', 'value'),
         Output('mood-slider', 'value'),
@@ -72,101 +215,428 @@ def register_callbacks(app, server, redis_client):
         raise dash.exceptions.PreventUpdate
 
     # Callback to refresh the mood journal table
-    @app.callback(
-        Output('mood_journal', 'children'),
+    @callback(
+        Output('mood-journal-table', 'data'),
+        Output('mood-journal-table', 'selected_rows'),
+        Output('mood-journal-page', 'data'),
+        Output('mood-journal-page-info', 'children'),
+        Output('mood-journal-prev-button', 'disabled'),
+        Output('mood-journal-next-button', 'disabled'),
         [
             Input('mongo-data-table-interval', 'n_intervals'),
             Input('submit-entry-button', 'n_clicks'),
             Input('refresh-button', 'n_clicks'),
-            Input({'type': 'delete-button', 'index': ALL}, 'n_clicks')
+            Input('mood-journal-prev-button', 'n_clicks'),
+            Input('mood-journal-next-button', 'n_clicks'),
+            Input('mood-journal-delete-button', 'n_clicks')
         ],
         [
             State('date-input', 'value'),
             State('mood-slider', 'value'),
-            State('notes-input', 'value')
+            State('notes-input', 'value'),
+            State('mood-journal-page', 'data'),
+            State('mood-journal-table', 'selected_row_ids')
         ],
         prevent_initial_call=True
     )
-    def refresh_mood_journal(_n_intervals, submit_clicks, refresh_clicks, delete_clicks, date_val, mood_val, notes_val):
-        # Guard: if DB is offline, just return an empty list
-        if not CustomORM().check_connection_health():
-            return []
+    def refresh_mood_journal(_n_intervals, submit_clicks, refresh_clicks, prev_clicks, next_clicks,
+                             delete_clicks, date_val, mood_val, notes_val, page_state, selected_ids):
+        orm = CustomORM()
+        # Guard: if DB is offline, just return an empty table
+        if not orm.connection_health:
+            return [], [], dash.no_update, "", True, True
 
         ctx = callback_context
         if not ctx.triggered:
             raise dash.exceptions.PreventUpdate
 
-        triggered_prop_id = ctx.triggered[0]['prop_id']
-        triggered = {}
-
-        if 'submit-entry-button' in triggered_prop_id:
-            triggered = {'type': 'submit-entry-button', 'index': ''}
-        elif triggered_prop_id.startswith("{"):
-            try:
-                # Correctly parse the JSON part before the dot
-                triggered = json.loads(triggered_prop_id.split('.')[0])
-            except json.JSONDecodeError:
-                triggered = {'type': '', 'index': ''}
-        else:
-            triggered = {'type': triggered_prop_id, 'index': ''}
+        triggered = ctx.triggered[0]['prop_id'].split('.')[0]
+
+        # page_state["tokens"][i] is the resume token of page i; page 0 starts at the newest entry.
+        # page_state["seq"] is the change-log watermark the visible rows were rendered at.
+        page_state = page_state or {"tokens": [None], "page": 0, "next": None, "seq": None, "row_ids": []}
+        tokens, page = page_state["tokens"], page_state["page"]
 
-        if triggered.get('type') == 'submit-entry-button' and date_val and mood_val:
-            CustomORM().db["mood_journal"].insert_one({
+        if triggered == 'mongo-data-table-interval' and page_state.get("row_ids") is not None:
+            patch = _patch_mood_journal(orm, page_state)
+            if patch is not None:
+                return patch
+
+        if triggered == 'submit-entry-button' and date_val and mood_val:
+            orm.insert_one("mood_journal", {
                 "date": date_val,
                 "mood": mood_val,
                 "notes": notes_val or ""
             })
             logger.info("Added new mood journal entry.")
 
-        elif triggered.get('type') == 'delete-button':
-            delete_id = triggered.get('index')
-            if isinstance(delete_id, str) and ObjectId.is_valid(delete_id):
-                CustomORM().db["mood_journal"].delete_one({"_id": ObjectId(delete_id)})
-                logger.info(f"Deleted entry with ObjectId: {delete_id}")
+        elif triggered == 'mood-journal-delete-button':
+            delete_ids = [ObjectId(doc_id) for doc_id in selected_ids or [] if ObjectId.is_valid(doc_id)]
+            if not delete_ids:
+                raise dash.exceptions.PreventUpdate
+            # One round trip for the whole selection
+            orm.delete_many("mood_journal", {"_id": {"$in": delete_ids}})
+            logger.info(f"Deleted {len(delete_ids)} mood journal entries.")
+
+        elif triggered == 'mood-journal-next-button' and page_state.get("next"):
+            tokens = tokens[:page + 1] + [page_state["next"]]
+            page += 1
+
+        elif triggered == 'mood-journal-prev-button':
+            page = max(page - 1, 0)
+
+        # Read the watermark before the page so a concurrent write is picked up on the next tick
+        seq = current_sequence(orm.db, "mood_journal")
+        # For refresh-button or mongo-data-table-interval, just re-query the current page
+        result = orm.find_page(
+            "mood_journal",
+            projection=MOOD_JOURNAL_COLUMNS,
+            sort_key="date",
+            limit=MOOD_JOURNAL_PAGE_SIZE,
+            resume_token=tokens[page],
+        )
+        if result is None:
+            return [], [], dash.no_update, "", True, True
+        records = [_mood_journal_record(doc) for doc in result["documents"]]
+
+        page_state = {
+            "tokens": tokens,
+            "page": page,
+            "next": result["next_token"],
+            "seq": seq,
+            "row_ids": [record["id"] for record in records],
+        }
+        page_info = _mood_journal_page_info(orm, page, len(records))
+        prev_disabled = page == 0
+        next_disabled = result["next_token"] is None
+        return records, [], page_state, page_info, prev_disabled, next_disabled
+
+    # Only offer deletion while rows are selected
+    @callback(
+        Output('mood-journal-delete-button', 'disabled'),
+        Input('mood-journal-table', 'selected_rows')
+    )
+    def toggle_mood_journal_delete(selected_rows):
+        return not selected_rows
+
+    # Mood trends are drawn from the rollups, so the cost depends on the date range, not the journal size
+    @callback(
+        Output('mood-analytics-trend', 'figure'),
+        Output('mood-analytics-distribution', 'figure'),
+        Input('mood-analytics-period', 'value'),
+        Input('mood-analytics-range', 'value'),
+        Input('mood-analytics-refresh', 'n_clicks')
+    )
+    def update_mood_analytics(period, date_range, _refresh_clicks):
+        orm = CustomORM()
+        if not orm.connection_health or not ensure_rollups(orm.db):
+            return go.Figure(), go.Figure()
+
+        since = None
+        if date_range and date_range != "all":
+            since = (datetime.now() - timedelta(days=int(date_range))).strftime("%Y-%m-%d")
+
+        def rollups(period_name, start=None):
+            query = {"period": period_name}
+            if start:
+                query["start"] = {"$gte": start}
+            return orm.find_many(ROLLUP_COLLECTION, query, sort=[("start", 1)]) or []
+
+        # The rolling mean needs the days just before the range to be full from its first point
+        warmup = None
+        if since:
+            warmup = (datetime.strptime(since, "%Y-%m-%d")
+                      - timedelta(days=MOOD_ROLLING_WINDOW_DAYS - 1)).strftime("%Y-%m-%d")
+        daily = rollups("day", warmup)
+        in_range = [rollup for rollup in daily if not since or rollup["start"] >= since]
+        if period == "day":
+            points = trend_points(in_range)
+        else:
+            # Include the period the range starts in, e.g. the whole first month
+            first = period_start(datetime.strptime(since, "%Y-%m-%d").date(), period) if since else None
+            points = trend_points(rollups(period, first))
+        rolling = [point for point in rolling_mean(daily, MOOD_ROLLING_WINDOW_DAYS)
+                   if not since or point["start"] >= since]
+
+        trend = go.Figure()
+        trend.add_trace(go.Bar(
+            x=[point["start"] for point in points],
+            y=[point["average"] for point in points],
+            customdata=[point["count"] for point in points],
+            hovertemplate="%{x}: %{y:.2f} (%{customdata} entries)<extra></extra>",
+            name=f"{period.capitalize()} average" if period else "Average",
+        ))
+        trend.add_trace(go.Scatter(
+            x=[point["start"] for point in rolling],
+            y=[point["average"] for point in rolling],
+            mode="lines",
+            name=f"{MOOD_ROLLING_WINDOW_DAYS}-day rolling mean",
+        ))
+        trend.update_layout(yaxis={"range": [0, 10.5], "title": "Mood"}, xaxis={"type": "date"},
+                            margin={"t": 30}, legend={"orientation": "h"})
+
+        if since:
+            counts = [sum(values) for values in zip(*(distribution(rollup) for rollup in in_range))] or [0] * 10
+        else:
+            counts = distribution(orm.find_one(ROLLUP_COLLECTION, {"_id": "all"}))
+        spread = go.Figure(go.Bar(x=list(range(1, 11)), y=counts, name="Entries"))
+        spread.update_layout(xaxis={"title": "Mood", "dtick": 1}, yaxis={"title": "Entries"}, margin={"t": 30})
+        return trend, spread
+
+    # Callback for the tasks page: writes, then the ready list and the current page of the dependency order
+    @callback(
+        Output('tasks-ready-table', 'data'),
+        Output('tasks-table', 'data'),
+        Output('tasks-table', 'page_count'),
+        Output('tasks-table', 'selected_rows'),
+        Output('tasks-alert', 'children'),
+        Output('tasks-alert', 'is_open'),
+        Output('tasks-alert', 'color'),
+        Output('task-title-input', 'value'),
+        Output('task-depends-input', 'value'),
+        Input('task-add-button', 'n_clicks'),
+        Input('task-start-button', 'n_clicks'),
+        Input('task-done-button', 'n_clicks'),
+        Input('task-reopen-button', 'n_clicks'),
+        Input('task-delete-button', 'n_clicks'),
+        Input('tasks-table', 'page_current'),
+        Input('tasks-interval', 'n_intervals'),
+        State('task-title-input', 'value'),
+        State('task-priority-input', 'value'),
+        State('task-due-input', 'value'),
+        State('task-depends-input', 'value'),
+        State('task-goal-input', 'value'),
+        State('tasks-table', 'selected_row_ids'),
+        State('tasks-table', 'page_size')
+    )
+    def update_tasks(_add, _start, _done, _reopen, _delete, page_current, _n_intervals,
+                     title, priority, due_date, depends_on, goal, selected_ids, page_size):
+        orm = CustomORM()
+        if not orm.connection_health:
+            return [], [], 1, [], "Failed to connect to the database.", True, "danger", dash.no_update, dash.no_update
+        tasks = TaskManager(g.username, orm)
+
+        triggered = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else ""
+        message, color = "", "success"
+        title_value, depends_value = dash.no_update, dash.no_update
+        selected = [task_id for task_id in selected_ids or [] if ObjectId.is_valid(task_id)]
+
+        if triggered == 'task-add-button':
+            if not title or not title.strip():
+                message, color = "Enter a title for the task.", "warning"
+            elif tasks.create_task(title.strip(), priority or 3, due_date, depends_on or [],
+                                   goal=goal if ObjectId.is_valid(goal or "") else None) is None:
+                message, color = "Could not create the task.", "danger"
             else:
-                logger.error(f"Invalid ObjectId: {delete_id}")
-
-        # For refresh-button or mongo-data-table-interval, just re-query
-        mood_journal = CustomORM().query_collection("mood_journal")
-        if mood_journal:
-            for doc in mood_journal:
-                if "_id" in doc and isinstance(doc["_id"], ObjectId):
-                    doc["_id"] = str(doc["_id"])
-
-            # Exclude the _id column
-            columns = [col for col in mood_journal[0].keys() if col != "_id"]
-
-            return [
-                dbc.Table(
-                    children=[
-                        html.Thead(
-                            html.Tr([html.Th(col) for col in columns] + [html.Th("Actions")])
-                        ),
-                        html.Tbody([
-                            html.Tr(
-                                [html.Td(row.get(col, 'N/A')) for col in columns]
-                                + [
-                                    html.Td(
-                                        dbc.Button(
-                                            "Delete",
-                                            id={"type": "delete-button", "index": row["_id"]},
-                                            color="danger",
-                                            size="sm"
-                                        )
-                                    )
-                                ]
-                            ) for row in mood_journal
-                        ])
-                    ],
-                    bordered=True,
-                    hover=True,
-                    responsive=True,
-                    striped=True
-                )
-            ]
-        return []
-
-    @app.callback(
+                message = f"Added '{title.strip()}'."
+                title_value, depends_value = "", []
+        elif triggered in ('task-start-button', 'task-done-button', 'task-reopen-button') and selected:
+            status = {'task-start-button': "in_progress", 'task-done-button': DONE,
+                      'task-reopen-button': "todo"}[triggered]
+            failed = [task_id for task_id in selected if not tasks.set_status(task_id, status)]
+            message = f"Updated {len(selected) - len(failed)} tasks."
+            color = "danger" if failed else "success"
+        elif triggered == 'task-delete-button' and selected:
+            failed = [task_id for task_id in selected if not tasks.delete_task(task_id)]
+            message = f"Deleted {len(selected) - len(failed)} tasks."
+            color = "danger" if failed else "success"
+
+        graph = tasks.graph()
+        if graph is None:
+            return [], [], 1, [], "Could not load the tasks.", True, "danger", title_value, depends_value
+        ready = [
+            {"id": str(task["_id"]), "title": task.get("title"), "priority": task.get("priority"),
+             "due_date": task.get("due_date"), "status": task.get("status")}
+            for task in tasks.ready_tasks()
+        ]
+        order = graph.topological_order()
+        page_size = page_size or 50
+        page_count = max((len(order) + page_size - 1) // page_size, 1)
+        page = min(page_current or 0, page_count - 1)
+        rows = [_task_row(graph, task_id) for task_id in order[page * page_size:(page + 1) * page_size]]
+        selected_rows = [] if triggered != 'tasks-interval' else dash.no_update
+        return ready, rows, page_count, selected_rows, message, bool(message), color, title_value, depends_value
+
+    @callback(
+        Output('task-depends-input', 'options'),
+        Input('task-depends-input', 'search_value'),
+        State('task-depends-input', 'value')
+    )
+    def task_dependency_options(search, selected):
+        graph = TaskManager(g.username).graph()
+        if graph is None:
+            raise dash.exceptions.PreventUpdate
+        selected = [ObjectId(task_id) for task_id in selected or [] if ObjectId.is_valid(task_id)]
+        search = (search or "").lower()
+        matches = [
+            task_id for task_id, task in graph.tasks.items()
+            if task.get("status") != DONE and search in (task.get("title") or "").lower()
+        ][:TASK_OPTION_LIMIT]
+        # Keep the chosen tasks listed so their labels still show
+        return [
+            {"label": graph.tasks[task_id].get("title") or "(untitled)", "value": str(task_id)}
+            for task_id in dict.fromkeys(selected + matches) if task_id in graph
+        ]
+
+    @callback(
+        Output('task-goal-input', 'options'),
+        Input('tasks-interval', 'n_intervals')
+    )
+    def task_goal_options(_n_intervals):
+        goals = GoalManager(g.username).dashboard()
+        if goals is None:
+            raise dash.exceptions.PreventUpdate
+        return _goal_options(goals)
+
+    @callback(
+        Output('time-task-input', 'options'),
+        Input('time-task-input', 'search_value'),
+        State('time-task-input', 'value')
+    )
+    def time_task_options(search, selected):
+        graph = TaskManager(g.username).graph()
+        if graph is None:
+            raise dash.exceptions.PreventUpdate
+        search = (search or "").lower()
+        matches = [
+            task_id for task_id, task in graph.tasks.items()
+            if task.get("status") != DONE and search in (task.get("title") or "").lower()
+        ][:TASK_OPTION_LIMIT]
+        if ObjectId.is_valid(selected or "") and ObjectId(selected) in graph:
+            matches = [ObjectId(selected)] + [task_id for task_id in matches if task_id != ObjectId(selected)]
+        return [
+            {"label": graph.tasks[task_id].get("title") or "(untitled)", "value": str(task_id)}
+            for task_id in matches
+        ]
+
+    # Callback for the time page: timer transitions, then the week's timesheet from the daily aggregates
+    @callback(
+        Output('time-timer-status', 'children'),
+        Output('time-week-total', 'children'),
+        Output('time-timesheet-table', 'columns'),
+        Output('time-timesheet-table', 'data'),
+        Output('time-alert', 'children'),
+        Output('time-alert', 'is_open'),
+        Output('time-alert', 'color'),
+        Input('time-start-button', 'n_clicks'),
+        Input('time-pause-button', 'n_clicks'),
+        Input('time-stop-button', 'n_clicks'),
+        Input('time-week-input', 'value'),
+        Input('time-interval', 'n_intervals'),
+        State('time-task-input', 'value')
+    )
+    def update_time_tracking(_start, _pause, _stop, week_of, _n_intervals, task_id):
+        orm = CustomORM()
+        if not orm.connection_health:
+            return "", "", [], [], "Failed to connect to the database.", True, "danger"
+        tracker = TimeTracker(g.username, orm)
+
+        triggered = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else ""
+        message, color = "", "success"
+        if triggered == 'time-start-button':
+            if not ObjectId.is_valid(task_id or ""):
+                message, color = "Choose a task first.", "warning"
+            elif not tracker.start(task_id):
+                message, color = "Could not start the timer.", "danger"
+        elif triggered == 'time-pause-button' and not tracker.pause():
+            message, color = "No timer is running.", "warning"
+        elif triggered == 'time-stop-button' and not tracker.stop():
+            message, color = "No timer to stop.", "warning"
+
+        try:
+            day = datetime.strptime(week_of, "%Y-%m-%d").date() if week_of else None
+        except ValueError:
+            day = None
+        week = tracker.week(day)
+        if week is None:
+            return "", "", [], [], "Could not load the timesheet.", True, "danger"
+        graph = TaskManager(g.username, orm).graph()
+        titles = graph.tasks if graph is not None else {}
+
+        timer = tracker.timer()
+        if timer is None:
+            status = "No timer running."
+        else:
+            title = titles.get(timer["task"], {}).get("title") or "(deleted task)"
+            state = "Running" if timer["state"] == "running" else "Paused"
+            status = f"{state}: {title} since {timer['since']:%H:%M} UTC"
+
+        days = week["days"]
+        columns = [{"name": "Task", "id": "task"}] + [
+            {"name": datetime.strptime(day, "%Y-%m-%d").strftime("%a %d"), "id": day} for day in days
+        ] + [{"name": "Total", "id": "total"}]
+        per_task = {}
+        for (task, day), seconds in week["totals"].items():
+            per_task.setdefault(task, {})[day] = seconds
+        rows = []
+        for task, seconds_by_day in sorted(per_task.items(), key=lambda item: -sum(item[1].values())):
+            row = {"task": titles.get(task, {}).get("title") or "(deleted task)"}
+            row.update({day: _format_duration(seconds_by_day[day]) for day in days if seconds_by_day.get(day)})
+            row["total"] = _format_duration(sum(seconds_by_day.values()))
+            rows.append(row)
+        week_total = _format_duration(sum(week["totals"].values()))
+        return status, week_total, columns, rows, message, bool(message), color
+
+    # Callback for the goals page: writes, then the whole tree from one read of the denormalized goals
+    @callback(
+        Output('goals-tree', 'children'),
+        Output('goal-parent-input', 'options'),
+        Output('goal-selected-input', 'options'),
+        Output('goal-move-parent-input', 'options'),
+        Output('goals-alert', 'children'),
+        Output('goals-alert', 'is_open'),
+        Output('goals-alert', 'color'),
+        Output('goal-title-input', 'value'),
+        Output('goal-selected-input', 'value'),
+        Input('goal-add-button', 'n_clicks'),
+        Input('goal-move-button', 'n_clicks'),
+        Input('goal-delete-button', 'n_clicks'),
+        Input('goals-interval', 'n_intervals'),
+        State('goal-title-input', 'value'),
+        State('goal-parent-input', 'value'),
+        State('goal-due-input', 'value'),
+        State('goal-selected-input', 'value'),
+        State('goal-move-parent-input', 'value')
+    )
+    def update_goals(_add, _move, _delete, _n_intervals, title, parent, due_date, selected, move_parent):
+        orm = CustomORM()
+        if not orm.connection_health:
+            return [], [], [], [], "Failed to connect to the database.", True, "danger", dash.no_update, dash.no_update
+        goals = GoalManager(g.username, orm)
+
+        triggered = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else ""
+        message, color = "", "success"
+        title_value, selected_value = dash.no_update, dash.no_update
+        parent = parent if ObjectId.is_valid(parent or "") else None
+        move_parent = move_parent if ObjectId.is_valid(move_parent or "") else None
+        selected = selected if ObjectId.is_valid(selected or "") else None
+
+        if triggered == 'goal-add-button':
+            if not title or not title.strip():
+                message, color = "Enter a title for the goal.", "warning"
+            elif goals.create_goal(title.strip(), parent, due_date) is None:
+                message, color = "Could not create the goal.", "danger"
+            else:
+                message, title_value = f"Added '{title.strip()}'.", ""
+        elif triggered == 'goal-move-button' and selected:
+            if goals.move_goal(selected, move_parent):
+                message = "Moved the goal."
+            else:
+                message, color = "A goal cannot be moved under itself or its sub-goals.", "danger"
+        elif triggered == 'goal-delete-button' and selected:
+            if goals.delete_goal(selected):
+                message, selected_value = "Deleted the goal and its sub-goals.", None
+            else:
+                message, color = "Could not delete the goal.", "danger"
+
+        tree = goals.dashboard()
+        if tree is None:
+            return [], [], [], [], "Could not load the goals.", True, "danger", title_value, selected_value
+        options = _goal_options(tree)
+        rows = [_goal_row(goal) for goal in tree] or [html.P("No goals yet.", className="text-muted")]
+        return rows, options, options, options, message, bool(message), color, title_value, selected_value
+
+    @callback(
     [Output('url', 'pathname'), Output('url', 'refresh')],
     [Input('logout-link', 'n_clicks')]
     )
@@ -182,45 +652,60 @@ def register_callbacks(app, server, redis_client):
 
     @server.before_request
     def before_request():
-        session.permanent = True
+        # Correlates every log record of this request, including ORM operations
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
 
         if 'username' in session:
-            session['group'] = USER_GROUPS.get(session['username'])
+            # The store reloads credentials.json within CREDENTIALS_RELOAD_S; only a changed group
+            # marks the session modified, so unchanged sessions are not re-saved on every callback
+            group = get_credential_store().group(session['username'])
+            if session.get('group') != group:
+                session['group'] = group
             g.username = session['username']
-            g.group = session['group']
+            g.group = group
         else:
             g.username = None
             g.group = None
-        if request.endpoint not in ('login', 'static', 'logout') and 'username' not in session:
+        if request.endpoint not in ('login', 'static', 'logout', 'metrics') and 'username' not in session:
             return redirect(url_for('login'))
 
+    @server.after_request
+    def add_request_id(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        return response
+
+    login_limiter = SlidingWindowLimiter(redis_client)
+
     @server.route('/login', methods=['GET', 'POST'])
+    @limiter.limit(LOGIN_REQUEST_LIMIT, methods=['POST'])
     def login():
         if request.method == 'POST':
             username = request.form['username']
             password = request.form['password']
             ip = request.remote_addr
 
-            # Check if user is locked out
-            attempts_key = f"login_attempts:{ip}"
-            attempts = redis_client.get(attempts_key)
-            attempts = int(attempts) if attempts else 0
-
-            if attempts >= 10:
-                return "Too many failed login attempts. Please contact the administrator", 429
+            # Every attempt is counted per IP and per username in one atomic step, before the password is checked
+            attempt_keys = login_keys(ip, username)
+            checked = login_limiter.hit(attempt_keys)
+            if checked is None:
+                return "Login is temporarily unavailable", 503
+            allowed, retry_after = checked
+            if not allowed:
+                logger.warning(f"Login attempts for '{username}' from {ip} rate limited.")
+                return "Too many failed login attempts. Please try again later", 429, {
+                    'Retry-After': str(max(1, round(retry_after)))
+                }
 
-            if username in USER_PWD and USER_PWD[username] == password:
+            # Hashed with scrypt on the verification pool; hot-reloaded from credentials.json
+            if get_credential_store().verify(username, password):
                 # Successful login; reset attempts
-                redis_client.delete(attempts_key)
+                login_limiter.reset(attempt_keys)
+                session.permanent = True
                 session['username'] = username
-                session['group'] = USER_GROUPS.get(username)
+                session['group'] = get_credential_store().group(username)
                 logger.info(f"User '{username}' logged in successfully.")
                 return redirect(url_for('index'))
             else:
-                new_attempts = redis_client.incr(attempts_key)
-                if new_attempts == 1:
-                    # First failed attempt; set 1-hour expiry
-                    redis_client.expire(attempts_key, 3600)
                 logger.warning("Invalid credentials.")
                 return "Invalid credentials", 401
 
@@ -246,6 +731,29 @@ def register_callbacks(app, server, redis_client):
             logger.error(f"Error during logout: {e}")
             return "Error during logout", 500
 
+    @server.route('/export/<dataset>')
+    def export(dataset):
+        """
+        Stream the mood journal or the user's tasks as ?format=csv|ndjson|parquet,
+        optionally limited to ?start=YYYY-MM-DD and ?end=YYYY-MM-DD (inclusive).
+        """
+        fmt = request.args.get('format', 'csv')
+        if dataset not in DATASETS or fmt not in EXPORT_FORMATS:
+            return "Unknown dataset or format", 404
+        try:
+            start, end = parse_day(request.args.get('start')), parse_day(request.args.get('end'))
+        except ValueError:
+            return "start and end must be YYYY-MM-DD dates", 400
+        if fmt == 'parquet' and not parquet_available():
+            return "Parquet exports are not available on this server", 501
+        logger.info(f"Exporting {dataset} as {fmt} for '{g.username}'.")
+        # No Content-Length, so the response is sent chunk by chunk as the cursor is read
+        return Response(
+            stream_with_context(export_chunks(dataset, fmt, g.username, start, end)),
+            mimetype=EXPORT_FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename="{export_filename(dataset, fmt, start, end)}"'},
+        )
+
     @server.route('/')
     def index():
         """
@@ -256,12 +764,6 @@ def register_callbacks(app, server, redis_client):
         else:
             return redirect('/pages/index')
 
-    def clear_rate_limit(user_ip):
-        keys = redis_client.keys(f"LIMITER/{user_ip}/*")
-        for key in keys:
-            redis_client.delete(key)
-        logger.info(f"Rate limits for {user_ip} cleared.")
-
     # Protect Dash Routes with Client-Side Callback
     app.clientside_callback(
         """
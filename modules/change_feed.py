@@ -0,0 +1,137 @@
+import datetime
+import os
+
+import dotenv
+import pymongo
+
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+# Collections whose writes through CustomORM are recorded in the change log
+TRACKED_COLLECTIONS = {"mood_journal", "tasks"}
+
+COUNTERS_COLLECTION = "change_counters"
+LOG_COLLECTION = "change_log"
+LOG_RETENTION_SECONDS = int(os.getenv("CHANGE_LOG_RETENTION_S", 24 * 3600))
+
+_indexed_databases = set()
+
+
+def is_tracked(collection_name):
+    """
+    Returns:
+        bool: True if writes to the collection are recorded in the change log.
+    """
+    return collection_name in TRACKED_COLLECTIONS
+
+
+def ensure_change_log_indexes(db):
+    """
+    Create the change log indexes once per process and database.
+
+    Args:
+        db (Database): The MongoDB database instance.
+    """
+    if db.name in _indexed_databases:
+        return
+    db[LOG_COLLECTION].create_index([("collection", pymongo.ASCENDING), ("seq", pymongo.ASCENDING)], unique=True)
+    db[LOG_COLLECTION].create_index("at", expireAfterSeconds=LOG_RETENTION_SECONDS)
+    _indexed_databases.add(db.name)
+
+
+def current_sequence(db, collection_name):
+    """
+    Read the change sequence (watermark) of a collection.
+
+    This is a single _id lookup, so polling clients can cheaply tell whether
+    anything changed since their last sync.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        collection_name (str): The name of the collection.
+
+    Returns:
+        int: The sequence number of the last recorded change, 0 if none.
+    """
+    counter = db[COUNTERS_COLLECTION].find_one({"_id": collection_name}, {"seq": 1})
+    return counter["seq"] if counter else 0
+
+
+def record_change(db, collection_name, op, ids=()):
+    """
+    Record a write in the change log and advance the collection's sequence.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        collection_name (str): The name of the collection that was written.
+        op (str): "upsert", "delete" or "reset" (the whole collection changed).
+        ids (iterable): The _ids of the affected documents.
+
+    Returns:
+        int: The new sequence number, or None if recording failed.
+    """
+    try:
+        ensure_change_log_indexes(db)
+        counter = db[COUNTERS_COLLECTION].find_one_and_update(
+            {"_id": collection_name},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=pymongo.ReturnDocument.AFTER,
+        )
+        seq = counter["seq"]
+        db[LOG_COLLECTION].insert_one({
+            "collection": collection_name,
+            "seq": seq,
+            "op": op,
+            "ids": list(ids),
+            "at": datetime.datetime.now(datetime.timezone.utc),
+        })
+        return seq
+    except Exception as e:
+        logger.error(f"Failed to record change for collection '{collection_name}': {e}")
+        return None
+
+
+def changes_since(db, collection_name, since):
+    """
+    Collect the documents changed in a collection after a given sequence.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        collection_name (str): The name of the collection.
+        since (int): The sequence the client last synced at.
+
+    Returns:
+        dict: {"seq": int, "upserted": list of _ids, "deleted": list of _ids},
+        or None if the client must reload fully (log expired, reset or incomplete).
+    """
+    seq = current_sequence(db, collection_name)
+    if seq == since:
+        return {"seq": seq, "upserted": [], "deleted": []}
+    if since is None or since > seq:
+        return None
+
+    entries = list(db[LOG_COLLECTION].find(
+        {"collection": collection_name, "seq": {"$gt": since, "$lte": seq}},
+        {"_id": 0, "seq": 1, "op": 1, "ids": 1},
+        sort=[("seq", pymongo.ASCENDING)],
+    ))
+    # A gap means entries expired or a concurrent write has not landed yet
+    if [entry["seq"] for entry in entries] != list(range(since + 1, seq + 1)):
+        return None
+
+    upserted, deleted = {}, {}
+    for entry in entries:
+        if entry["op"] == "reset":
+            return None
+        for doc_id in entry["ids"]:
+            if entry["op"] == "delete":
+                upserted.pop(doc_id, None)
+                deleted[doc_id] = True
+            else:
+                deleted.pop(doc_id, None)
+                upserted[doc_id] = True
+    return {"seq": seq, "upserted": list(upserted), "deleted": list(deleted)}
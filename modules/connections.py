@@ -0,0 +1,223 @@
+import asyncio
+import os
+import threading
+import weakref
+
+import dotenv
+import pymongo
+import redis
+
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+DATABASE_NAME = "HumanFlowTaskManagerDB"
+
+_mongo_lock = threading.Lock()
+_mongo_client = None
+_mongo_pid = None
+_async_clients = weakref.WeakKeyDictionary()
+_async_pid = None
+
+_redis_lock = threading.Lock()
+_redis_client = None
+
+
+def _int_env(name, default):
+    """
+    Read an integer setting from the environment.
+
+    Args:
+        name (str): The environment variable name.
+        default (int): The value used when the variable is unset or invalid.
+
+    Returns:
+        int: The parsed value.
+    """
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid value for {name}: {value!r}. Using {default}.")
+        return default
+
+
+def mongo_settings():
+    """
+    Collect the MongoDB connection settings from the environment.
+
+    Returns:
+        dict: The host, port, credentials and pool/timeout options.
+    """
+    return {
+        "host": os.getenv("MONGO_HOST", "mongo"),
+        "port": _int_env("MONGO_PORT", 27017),
+        "username": os.getenv("MONGO_INITDB_ROOT_USERNAME"),
+        "password": os.getenv("MONGO_INITDB_ROOT_PASSWORD"),
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS", 60_000),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5_000),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 5_000),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS", 30_000),
+    }
+
+
+def _client_kwargs():
+    settings = mongo_settings()
+    host = settings.pop("host")
+    port = settings.pop("port")
+    if not settings["username"]:
+        settings.pop("username")
+        settings.pop("password")
+    return host, port, settings
+
+
+def get_mongo_client():
+    """
+    Return the process-wide MongoClient, creating it on first use.
+
+    The client is created lazily and owned by the current process. After a
+    fork (e.g. a gunicorn worker) the inherited client is discarded and a
+    fresh one is built, since pymongo clients are not fork-safe.
+
+    Returns:
+        MongoClient: The shared MongoDB client.
+    """
+    global _mongo_client, _mongo_pid
+    pid = os.getpid()
+    if _mongo_client is not None and _mongo_pid == pid:
+        return _mongo_client
+    with _mongo_lock:
+        if _mongo_client is None or _mongo_pid != pid:
+            from modules.metrics import MongoPoolMetrics
+            host, port, settings = _client_kwargs()
+            _mongo_client = pymongo.MongoClient(
+                host=host, port=port, connect=False, event_listeners=[MongoPoolMetrics()], **settings
+            )
+            _mongo_pid = pid
+            logger.info(f"Created MongoDB client for {host}:{port} in process {pid}.")
+    return _mongo_client
+
+
+def get_database(name=DATABASE_NAME):
+    """
+    Return a database handle backed by the shared MongoClient.
+
+    Args:
+        name (str): The database name.
+
+    Returns:
+        Database: The MongoDB database instance.
+    """
+    return get_mongo_client()[name]
+
+
+def get_async_mongo_client():
+    """
+    Return the AsyncMongoClient for the running event loop, creating it on first use.
+
+    Async clients are bound to the loop they first run on, so there is one per
+    loop (and per process, for the same fork-safety reason as get_mongo_client).
+
+    Returns:
+        AsyncMongoClient: The shared async MongoDB client.
+    """
+    global _async_pid
+    loop = asyncio.get_running_loop()
+    pid = os.getpid()
+    with _mongo_lock:
+        if _async_pid != pid:
+            _async_clients.clear()
+            _async_pid = pid
+        client = _async_clients.get(loop)
+        if client is None:
+            host, port, settings = _client_kwargs()
+            client = pymongo.AsyncMongoClient(host=host, port=port, connect=False, **settings)
+            _async_clients[loop] = client
+            logger.info(f"Created async MongoDB client for {host}:{port} in process {pid}.")
+    return client
+
+
+def get_async_database(name=DATABASE_NAME):
+    """
+    Return an async database handle for the running event loop.
+
+    Args:
+        name (str): The database name.
+
+    Returns:
+        AsyncDatabase: The MongoDB database instance.
+    """
+    return get_async_mongo_client()[name]
+
+
+def reset_mongo_client():
+    """
+    Close and forget the shared MongoClient so the next call builds a new one.
+    """
+    global _mongo_client, _mongo_pid
+    with _mongo_lock:
+        if _mongo_client is not None and _mongo_pid == os.getpid():
+            _mongo_client.close()
+        _mongo_client = None
+        _mongo_pid = None
+
+
+def redis_settings():
+    """
+    Collect the Redis connection settings from the environment.
+
+    Returns:
+        dict: Keyword arguments for redis.Redis.
+    """
+    return {
+        "host": os.getenv("REDIS_HOST", "redis"),
+        "port": _int_env("REDIS_PORT", 6379),
+        "db": _int_env("REDIS_DB", 0),
+        "max_connections": _int_env("REDIS_MAX_CONNECTIONS", 50),
+        "socket_connect_timeout": _int_env("REDIS_CONNECT_TIMEOUT_MS", 2_000) / 1000,
+        "socket_timeout": _int_env("REDIS_SOCKET_TIMEOUT_MS", 2_000) / 1000,
+        "health_check_interval": 30,
+    }
+
+
+def get_redis_client():
+    """
+    Return the process-wide Redis client, creating it on first use.
+
+    Creating the client does not connect; redis-py opens pooled connections on
+    demand and resets the pool in a forked child.
+
+    Returns:
+        redis.Redis: The shared Redis client.
+    """
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                settings = redis_settings()
+                _redis_client = redis.Redis(**settings)
+                logger.info(f"Created Redis client for {settings['host']}:{settings['port']}.")
+    return _redis_client
+
+
+def reset_connections_after_fork():
+    """
+    Drop the MongoDB and Redis clients inherited from a parent process.
+
+    Called from gunicorn's post_fork hook. The parent's clients are not closed,
+    since that would also close the parent's sockets. They are forgotten, so
+    the first use in the worker builds fresh pools.
+    """
+    global _mongo_client, _mongo_pid
+    with _mongo_lock:
+        _mongo_client = None
+        _mongo_pid = None
+    _async_clients.clear()
+    if _redis_client is not None:
+        _redis_client.connection_pool.reset()
@@ -0,0 +1,296 @@
+"""
+Login credentials: salted scrypt hashes in a JSON file that is reloaded when it changes.
+
+    python -m modules.credentials set <username> --group 1   # add a user or change a password
+    python -m modules.credentials migrate                    # hash plaintext "password" entries in place
+    python -m modules.credentials hash                       # print a hash to paste into the file
+
+The file keeps its original layout (label -> username, group, password_hash). Every
+worker checks its modification time at most every CREDENTIALS_RELOAD_S seconds, so
+added users and changed passwords take effect without a restart. Password checks run
+on a small thread pool, which bounds how many expensive hashes run at once no matter
+how many login requests arrive.
+"""
+import argparse
+import base64
+import concurrent.futures
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+import dotenv
+
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+CREDENTIALS_FILE = os.getenv("CREDENTIALS_FILE", "credentials.json")
+# scrypt cost: memory is 128 * N * r bytes per check; see `tools/benchmark.py --suite credentials`
+SCRYPT_N = int(os.getenv("CREDENTIALS_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.getenv("CREDENTIALS_SCRYPT_R", 8))
+SCRYPT_P = int(os.getenv("CREDENTIALS_SCRYPT_P", 1))
+SALT_BYTES = 16
+KEY_BYTES = 32
+SCHEME = "scrypt"
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    # OpenSSL refuses to allocate more than maxmem, which defaults to 32 MiB
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                          maxmem=128 * r * (n + p + 2) + 1024 * 1024)
+
+
+def hash_password(password, n=None, r=None, p=None):
+    """
+    Hash a password with a random salt.
+
+    Args:
+        password (str): The plaintext password.
+        n, r, p (int, optional): scrypt cost parameters; default to the CREDENTIALS_SCRYPT_* settings.
+
+    Returns:
+        str: "scrypt$n$r$p$salt$hash" with base64 salt and hash.
+    """
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    salt = secrets.token_bytes(SALT_BYTES)
+    return "$".join((SCHEME, str(n), str(r), str(p), _b64(salt), _b64(_scrypt(password, salt, n, r, p))))
+
+
+def check_password(password, encoded):
+    """
+    Check a password against a hash from hash_password in constant time.
+
+    Returns:
+        bool: True if the password matches, False otherwise (including malformed hashes).
+    """
+    try:
+        scheme, n, r, p, salt, expected = encoded.split("$")
+        if scheme != SCHEME:
+            return False
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(actual, base64.b64decode(expected))
+    except (AttributeError, ValueError) as e:
+        logger.error(f"Malformed password hash: {e}")
+        return False
+
+
+class CredentialStore:
+    """
+    Users, password hashes and groups read from a JSON credentials file.
+
+    Attributes:
+        path (str): The credentials file.
+        reload_interval (float): Minimum seconds between checks of the file's modification time.
+        verify_threads (int): Password checks allowed to run at once in this process.
+        verify_timeout (float): Seconds a login waits for its password check.
+    """
+
+    def __init__(self, path=CREDENTIALS_FILE, reload_interval=None, verify_threads=None, verify_timeout=None):
+        self.path = path
+        self.reload_interval = float(reload_interval if reload_interval is not None
+                                     else os.getenv("CREDENTIALS_RELOAD_S", 2))
+        self.verify_threads = int(verify_threads or os.getenv("CREDENTIALS_VERIFY_THREADS", 2))
+        self.verify_timeout = float(verify_timeout or os.getenv("CREDENTIALS_VERIFY_TIMEOUT_S", 10))
+        self._users = {}
+        self._signature = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._dummy_hash = None
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            raw = json.load(f)
+        users = {}
+        plaintext = []
+        for entry in raw.values():
+            if "password_hash" not in entry:
+                plaintext.append(entry["username"])
+            users[entry["username"]] = {
+                "password_hash": entry.get("password_hash"),
+                "password": entry.get("password"),
+                "group": entry.get("group"),
+            }
+        if plaintext:
+            logger.warning(f"Plaintext passwords for {plaintext} in {self.path}; "
+                           f"hash them with `python -m modules.credentials migrate`.")
+        return users
+
+    def refresh(self, force=False):
+        """
+        Reload the file if its modification time or size changed since the last load.
+
+        A file that cannot be read or parsed leaves the previously loaded users in place.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if signature == self._signature and not force:
+                    return
+                self._users = self._load()
+                self._signature = signature
+                logger.info(f"Loaded {len(self._users)} users from {self.path}.")
+            except Exception as e:
+                logger.error(f"Error loading credentials: {e}")
+
+    def users(self):
+        """
+        Returns:
+            list: The known usernames.
+        """
+        self.refresh()
+        return list(self._users)
+
+    def group(self, username):
+        """
+        Returns:
+            str: The user's group, or None for unknown users.
+        """
+        self.refresh()
+        user = self._users.get(username)
+        return user["group"] if user else None
+
+    def _check(self, username, password):
+        user = self._users.get(username)
+        if user is None or not user["password_hash"]:
+            if user is not None and user["password"] is not None:
+                return hmac.compare_digest(user["password"].encode("utf-8"), password.encode("utf-8"))
+            # Unknown users cost a full hash too, so response times do not reveal which usernames exist
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password(secrets.token_hex(8))
+            check_password(password, self._dummy_hash)
+            return False
+        return check_password(password, user["password_hash"])
+
+    def _pool(self):
+        # Threads do not survive a fork, so every gunicorn worker gets its own pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.verify_threads, thread_name_prefix="credentials-verify"
+                )
+            return self._executor
+
+    def verify(self, username, password):
+        """
+        Check a username and password on the verification pool.
+
+        Returns:
+            bool: True if the credentials are valid, False otherwise (also when the check timed out).
+        """
+        self.refresh()
+        try:
+            return self._pool().submit(self._check, username, password).result(timeout=self.verify_timeout)
+        except concurrent.futures.TimeoutError:
+            logger.error(f"Password check for '{username}' timed out after {self.verify_timeout} s.")
+            return False
+
+    def set_password(self, username, password, group=None):
+        """
+        Add a user or change a password (and optionally the group), rewriting the file atomically.
+
+        Returns:
+            bool: True if the file was written, False otherwise.
+        """
+        def update(raw):
+            entry = next((entry for entry in raw.values() if entry.get("username") == username), None)
+            if entry is None:
+                entry = raw.setdefault(username.upper(), {"username": username, "group": group or "1"})
+            entry.pop("password", None)
+            entry["password_hash"] = hash_password(password)
+            if group is not None:
+                entry["group"] = str(group)
+        return self._rewrite(update)
+
+    def migrate(self):
+        """
+        Replace every plaintext password in the file by its hash.
+
+        Returns:
+            bool: True if the file was written, False otherwise.
+        """
+        def update(raw):
+            for entry in raw.values():
+                if "password" in entry:
+                    entry["password_hash"] = hash_password(entry.pop("password"))
+        return self._rewrite(update)
+
+    def _rewrite(self, update):
+        try:
+            raw = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    raw = json.load(f)
+            update(raw)
+            # Write a temporary file and rename it, so workers never read a half-written file
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False) as f:
+                json.dump(raw, f, indent=4)
+            if os.path.exists(self.path):
+                os.chmod(f.name, os.stat(self.path).st_mode & 0o777)
+            os.replace(f.name, self.path)
+        except Exception as e:
+            logger.error(f"Failed to write credentials to {self.path}: {e}")
+            return False
+        self.refresh(force=True)
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_credential_store():
+    """
+    Returns:
+        CredentialStore: The process-wide store for CREDENTIALS_FILE.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CredentialStore()
+        return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the hashed credentials file.")
+    parser.add_argument("--file", default=CREDENTIALS_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    set_parser = commands.add_parser("set", help="Add a user or change a password.")
+    set_parser.add_argument("username")
+    set_parser.add_argument("--group", help="0 is admin, 1 is viewer.")
+    commands.add_parser("migrate", help="Hash every plaintext password in the file.")
+    commands.add_parser("hash", help="Print the hash of a password.")
+    args = parser.parse_args()
+
+    store = CredentialStore(args.file)
+    if args.command == "hash":
+        print(hash_password(getpass.getpass()))
+    elif args.command == "migrate":
+        raise SystemExit(0 if store.migrate() else 1)
+    else:
+        password = getpass.getpass()
+        if password != getpass.getpass("Repeat password: "):
+            raise SystemExit("Passwords do not match.")
+        raise SystemExit(0 if store.set_password(args.username, password, args.group) else 1)
@@ -1,34 +1,82 @@
+import json
 import logging
 import os
 
 import dotenv
-import logging_loki
 from logging.handlers import RotatingFileHandler
 
+from modules.log_shipping import create_loki_handler
+
 dotenv.load_dotenv()  # Loads .env file if present
 
+
+class RequestIdFilter(logging.Filter):
+    """
+    Adds `request_id` to every record: the id of the Flask request being handled, or "-".
+    """
+
+    def filter(self, record):
+        request_id = "-"
+        try:
+            from flask import g, has_request_context
+            if has_request_context():
+                request_id = getattr(g, "request_id", "-")
+        except ImportError:
+            pass
+        record.request_id = request_id
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including structured ORM fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        entry.update(getattr(record, "orm", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
 def create_logger():
     """
-    Creates and returns a logger named 'custom_logger' at DEBUG level.
+    Creates and returns a logger named 'custom_logger' at LOG_LEVEL (default INFO).
+    
+    Records are formatted as text, or as JSON lines when LOG_FORMAT=json, and carry
+    the current request id.
     
     Handlers:
-        1. RotatingFileHandler (writes to 'app.log', rotates at 5MB, keeps 3 backups)
+        1. RotatingFileHandler (writes to 'app.log', rotates at LOG_FILE_MAX_BYTES (default 20MB),
+           keeps LOG_FILE_BACKUPS (default 5) backups)
         2. StreamHandler (stdout)
-        3. LokiHandler (if LOKI_URL is defined in environment variables)
+        3. Batching, non-blocking Loki handler (if LOKI_URL is defined in environment variables);
+           see modules.log_shipping for the LOKI_* tuning variables
     """
     logger_name = 'custom_logger'
     
     logger = logging.getLogger(logger_name)
     if logger.handlers:
         return logger
-    logger.setLevel(logging.DEBUG)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.addFilter(RequestIdFilter())
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s')
 
     try:
         file_handler = RotatingFileHandler(
             filename='app.log',
-            maxBytes=5_000_000,  # 5 MB
-            backupCount=3,       # keep up to 3 old log files
+            maxBytes=int(os.getenv("LOG_FILE_MAX_BYTES", 20_000_000)),  # 20 MB
+            backupCount=int(os.getenv("LOG_FILE_BACKUPS", 5)),         # old log files to keep
             encoding='utf-8'
         )
         file_handler.setLevel(logging.DEBUG)
@@ -49,15 +97,15 @@ def create_logger():
             # A set of tags (labels) to associate with each log
             tags = {"application": "my_app", "environment": os.getenv("ENV", "dev")}
             
-            loki_handler = logging_loki.LokiHandler(
+            # Records go through a bounded queue and are pushed in batches by a
+            # background thread, so logging never waits on Loki
+            loki_handler = create_loki_handler(
                 url=loki_url,
                 tags=tags,
                 auth=(loki_user, loki_pass) if loki_user or loki_pass else None,
-                version="1",  # or "0" depending on your Loki setup
-                # mode="blocking"  # optional; set to 'blocking' if you want to block when Loki is down
+                formatter=formatter,
             )
             loki_handler.setLevel(logging.DEBUG)
-            loki_handler.setFormatter(formatter)
             logger.addHandler(loki_handler)
         except Exception as e:
             logger.warning(f"Failed to configure Loki handler: {e}")
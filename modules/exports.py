@@ -0,0 +1,343 @@
+"""
+Streaming export of the mood journal and of a user's tasks as CSV, NDJSON or Parquet.
+
+    python -m modules.exports tasks --owner user1 --format parquet --start 2026-01-01 -o tasks.parquet
+    python -m modules.exports mood_journal --format csv > journal.csv
+    python -m modules.exports tasks --owner user1 --format ndjson --enqueue   # written by a job worker
+
+The documents are read from one cursor in batches of EXPORT_BATCH_SIZE and each batch
+is written out before the next is read, so memory stays constant whatever the size of
+the collection. The date range is applied on an indexed field (date_id on mood_journal,
+owner_created_at on tasks). The web app serves the same streams at /export/<dataset>.
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+import dotenv
+from pymongo import ASCENDING
+
+from modules.custom_logger import create_logger
+from modules.customORM import CustomORM
+from modules.jobs import job
+from modules.tasks import TASK_COLLECTION
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    An exportable collection.
+
+    Attributes:
+        collection (str): The source collection.
+        fields (dict): Exported field -> kind ("string", "int", "datetime" or "list").
+        date_field (str): The field the start/end range applies to; the leading sort key.
+        owner_field (str): The field holding the owning user, or None for data shared by all users.
+    """
+    collection: str
+    fields: dict
+    date_field: str
+    owner_field: str = None
+
+
+DATASETS = {
+    # Journal dates are "YYYY-MM-DD" strings, served by the date_id index
+    "mood_journal": Dataset("mood_journal", {
+        "_id": "string", "date": "string", "mood": "int", "notes": "string",
+    }, "date"),
+    "tasks": Dataset(TASK_COLLECTION, {
+        "_id": "string", "title": "string", "status": "string", "priority": "int", "due_date": "string",
+        "depends_on": "list", "goal": "string", "estimate_minutes": "int", "notes": "string",
+        "created_at": "datetime", "updated_at": "datetime",
+    }, "created_at", "owner"),
+}
+
+
+def parquet_available():
+    """
+    Returns:
+        bool: True if pyarrow is installed, so Parquet exports are possible.
+    """
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def export_query(dataset, owner=None, start=None, end=None):
+    """
+    Build the filter and sort of an export.
+
+    Args:
+        dataset (Dataset): The dataset.
+        owner (str, optional): The user whose documents are exported, for per-user datasets.
+        start (datetime.date, optional): First day included.
+        end (datetime.date, optional): Last day included.
+
+    Returns:
+        tuple: (query, sort)
+    """
+    query = {}
+    if dataset.owner_field:
+        query[dataset.owner_field] = owner
+    bounds = {}
+    if dataset.fields[dataset.date_field] == "datetime":
+        if start:
+            bounds["$gte"] = datetime.datetime.combine(start, datetime.time())
+        if end:
+            bounds["$lt"] = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time())
+    else:
+        if start:
+            bounds["$gte"] = start.isoformat()
+        if end:
+            bounds["$lte"] = end.isoformat()
+    if bounds:
+        query[dataset.date_field] = bounds
+    return query, [(dataset.date_field, ASCENDING), ("_id", ASCENDING)]
+
+
+def _convert(value, kind):
+    if value is None:
+        return None
+    if kind == "int":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if kind == "datetime":
+        if isinstance(value, datetime.datetime):
+            # MongoDB returns naive UTC datetimes
+            return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+        return None
+    if kind == "list":
+        return [str(item) for item in value] if isinstance(value, (list, tuple)) else [str(value)]
+    return str(value)
+
+
+def iter_records(orm, name, owner=None, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Read a dataset in batches of flat records.
+
+    Yields:
+        list: Records with exactly the dataset's fields, converted to their kinds.
+    """
+    dataset = DATASETS[name]
+    query, sort = export_query(dataset, owner, start, end)
+    for batch in orm.iter_batches(dataset.collection, query, list(dataset.fields), sort, batch_size):
+        yield [
+            {field: _convert(document.get(field), kind) for field, kind in dataset.fields.items()}
+            for document in batch
+        ]
+
+
+def _text(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ";".join(value)
+    return value
+
+
+def csv_chunks(batches, fields):
+    """
+    Yields:
+        bytes: The CSV header, then one chunk per batch.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        writer.writerows([_text(record[field]) for field in fields] for record in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def ndjson_chunks(batches, fields):
+    """
+    Yields:
+        bytes: One chunk of JSON lines per batch.
+    """
+    for batch in batches:
+        yield "".join(json.dumps(record, default=_text) + "\n" for record in batch).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    # A write-only file whose contents are handed out and dropped after every row group
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(batches, fields):
+    """
+    Write a Parquet file with one row group per batch.
+
+    Args:
+        batches (iterable): Batches of records.
+        fields (dict): Field -> kind, which sets the column types.
+
+    Yields:
+        bytes: The file, one chunk per row group, then the footer.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "datetime": pa.timestamp("ms", tz="UTC"),
+        "list": pa.list_(pa.string()),
+    }
+    schema = pa.schema([(field, types[kind]) for field, kind in fields.items()])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+WRITERS = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
+
+
+def export_chunks(name, fmt, owner=None, start=None, end=None, orm=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Stream a dataset in the given format.
+
+    Args:
+        name (str): A key of DATASETS.
+        fmt (str): A key of FORMATS.
+        owner (str, optional): The user whose documents are exported, for per-user datasets.
+        start, end (datetime.date, optional): The inclusive date range.
+        orm (CustomORM, optional): The ORM used for reads.
+        batch_size (int, optional): Documents read and written per chunk.
+
+    Yields:
+        bytes: The export, chunk by chunk.
+    """
+    dataset = DATASETS[name]
+    fields = dataset.fields if fmt == "parquet" else list(dataset.fields)
+    batches = iter_records(orm or CustomORM(), name, owner, start, end, batch_size)
+    yield from WRITERS[fmt](batches, fields)
+
+
+def export_filename(name, fmt, start=None, end=None):
+    """
+    Returns:
+        str: e.g. "tasks_2026-01-01_2026-03-31.csv".
+    """
+    parts = [name] + [day.isoformat() for day in (start, end) if day]
+    return f"{'_'.join(parts)}.{fmt}"
+
+
+def parse_day(value):
+    """
+    Returns:
+        datetime.date: The parsed "YYYY-MM-DD" value, or None if it is empty.
+
+    Raises:
+        ValueError: If the value is not a date.
+    """
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def write_export(path, name, fmt, owner=None, start=None, end=None):
+    """
+    Write an export to a file, replacing it only once it is complete.
+
+    Returns:
+        int: The bytes written.
+    """
+    temporary = f"{path}.partial"
+    written = 0
+    with open(temporary, "wb") as f:
+        for chunk in export_chunks(name, fmt, owner, start, end):
+            f.write(chunk)
+            written += len(chunk)
+    os.replace(temporary, path)
+    logger.info(f"Exported {name} as {fmt} to {path} ({written} bytes).")
+    return written
+
+
+@job(queue="exports", max_attempts=2, timeout=3600)
+def export_job(name, fmt, owner=None, start=None, end=None):
+    """
+    Write an export into EXPORT_DIR on a job worker.
+    """
+    start, end = parse_day(start), parse_day(end)
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"{owner}_{export_filename(name, fmt, start, end)}" if owner
+                        else export_filename(name, fmt, start, end))
+    write_export(path, name, fmt, owner, start, end)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export journal or task data.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--owner", help="User whose tasks are exported.")
+    parser.add_argument("--start", type=parse_day, help="First day included (YYYY-MM-DD).")
+    parser.add_argument("--end", type=parse_day, help="Last day included (YYYY-MM-DD).")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout).")
+    parser.add_argument("--enqueue", action="store_true",
+                        help=f"Let a job worker write the file into EXPORT_DIR ({EXPORT_DIR}).")
+    args = parser.parse_args()
+
+    if DATASETS[args.dataset].owner_field and not args.owner:
+        parser.error(f"--owner is required for {args.dataset}.")
+    if args.format == "parquet" and not parquet_available():
+        sys.exit("Parquet exports need pyarrow; run `pip install pyarrow`.")
+    if args.enqueue:
+        job_id = export_job.delay(args.dataset, args.format, args.owner,
+                                  args.start and args.start.isoformat(), args.end and args.end.isoformat())
+        if not job_id:
+            sys.exit("Could not enqueue the export.")
+        print(f"Enqueued export job {job_id}.")
+    elif args.output:
+        write_export(args.output, args.dataset, args.format, args.owner, args.start, args.end)
+    else:
+        if args.format == "parquet" and sys.stdout.isatty():
+            sys.exit("Refusing to write Parquet to a terminal; use --output.")
+        for chunk in export_chunks(args.dataset, args.format, args.owner, args.start, args.end):
+            sys.stdout.buffer.write(chunk)
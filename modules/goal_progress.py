@@ -0,0 +1,180 @@
+import argparse
+
+import dotenv
+from pymongo import UpdateOne
+
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+# Kept up to date by CustomORM writes to tasks (see modules.rollups)
+GOAL_COLLECTION = "goals"
+DONE = "done"
+# Only these task fields are needed to maintain goal progress (pre-images of updates/deletes)
+PROGRESS_FIELDS = {"_id": 1, "goal": 1, "status": 1}
+COUNTERS = ("own_total", "own_done", "total", "done")
+
+
+def progress_deltas(removed=(), added=()):
+    """
+    Fold removed and added tasks into per-goal changes of their direct task counts.
+
+    Args:
+        removed (iterable): Tasks (with goal and status) that no longer count.
+        added (iterable): Tasks that now count.
+
+    Returns:
+        dict: goal _id -> [total delta, done delta], zero deltas omitted.
+    """
+    deltas = {}
+    for sign, tasks in ((-1, removed), (1, added)):
+        for task in tasks:
+            goal = task.get("goal")
+            if goal is None:
+                continue
+            delta = deltas.setdefault(goal, [0, 0])
+            delta[0] += sign
+            if task.get("status") == DONE:
+                delta[1] += sign
+    return {goal: delta for goal, delta in deltas.items() if delta != [0, 0]}
+
+
+def subtree_increments(goal, total, done):
+    """
+    The $inc that adds a goal's own tasks to it and to every ancestor.
+
+    Args:
+        goal (dict): The goal with _id and ancestors.
+        total (int): Change in the number of tasks.
+        done (int): Change in the number of done tasks.
+
+    Returns:
+        dict: goal _id -> {counter: delta}.
+    """
+    increments = {goal["_id"]: {"own_total": total, "own_done": done, "total": total, "done": done}}
+    for ancestor in goal.get("ancestors") or []:
+        increments[ancestor] = {"total": total, "done": done}
+    return increments
+
+
+def increment_goals(db, increments):
+    """
+    Apply per-goal counter increments with one unordered bulk write.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        increments (dict): goal _id -> {counter: delta}.
+
+    Returns:
+        bool: True if the goals were updated, False otherwise.
+    """
+    operations = [
+        UpdateOne({"_id": goal_id}, {"$inc": {name: value for name, value in counters.items() if value}})
+        for goal_id, counters in increments.items() if any(counters.values())
+    ]
+    if not operations:
+        return True
+    try:
+        db[GOAL_COLLECTION].bulk_write(operations, ordered=False)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to update goal progress: {e}")
+        return False
+
+
+def apply_progress_changes(db, removed=(), added=()):
+    """
+    Update the denormalized progress of the goals that tasks were removed from or added to.
+
+    A task change adjusts its goal and each of the goal's ancestors with an atomic
+    $inc, so the cost depends on the depth of the hierarchy, never on its size, and
+    concurrent writers never lose updates.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        removed (iterable): Pre-images of deleted tasks, or of updated tasks before the update.
+        added (iterable): Inserted tasks, or updated tasks after the update.
+
+    Returns:
+        bool: True if the goals were updated, False otherwise.
+    """
+    deltas = progress_deltas(removed, added)
+    if not deltas:
+        return True
+    try:
+        goals = list(db[GOAL_COLLECTION].find({"_id": {"$in": list(deltas)}}, {"ancestors": 1}))
+    except Exception as e:
+        logger.error(f"Failed to read goals for progress update: {e}")
+        return False
+    increments = {}
+    for goal in goals:
+        for goal_id, counters in subtree_increments(goal, *deltas[goal["_id"]]).items():
+            merged = increments.setdefault(goal_id, {})
+            for name, value in counters.items():
+                merged[name] = merged.get(name, 0) + value
+    return increment_goals(db, increments)
+
+
+def rebuild_progress(db, source="tasks"):
+    """
+    Recompute every goal's progress from the tasks.
+
+    MongoDB counts the tasks per goal and status, and the counts are folded up
+    each goal's ancestors in Python. Needed after bulk task writes, which have no
+    pre-images.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        source (str): The tasks collection.
+
+    Returns:
+        bool: True if the progress was rebuilt, False otherwise.
+    """
+    pipeline = [
+        {"$match": {"goal": {"$ne": None}}},
+        {"$group": {"_id": {"goal": "$goal", "status": "$status"}, "n": {"$sum": 1}}},
+    ]
+    try:
+        own = {}
+        for group in db[source].aggregate(pipeline, allowDiskUse=True):
+            counts = own.setdefault(group["_id"]["goal"], [0, 0])
+            counts[0] += group["n"]
+            if group["_id"].get("status") == DONE:
+                counts[1] += group["n"]
+        goals = list(db[GOAL_COLLECTION].find({}, {"ancestors": 1}))
+        totals = {goal["_id"]: dict.fromkeys(COUNTERS, 0) for goal in goals}
+        for goal in goals:
+            total, done = own.get(goal["_id"], (0, 0))
+            for goal_id, counters in subtree_increments(goal, total, done).items():
+                if goal_id in totals:
+                    for name, value in counters.items():
+                        totals[goal_id][name] += value
+        operations = [UpdateOne({"_id": goal_id}, {"$set": counters}) for goal_id, counters in totals.items()]
+        if operations:
+            db[GOAL_COLLECTION].bulk_write(operations, ordered=False)
+        logger.info(f"Rebuilt the progress of {len(goals)} goals from '{source}'.")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to rebuild goal progress: {e}")
+        return False
+
+
+def progress_percent(goal):
+    """
+    Returns:
+        float: The share of done tasks in the goal's subtree (0-100), or None if it has no tasks.
+    """
+    total = goal.get("total") or 0
+    if total <= 0:
+        return None
+    return 100 * max(goal.get("done") or 0, 0) / total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the denormalized goal progress from the tasks.")
+    parser.parse_args()
+    from modules.connections import get_database
+
+    raise SystemExit(0 if rebuild_progress(get_database()) else 1)
@@ -0,0 +1,199 @@
+import datetime
+
+import dotenv
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+
+from modules.custom_logger import create_logger
+from modules.customORM import CustomORM
+from modules.goal_progress import COUNTERS, GOAL_COLLECTION, increment_goals, progress_percent
+from modules.tasks import TASK_COLLECTION
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+PATH_SEPARATOR = "/"
+
+
+class GoalManager:
+    """
+    Hierarchical goals of one user, stored through CustomORM.
+
+    Goals own tasks (a task's goal field) and sub-goals (a goal's parent). Every goal
+    stores its ancestors and a materialized path, plus the task counts of its own
+    tasks and of its whole subtree. The counts are kept up to date incrementally
+    when tasks change (see modules.goal_progress), so the dashboard renders the
+    whole hierarchy, in tree order, from one indexed read.
+
+    Attributes:
+        orm (CustomORM): The ORM used for reads and writes.
+        owner (str): The user whose goals are managed.
+    """
+
+    def __init__(self, owner, orm=None):
+        self.owner = owner
+        self.orm = orm or CustomORM()
+
+    def _goal(self, goal_id):
+        return self.orm.find_one(GOAL_COLLECTION, {"_id": ObjectId(goal_id), "owner": self.owner})
+
+    def dashboard(self):
+        """
+        Every goal of the user in tree order (each goal directly followed by its sub-goals).
+
+        Returns:
+            list: Goal documents with "depth" and "progress" (percent, None without tasks),
+            or None if they could not be read.
+        """
+        goals = self.orm.find_many(GOAL_COLLECTION, {"owner": self.owner}, sort=[("path", ASCENDING)])
+        if goals is None:
+            return None
+        for goal in goals:
+            goal["depth"] = len(goal.get("ancestors") or [])
+            goal["progress"] = progress_percent(goal)
+        return goals
+
+    def create_goal(self, title, parent=None, due_date=None):
+        """
+        Create a goal, optionally as a sub-goal of another one.
+
+        Args:
+            title (str): The goal's title.
+            parent (ObjectId, optional): The parent goal.
+            due_date (str, optional): "YYYY-MM-DD".
+
+        Returns:
+            ObjectId: The new goal's _id, or None if it could not be created.
+        """
+        ancestors, path = [], ""
+        if parent is not None:
+            parent_goal = self._goal(parent)
+            if parent_goal is None:
+                logger.warning(f"Cannot create goal: unknown parent {parent}.")
+                return None
+            ancestors = parent_goal["ancestors"] + [parent_goal["_id"]]
+            path = parent_goal["path"] + PATH_SEPARATOR
+        goal_id = ObjectId()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        document = {
+            "_id": goal_id,
+            "owner": self.owner,
+            "title": title,
+            "due_date": due_date or None,
+            "parent": ancestors[-1] if ancestors else None,
+            "ancestors": ancestors,
+            # ObjectIds grow over time, so siblings sort in creation order
+            "path": path + str(goal_id),
+            **dict.fromkeys(COUNTERS, 0),
+            "created_at": now,
+            "updated_at": now,
+        }
+        if not self.orm.insert_one(GOAL_COLLECTION, document):
+            return None
+        return goal_id
+
+    def update_goal(self, goal_id, **fields):
+        """
+        Change a goal's title or due date.
+
+        Returns:
+            bool: True if the goal was updated, False otherwise.
+        """
+        unknown = set(fields) - {"title", "due_date"}
+        if unknown:
+            logger.error(f"Cannot update goal fields {sorted(unknown)}.")
+            return False
+        fields["updated_at"] = datetime.datetime.now(datetime.timezone.utc)
+        return self.orm.update_one(
+            GOAL_COLLECTION, {"_id": ObjectId(goal_id), "owner": self.owner}, {"$set": fields}
+        )
+
+    def _subtree(self, goal_id):
+        return self.orm.find_many(
+            GOAL_COLLECTION, {"owner": self.owner, "ancestors": goal_id}, projection=["ancestors", "path"]
+        )
+
+    def move_goal(self, goal_id, parent=None):
+        """
+        Move a goal (with its sub-goals and tasks) under another goal, or to the top level.
+
+        The subtree's counts are subtracted from the old ancestors and added to the
+        new ones; only the moved goals and the two ancestor chains are written.
+
+        Args:
+            goal_id (ObjectId): The goal to move.
+            parent (ObjectId, optional): The new parent; None for a top-level goal.
+
+        Returns:
+            bool: True if the goal was moved, False otherwise.
+        """
+        goal = self._goal(goal_id)
+        if goal is None:
+            logger.warning(f"Cannot move unknown goal {goal_id}.")
+            return False
+        new_ancestors, new_path = [], ""
+        if parent is not None:
+            parent_goal = self._goal(parent)
+            if parent_goal is None or parent_goal["_id"] == goal["_id"] or goal["_id"] in parent_goal["ancestors"]:
+                logger.warning(f"Rejected move of goal {goal_id} under {parent}.")
+                return False
+            new_ancestors = parent_goal["ancestors"] + [parent_goal["_id"]]
+            new_path = parent_goal["path"] + PATH_SEPARATOR
+        if new_ancestors == goal["ancestors"]:
+            return True
+        descendants = self._subtree(goal["_id"])
+        if descendants is None:
+            return False
+        depth = len(goal["ancestors"])
+        old_prefix = len(goal["path"]) - len(str(goal["_id"]))
+        operations = [
+            UpdateOne({"_id": moved["_id"]}, {"$set": {
+                "ancestors": new_ancestors + moved["ancestors"][depth:],
+                "path": new_path + moved["path"][old_prefix:],
+                **({"parent": new_ancestors[-1] if new_ancestors else None} if moved["_id"] == goal["_id"] else {}),
+            }})
+            for moved in [goal] + descendants
+        ]
+        if not all(result.ok for result in self.orm.bulk_write(GOAL_COLLECTION, operations, ordered=False)):
+            return False
+        increments = {ancestor: {"total": -goal["total"], "done": -goal["done"]} for ancestor in goal["ancestors"]}
+        for ancestor in new_ancestors:
+            counters = increments.setdefault(ancestor, {"total": 0, "done": 0})
+            counters["total"] += goal["total"]
+            counters["done"] += goal["done"]
+        return increment_goals(self.orm.db, increments)
+
+    def delete_goal(self, goal_id):
+        """
+        Delete a goal and its sub-goals. Their tasks are kept but no longer belong to a goal.
+
+        Returns:
+            bool: True if the goal was deleted, False otherwise.
+        """
+        goal = self._goal(goal_id)
+        if goal is None:
+            return False
+        descendants = self._subtree(goal["_id"])
+        if descendants is None:
+            return False
+        removed = [goal["_id"]] + [descendant["_id"] for descendant in descendants]
+        if not increment_goals(
+            self.orm.db, {ancestor: {"total": -goal["total"], "done": -goal["done"]} for ancestor in goal["ancestors"]}
+        ):
+            return False
+        if not self.orm.delete_many(GOAL_COLLECTION, {"_id": {"$in": removed}, "owner": self.owner}):
+            return False
+        # One update per task keeps the task change log incremental (update_many would reset it)
+        tasks = self.orm.find_many(
+            TASK_COLLECTION, {"owner": self.owner, "goal": {"$in": removed}}, projection={"_id": 1}
+        ) or []
+        now = datetime.datetime.now(datetime.timezone.utc)
+        failed = [
+            task["_id"] for task in tasks
+            if not self.orm.update_one(TASK_COLLECTION, {"_id": task["_id"]},
+                                       {"$set": {"goal": None, "updated_at": now}})
+        ]
+        if failed:
+            logger.error(f"Could not detach {len(failed)} tasks from deleted goal {goal_id}.")
+        return not failed
@@ -0,0 +1,151 @@
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import dotenv
+import pymongo
+
+from modules.connections import get_database
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+
+@dataclass(frozen=True)
+class HealthStatus:
+    """
+    Snapshot of the last database health probe.
+
+    Attributes:
+        healthy (Optional[bool]): Result of the last probe, or None before the first one finished.
+        latency_ms (Optional[float]): Round-trip time of the last successful ping.
+        checked_at (Optional[float]): Unix time of the last probe.
+        error (Optional[str]): Error message of the last failed probe.
+    """
+    healthy: Optional[bool] = None
+    latency_ms: Optional[float] = None
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+class HealthMonitor:
+    """
+    Background MongoDB health checker.
+
+    A daemon thread pings the cluster every `interval` seconds (with random
+    jitter so workers do not probe in lockstep) and caches the result.
+    Readers get the last known state without touching the network.
+    """
+
+    def __init__(self, interval=5.0, jitter=0.2, timeout=2.0):
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self._status = HealthStatus()
+        self._stop = threading.Event()
+        self._checked = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the probe thread for the current process if it is not running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="mongo-health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the probe thread.
+        """
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_now()
+            delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            self._stop.wait(max(delay, 0.1))
+
+    def check_now(self):
+        """
+        Ping the database once and update the cached status.
+
+        Returns:
+            HealthStatus: The new status.
+        """
+        previous = self._status.healthy
+        started = time.perf_counter()
+        try:
+            with pymongo.timeout(self.timeout):
+                get_database().command("ping")
+            status = HealthStatus(
+                healthy=True,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                checked_at=time.time(),
+            )
+        except Exception as e:
+            status = HealthStatus(healthy=False, checked_at=time.time(), error=str(e))
+        self._status = status
+        self._checked.set()
+        if status.healthy != previous:
+            if status.healthy:
+                logger.info(f"Successfully connected to MongoDB ({status.latency_ms:.1f} ms).")
+            else:
+                logger.error(f"Failed to connect to MongoDB: {status.error}")
+        return status
+
+    def status(self, wait=0.0):
+        """
+        Return the last known health status without blocking on the network.
+
+        Args:
+            wait (float): Seconds to wait for the first probe if none has finished yet.
+
+        Returns:
+            HealthStatus: The cached status.
+        """
+        self.start()
+        if wait and not self._checked.is_set():
+            self._checked.wait(wait)
+        return self._status
+
+    def is_healthy(self):
+        """
+        Returns:
+            bool: True if the last probe succeeded, False otherwise (including before the first probe).
+        """
+        return bool(self.status().healthy)
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor():
+    """
+    Return the process-wide HealthMonitor, configured from the environment.
+
+    Returns:
+        HealthMonitor: The shared monitor.
+    """
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = HealthMonitor(
+                    interval=float(os.getenv("MONGO_HEALTH_INTERVAL_S", "5")),
+                    jitter=float(os.getenv("MONGO_HEALTH_JITTER", "0.2")),
+                    timeout=float(os.getenv("MONGO_HEALTH_TIMEOUT_S", "2")),
+                )
+    return _monitor
@@ -0,0 +1,109 @@
+"""
+Stream NDJSON or CSV files into a collection with CustomORM's bulk API.
+
+Usage:
+    python -m modules.importer entries.ndjson --collection mood_journal
+    python -m modules.importer entries.csv --collection mood_journal --field-type mood=int --upsert-key date
+
+Rows are read lazily and written in batches, so memory use stays constant
+regardless of the file size.
+"""
+import argparse
+import csv
+import os
+import sys
+
+from bson import json_util
+from pymongo import InsertOne
+
+from modules.custom_logger import create_logger
+from modules.customORM import DEFAULT_BATCH_SIZE, CustomORM, upsert_operations
+
+logger = create_logger()
+
+FIELD_TYPES = {
+    "int": int,
+    "float": float,
+    "str": str,
+    "bool": lambda value: value.strip().lower() in ("1", "true", "yes", "y"),
+}
+
+
+def read_ndjson(path):
+    """
+    Yield one document per non-empty line of an NDJSON (MongoDB extended JSON) file.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json_util.loads(line)
+
+
+def read_csv(path, field_types=None):
+    """
+    Yield one document per CSV row, converting the columns listed in `field_types`.
+
+    Args:
+        path (str): The CSV file; the first row holds the field names.
+        field_types (dict, optional): Column name to converter, e.g. {"mood": int}.
+    """
+    field_types = field_types or {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            for name, convert in field_types.items():
+                if row.get(name) not in (None, ""):
+                    row[name] = convert(row[name])
+            yield row
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import NDJSON or CSV files into MongoDB.")
+    parser.add_argument("path", help="The file to import.")
+    parser.add_argument("--collection", required=True, help="The target collection.")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to the file extension.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--unordered", action="store_true", help="Keep going after a failed document.")
+    parser.add_argument("--upsert-key", action="append", default=[],
+                        help="Upsert on this field instead of inserting; repeat for compound keys.")
+    parser.add_argument("--field-type", action="append", default=[], metavar="FIELD=TYPE",
+                        help=f"Convert a CSV column; TYPE is one of {', '.join(FIELD_TYPES)}.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    if file_format == "csv":
+        field_types = {}
+        for spec in args.field_type:
+            name, _, type_name = spec.partition("=")
+            if type_name not in FIELD_TYPES:
+                sys.exit(f"Unknown field type in '{spec}'.")
+            field_types[name] = FIELD_TYPES[type_name]
+        documents = read_csv(args.path, field_types)
+    else:
+        documents = read_ndjson(args.path)
+
+    if args.upsert_key:
+        operations = upsert_operations(documents, args.upsert_key)
+    else:
+        operations = (InsertOne(document) for document in documents)
+
+    totals = {"operations": 0, "inserted": 0, "upserted": 0, "modified": 0, "failed": 0}
+    orm = CustomORM()
+    for result in orm.iter_bulk_write(args.collection, operations, args.batch_size, not args.unordered):
+        totals["operations"] += result.size
+        totals["inserted"] += result.inserted
+        totals["upserted"] += result.upserted
+        totals["modified"] += result.modified
+        totals["failed"] += len(result.errors)
+        for error in result.errors:
+            print(f"{os.path.basename(args.path)}: record {error['index']}: {error['message']}", file=sys.stderr)
+
+    print(", ".join(f"{key}={value}" for key, value in totals.items()))
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+
+import dotenv
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from modules.connections import get_database
+from modules.custom_logger import create_logger
+from modules.jobs import job, queue_enabled
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+# Declarative index registry: collection name -> indexes it must have.
+# Every query the ORM issues on these collections should be served by one of them.
+INDEXES = {
+    "mood_journal": [
+        IndexModel([("user", ASCENDING), ("date", DESCENDING)], name="user_date"),
+        # Keyset pagination orders by date with _id as the tie-breaker
+        IndexModel([("date", DESCENDING), ("_id", DESCENDING)], name="date_id"),
+    ],
+    # Trend charts read one period's rollups in date order
+    "mood_rollups": [
+        IndexModel([("period", ASCENDING), ("start", ASCENDING)], name="period_start"),
+    ],
+    "tasks": [
+        IndexModel([("owner", ASCENDING), ("status", ASCENDING)], name="owner_status"),
+        IndexModel([("owner", ASCENDING), ("due_date", ASCENDING)], name="owner_due_date"),
+        IndexModel([("owner", ASCENDING), ("goal", ASCENDING)], name="owner_goal"),
+        # Exports read a user's tasks by creation date
+        IndexModel([("owner", ASCENDING), ("created_at", ASCENDING)], name="owner_created_at"),
+    ],
+    # Compaction reads the event log in (at, _id) order; raw events expire after TIME_EVENT_RETENTION_DAYS
+    "time_events": [
+        IndexModel([("at", ASCENDING), ("_id", ASCENDING)], name="at_id"),
+        IndexModel([("at", ASCENDING)], name="at_ttl",
+                   expireAfterSeconds=int(os.getenv("TIME_EVENT_RETENTION_DAYS", 365)) * 24 * 3600),
+    ],
+    # Timesheets read one user's days
+    "time_daily": [
+        IndexModel([("owner", ASCENDING), ("day", ASCENDING)], name="owner_day"),
+    ],
+    # The goals dashboard reads a user's whole hierarchy in tree order from owner_path
+    "goals": [
+        IndexModel([("owner", ASCENDING), ("path", ASCENDING)], name="owner_path"),
+        IndexModel([("owner", ASCENDING), ("ancestors", ASCENDING)], name="owner_ancestors"),
+    ],
+}
+
+
+class QueryPlanError(Exception):
+    """Raised in strict explain mode when a query would scan a whole collection."""
+
+
+def ensure_indexes(db=None, registry=None):
+    """
+    Create every index in the registry. Existing identical indexes are left alone,
+    so this is safe to run on every startup.
+
+    Args:
+        db (Database, optional): The database; defaults to the shared connection.
+        registry (dict, optional): Collection name -> list of IndexModel; defaults to INDEXES.
+
+    Returns:
+        bool: True if all indexes are in place, False if any could not be created.
+    """
+    db = db if db is not None else get_database()
+    registry = registry if registry is not None else INDEXES
+    ok = True
+    for collection_name, models in registry.items():
+        try:
+            created = db[collection_name].create_indexes(models)
+            logger.info(f"Indexes {created} ensured on collection '{collection_name}'.")
+        except OperationFailure as e:
+            # e.g. an index with the same name but a different key already exists
+            logger.error(f"Failed to create indexes on collection '{collection_name}': {e}")
+            ok = False
+    return ok
+
+
+@job(queue="indexes", unique=True, max_attempts=10, backoff=10.0, timeout=3600)
+def ensure_indexes_job():
+    """
+    Apply the index registry on a job worker.
+
+    Raises:
+        RuntimeError: If any index could not be created, so the job is retried.
+    """
+    if not ensure_indexes():
+        raise RuntimeError("not every index could be created")
+
+
+def ensure_indexes_in_background(retry_interval=10.0):
+    """
+    Apply the index registry from a daemon thread, retrying until MongoDB is reachable,
+    so worker startup never waits on the database. When the job queue is enabled the
+    build is handed to a job worker instead.
+
+    Returns:
+        threading.Thread: The started thread.
+    """
+    def run():
+        if queue_enabled() and ensure_indexes_job.delay() is not None:
+            return
+        while True:
+            try:
+                ensure_indexes()
+                return
+            except Exception as e:
+                logger.warning(f"Could not apply indexes yet: {e}")
+                time.sleep(retry_interval)
+
+    thread = threading.Thread(target=run, name="mongo-ensure-indexes", daemon=True)
+    thread.start()
+    return thread
+
+
+def explain_mode():
+    """
+    Returns:
+        str: "" when plan checks are off, "warn" to log collection scans, "strict" to raise on them.
+    """
+    mode = os.getenv("ORM_EXPLAIN", "").strip().lower()
+    if mode in ("1", "true", "yes", "warn"):
+        return "warn"
+    if mode == "strict":
+        return "strict"
+    return ""
+
+
+_checked_shapes = set()
+
+
+def _query_shape(value):
+    # Field names and operators without the concrete values, so each shape is explained once
+    if isinstance(value, dict):
+        return tuple(sorted((key, _query_shape(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_query_shape(item) for item in value)
+    return None
+
+
+def _plan_stages(plan):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def check_query_plan(db, collection_name, query, sort=None):
+    """
+    Run explain() on a query and flag collection scans (dev/test only, see ORM_EXPLAIN).
+
+    Unfiltered, unsorted reads are expected to scan and are not checked.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        collection_name (str): The name of the collection.
+        query (dict): The query filter.
+        sort (list, optional): (key, direction) pairs.
+
+    Returns:
+        bool: False if the winning plan contains a COLLSCAN, True otherwise.
+
+    Raises:
+        QueryPlanError: In strict mode, when the plan scans the collection.
+    """
+    mode = explain_mode()
+    if not mode or (not query and not sort):
+        return True
+    shape = (collection_name, _query_shape(query or {}), _query_shape(sort or []))
+    if shape in _checked_shapes:
+        return True
+
+    try:
+        cursor = db[collection_name].find(query or {})
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+    except Exception as e:
+        logger.warning(f"Could not explain query on collection '{collection_name}': {e}")
+        return True
+
+    if "COLLSCAN" not in set(_plan_stages(plan)):
+        _checked_shapes.add(shape)
+        return True
+    message = f"Query on collection '{collection_name}' scans the whole collection: filter={query} sort={sort}"
+    if mode == "strict":
+        raise QueryPlanError(message)
+    _checked_shapes.add(shape)
+    logger.warning(message)
+    return False
@@ -0,0 +1,432 @@
+"""
+Redis-backed background job queue.
+
+Slow or deferrable work (rollup rebuilds, index builds, exports, notifications) is
+enqueued from request threads and run by separate worker processes:
+
+    python -m modules.jobs worker                     # every queue with its default threads
+    python -m modules.jobs worker --queue rollups=2 --limit indexes=1
+    python -m modules.jobs stats
+    python -m modules.jobs retry-dead rollups
+
+Each queue is a Redis list. A worker moves a job atomically into its own processing
+list while running it (BLMOVE), so a crashed worker's jobs are put back by the
+other workers once its heartbeat expires. Failed jobs are retried with exponential
+backoff from a delayed sorted set and moved to the queue's dead-letter list after
+their last attempt.
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import dotenv
+
+from modules.connections import get_redis_client
+from modules.custom_logger import create_logger
+from modules.metrics import JOB_QUEUE_DEPTH, JOB_SECONDS, JOBS_ENQUEUED, JOBS_FINISHED, start_metrics_server
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+PREFIX = os.getenv("JOB_QUEUE_PREFIX", "jobs")
+# Threads per queue in each worker process; notifications is reserved for that feature
+DEFAULT_CONCURRENCY = {"rollups": 1, "indexes": 1, "exports": 2, "notifications": 4, "default": 2}
+# Modules whose @job functions a worker imports so it can run them
+JOB_MODULES = ("modules.rollups", "modules.indexes", "modules.exports")
+HEARTBEAT_TTL = 30
+REAP_INTERVAL = 30
+STATS_INTERVAL = 5
+
+# Cluster-wide concurrency cap: drop expired leases, then take a slot if one is free
+ACQUIRE_SLOT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+def queue_enabled():
+    """
+    Returns:
+        bool: True if deferrable work goes to the job queue (JOB_QUEUE_ENABLED), False to run it inline.
+    """
+    return os.getenv("JOB_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _key(*parts):
+    return ":".join((PREFIX,) + parts)
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """
+    A registered job function.
+
+    Attributes:
+        name (str): The name jobs are enqueued under.
+        function (callable): The function run by the worker; arguments must be JSON-serializable.
+        queue (str): The queue the job is sent to.
+        max_attempts (int): Attempts before the job is dead-lettered.
+        backoff (float): Seconds before the first retry; doubled for every further retry.
+        timeout (int): Seconds a run is expected to take at most (bounds uniqueness and slot leases).
+        unique (bool): Skip enqueueing while an identical job is still waiting.
+    """
+    name: str
+    function: callable
+    queue: str = "default"
+    max_attempts: int = 3
+    backoff: float = 5.0
+    timeout: int = 300
+    unique: bool = False
+
+
+_registry = {}
+
+
+def job(name=None, queue="default", max_attempts=3, backoff=5.0, timeout=300, unique=False):
+    """
+    Register a function as a background job.
+
+    The decorated function is unchanged; `function.delay(*args, **kwargs)` enqueues it.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(function):
+        spec = JobSpec(name or function.__name__, function, queue, max_attempts, backoff, timeout, unique)
+        _registry[spec.name] = spec
+        function.spec = spec
+        function.delay = lambda *args, **kwargs: enqueue(spec.name, *args, **kwargs)
+        return function
+    return decorator
+
+
+def enqueue(name, *args, **kwargs):
+    """
+    Send a registered job to its queue.
+
+    Args:
+        name (str): The job's registered name.
+        *args, **kwargs: JSON-serializable arguments for the job function.
+
+    Returns:
+        str: The job id, "" if an identical unique job is already waiting, or None if it could not be enqueued.
+    """
+    spec = _registry.get(name)
+    if spec is None:
+        logger.error(f"Cannot enqueue unknown job '{name}'.")
+        return None
+    client = get_redis_client()
+    payload = {
+        "id": uuid.uuid4().hex,
+        "job": name,
+        "queue": spec.queue,
+        "args": list(args),
+        "kwargs": kwargs,
+        "attempt": 0,
+        "enqueued_at": time.time(),
+        "unique": None,
+    }
+    try:
+        if spec.unique:
+            payload["unique"] = _key("unique", name, json.dumps([args, kwargs], sort_keys=True, default=str))
+            if not client.set(payload["unique"], payload["id"], nx=True, ex=spec.timeout):
+                return ""
+        client.lpush(_key("ready", spec.queue), json.dumps(payload))
+    except Exception as e:
+        logger.error(f"Failed to enqueue job '{name}': {e}")
+        return None
+    JOBS_ENQUEUED.labels(spec.queue, name).inc()
+    return payload["id"]
+
+
+def queue_stats(queues=None, client=None):
+    """
+    Count the jobs of each queue by state.
+
+    Returns:
+        dict: queue -> {"ready", "delayed", "running", "dead"}.
+    """
+    client = client or get_redis_client()
+    stats = {}
+    for queue in queues or DEFAULT_CONCURRENCY:
+        running = sum(client.llen(key) for key in client.scan_iter(_key("processing", queue, "*"), count=100))
+        stats[queue] = {
+            "ready": client.llen(_key("ready", queue)),
+            "delayed": client.zcard(_key("delayed", queue)),
+            "running": running,
+            "dead": client.llen(_key("dead", queue)),
+        }
+    return stats
+
+
+def retry_dead(queue, client=None):
+    """
+    Move a queue's dead-lettered jobs back to the queue with their attempts reset.
+
+    Returns:
+        int: The number of jobs requeued.
+    """
+    client = client or get_redis_client()
+    moved = 0
+    while (raw := client.rpop(_key("dead", queue))) is not None:
+        payload = json.loads(raw)
+        payload.update(attempt=0, error=None)
+        client.lpush(_key("ready", queue), json.dumps(payload))
+        moved += 1
+    return moved
+
+
+class JobWorker:
+    """
+    Runs jobs from one or more queues with a fixed number of threads per queue.
+
+    Besides the consumer threads, the worker's main loop keeps a heartbeat,
+    moves due retries from the delayed sets back to their queues, requeues the
+    jobs of workers whose heartbeat expired and publishes the queue depths.
+
+    Attributes:
+        concurrency (dict): queue -> consumer threads in this process.
+        limits (dict): queue -> jobs allowed to run at once across all workers.
+        id (str): This worker's id (host:pid:suffix).
+    """
+
+    def __init__(self, concurrency=None, limits=None, client=None, poll_timeout=1):
+        self.concurrency = dict(concurrency or DEFAULT_CONCURRENCY)
+        self.limits = dict(limits or {})
+        self.client = client or get_redis_client()
+        self.poll_timeout = poll_timeout
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._acquire_slot = self.client.register_script(ACQUIRE_SLOT)
+
+    def _processing(self, queue, worker_id=None):
+        return _key("processing", queue, worker_id or self.id)
+
+    def _lease_seconds(self, queue):
+        return max([spec.timeout for spec in _registry.values() if spec.queue == queue] or [300])
+
+    def stop(self):
+        """
+        Ask the worker to stop; running jobs are finished first.
+        """
+        self._stop.set()
+
+    def run(self):
+        """
+        Consume the queues until stop() is called.
+        """
+        threads = [
+            threading.Thread(target=self._consume, args=(queue,), name=f"job-{queue}-{number}", daemon=True)
+            for queue, count in self.concurrency.items() for number in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info(f"Job worker {self.id} started: {self.concurrency}.")
+        last_reap = last_stats = 0.0
+        while not self._stop.is_set():
+            try:
+                self.client.set(_key("worker", self.id), "1", ex=HEARTBEAT_TTL)
+                self.client.sadd(_key("workers"), self.id)
+                self.promote_delayed()
+                if time.monotonic() - last_reap >= REAP_INTERVAL:
+                    last_reap = time.monotonic()
+                    self.reap()
+                if time.monotonic() - last_stats >= STATS_INTERVAL:
+                    last_stats = time.monotonic()
+                    for queue, counts in queue_stats(self.concurrency, self.client).items():
+                        for state, count in counts.items():
+                            JOB_QUEUE_DEPTH.labels(queue, state).set(count)
+            except Exception as e:
+                logger.error(f"Job worker maintenance failed: {e}")
+            self._stop.wait(1)
+        for thread in threads:
+            thread.join()
+        self.client.delete(_key("worker", self.id))
+        self.client.srem(_key("workers"), self.id)
+        logger.info(f"Job worker {self.id} stopped.")
+
+    def _consume(self, queue):
+        while not self._stop.is_set():
+            try:
+                if self.run_once(queue) == "busy":
+                    self._stop.wait(self.poll_timeout)
+            except Exception as e:
+                logger.error(f"Job consumer for '{queue}' failed: {e}")
+                self._stop.wait(self.poll_timeout)
+
+    def run_once(self, queue):
+        """
+        Take one job from `queue`, waiting up to poll_timeout for one, and run it.
+
+        Args:
+            queue (str): The queue to take the job from.
+
+        Returns:
+            str: The job's outcome (see execute), None if the queue stayed empty,
+                or "busy" if the queue's cluster-wide limit is reached.
+        """
+        limit = self.limits.get(queue)
+        slot = None
+        try:
+            if limit:
+                slot = uuid.uuid4().hex
+                now = time.time()
+                if not self._acquire_slot(keys=[_key("running", queue)],
+                                          args=[now, now + self._lease_seconds(queue), limit, slot]):
+                    slot = None
+                    return "busy"
+            raw = self.client.blmove(_key("ready", queue), self._processing(queue), self.poll_timeout,
+                                     src="RIGHT", dest="LEFT")
+            return self.execute(queue, raw) if raw is not None else None
+        finally:
+            if slot is not None:
+                self.client.zrem(_key("running", queue), slot)
+
+    def execute(self, queue, raw):
+        """
+        Run one job taken from `queue`, then retry, dead-letter or drop it.
+
+        Args:
+            queue (str): The queue it was taken from.
+            raw (bytes): The job as stored in the processing list.
+
+        Returns:
+            str: "succeeded", "retried" or "dead".
+        """
+        payload = json.loads(raw)
+        spec = _registry.get(payload["job"])
+        if payload.get("unique"):
+            # Requests made while this run is in progress must enqueue a new run
+            self.client.delete(payload["unique"])
+        started = time.perf_counter()
+        try:
+            if spec is None:
+                raise LookupError(f"unknown job '{payload['job']}'")
+            spec.function(*payload["args"], **payload["kwargs"])
+            outcome = "succeeded"
+        except Exception as e:
+            payload["attempt"] += 1
+            payload["error"] = f"{type(e).__name__}: {e}"
+            max_attempts = spec.max_attempts if spec is not None else 1
+            pipeline = self.client.pipeline()
+            if payload["attempt"] >= max_attempts:
+                payload["failed_at"] = time.time()
+                pipeline.lpush(_key("dead", queue), json.dumps(payload))
+                outcome = "dead"
+                logger.error(f"Job {payload['job']} ({payload['id']}) failed {payload['attempt']} times, "
+                             f"dead-lettered: {payload['error']}")
+            else:
+                delay = spec.backoff * 2 ** (payload["attempt"] - 1) * random.uniform(0.8, 1.2)
+                pipeline.zadd(_key("delayed", queue), {json.dumps(payload): time.time() + delay})
+                outcome = "retried"
+                logger.warning(f"Job {payload['job']} ({payload['id']}) failed, retrying in {delay:.0f} s: "
+                               f"{payload['error']}")
+            pipeline.lrem(self._processing(queue), 1, raw)
+            pipeline.execute()
+        else:
+            self.client.lrem(self._processing(queue), 1, raw)
+        finally:
+            JOB_SECONDS.labels(queue, payload["job"]).observe(time.perf_counter() - started)
+        JOBS_FINISHED.labels(queue, payload["job"], outcome).inc()
+        return outcome
+
+    def promote_delayed(self, batch_size=100):
+        """
+        Move retries whose backoff has elapsed back to their queues.
+
+        Returns:
+            int: The number of jobs moved.
+        """
+        moved = 0
+        now = time.time()
+        for queue in self.concurrency:
+            for raw in self.client.zrangebyscore(_key("delayed", queue), "-inf", now, start=0, num=batch_size):
+                # Only the worker whose ZREM succeeds requeues the job
+                if self.client.zrem(_key("delayed", queue), raw):
+                    self.client.lpush(_key("ready", queue), raw)
+                    moved += 1
+        return moved
+
+    def reap(self):
+        """
+        Requeue the jobs held by workers whose heartbeat expired.
+
+        Returns:
+            int: The number of jobs requeued.
+        """
+        requeued = 0
+        for worker_id in self.client.smembers(_key("workers")):
+            worker_id = worker_id.decode() if isinstance(worker_id, bytes) else worker_id
+            if worker_id == self.id or self.client.exists(_key("worker", worker_id)):
+                continue
+            for queue in set(self.concurrency) | set(DEFAULT_CONCURRENCY):
+                while self.client.lmove(self._processing(queue, worker_id), _key("ready", queue), "RIGHT", "LEFT"):
+                    requeued += 1
+            self.client.srem(_key("workers"), worker_id)
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs of stopped workers.")
+        return requeued
+
+
+def _queue_counts(values):
+    counts = {}
+    for value in values or []:
+        queue, _, count = value.partition("=")
+        counts[queue] = int(count or 1)
+    return counts
+
+
+def main(argv=None):
+    """
+    Command line entry point: run a worker, print queue stats or requeue dead jobs.
+
+    Args:
+        argv (list, optional): The arguments (default: sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description="Run or inspect the background job queues.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker_parser = commands.add_parser("worker", help="Run jobs until interrupted.")
+    worker_parser.add_argument("--queue", action="append", metavar="NAME=THREADS",
+                               help="Queue to consume and its thread count (repeatable; default: every queue).")
+    worker_parser.add_argument("--limit", action="append", metavar="NAME=N",
+                               help="Jobs of a queue allowed to run at once across all workers (repeatable).")
+    worker_parser.add_argument("--metrics-port", type=int, default=int(os.getenv("JOB_WORKER_METRICS_PORT", 9101)),
+                               help="Port for /metrics (0 disables).")
+    commands.add_parser("stats", help="Print the jobs per queue and state.")
+    retry_parser = commands.add_parser("retry-dead", help="Requeue a queue's dead-lettered jobs.")
+    retry_parser.add_argument("queue")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print(json.dumps(queue_stats(), indent=2))
+    elif args.command == "retry-dead":
+        print(f"Requeued {retry_dead(args.queue)} jobs.")
+    else:
+        for module in JOB_MODULES:
+            importlib.import_module(module)
+        worker = JobWorker(_queue_counts(args.queue) or None, _queue_counts(args.limit))
+        if args.metrics_port:
+            start_metrics_server(args.metrics_port)
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        signal.signal(signal.SIGINT, lambda *_: worker.stop())
+        worker.run()
+
+
+if __name__ == "__main__":
+    # Under `python -m` this file runs as __main__, a second copy of the module. The
+    # JOB_MODULES register their jobs in modules.jobs, so the CLI must run from there.
+    from modules import jobs
+    jobs.main()
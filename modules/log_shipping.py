@@ -0,0 +1,247 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler
+
+import requests
+
+# Counters are process-local; read them with get_log_shipping_stats()
+_stats_lock = threading.Lock()
+_stats = {"enqueued": 0, "shipped": 0, "dropped": 0, "spilled": 0, "replayed": 0, "failed_pushes": 0}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def get_log_shipping_stats():
+    """
+    Returns:
+        dict: Counters for records enqueued, shipped to Loki, dropped, spilled to disk and replayed,
+        plus the number of failed pushes.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the logging thread: when the queue is full the
+    record is handed to the shipper's overflow policy (spill to disk or drop).
+    """
+
+    def __init__(self, log_queue, shipper):
+        super().__init__(log_queue)
+        self.shipper = shipper
+
+    def enqueue(self, record):
+        self.shipper.ensure_running()
+        try:
+            self.queue.put_nowait(record)
+            _count("enqueued")
+        except queue.Full:
+            self.shipper.overflow([record])
+
+
+class LokiBatchShipper:
+    """
+    Background thread that drains log records from a bounded queue and pushes them
+    to Loki in batches, so request threads never wait on Loki.
+
+    Batches are sent when `batch_size` records are waiting or `flush_interval`
+    seconds have passed. If Loki is slow or down, batches are appended to
+    `spill_path` (up to `spill_max_bytes`) and replayed after the next successful
+    push; without a spill file, or once it is full, they are dropped.
+    """
+
+    def __init__(self, url, tags, auth=None, formatter=None, queue_size=10_000, batch_size=500,
+                 flush_interval=2.0, timeout=5.0, spill_path=None, spill_max_bytes=50_000_000):
+        self.url = url
+        self.tags = tags
+        self.auth = auth
+        self.formatter = formatter or logging.Formatter()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._session = None
+        self._stop = threading.Event()
+
+    def handler(self):
+        """
+        Returns:
+            logging.Handler: A non-blocking handler feeding this shipper.
+        """
+        return DroppingQueueHandler(self.queue, self)
+
+    def ensure_running(self):
+        """
+        Start the shipping thread in this process (again after a fork).
+        """
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._session = requests.Session()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="loki-shipper", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._ship(batch)
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _payload(self, records):
+        streams = {}
+        for record in records:
+            labels = (record.levelname.lower(), record.name)
+            line = self.formatter.format(record)
+            streams.setdefault(labels, []).append([str(int(record.created * 1e9)), line])
+        return {
+            "streams": [
+                {"stream": {**self.tags, "severity": level, "logger": name}, "values": values}
+                for (level, name), values in streams.items()
+            ]
+        }
+
+    def _push(self, payload):
+        try:
+            response = self._session.post(self.url, json=payload, auth=self.auth, timeout=self.timeout)
+            if response.status_code < 300:
+                return True
+        except requests.RequestException:
+            pass
+        _count("failed_pushes")
+        return False
+
+    def _ship(self, records):
+        payload = self._payload(records)
+        if self._push(payload):
+            _count("shipped", len(records))
+            self._replay_spill()
+        else:
+            self._spill(payload, len(records))
+
+    def overflow(self, records):
+        """
+        Handle records that did not fit in the queue.
+        """
+        self._spill(self._payload(records), len(records))
+
+    def _spill(self, payload, count):
+        if self.spill_path:
+            line = json.dumps(payload) + "\n"
+            with self._spill_lock:
+                try:
+                    size = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0
+                    if size + len(line) <= self.spill_max_bytes:
+                        with open(self.spill_path, "a", encoding="utf-8") as f:
+                            f.write(line)
+                        _count("spilled", count)
+                        return
+                except OSError:
+                    pass
+        _count("dropped", count)
+
+    def _replay_spill(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with self._spill_lock:
+            replaying = f"{self.spill_path}.replay"
+            try:
+                os.replace(self.spill_path, replaying)
+            except OSError:
+                return
+        with open(replaying, encoding="utf-8") as f:
+            pending = f.readlines()
+        os.remove(replaying)
+        for index, line in enumerate(pending):
+            payload = json.loads(line)
+            count = sum(len(stream["values"]) for stream in payload["streams"])
+            if self._push(payload):
+                _count("replayed", count)
+            else:
+                # Loki went away again; put the rest back on disk
+                for rest in pending[index:]:
+                    rest_payload = json.loads(rest)
+                    self._spill(rest_payload, sum(len(stream["values"]) for stream in rest_payload["streams"]))
+                return
+
+    def flush(self, timeout=5.0):
+        """
+        Ship whatever is queued right now (used at interpreter exit).
+        """
+        deadline = time.monotonic() + timeout
+        records = []
+        while time.monotonic() < deadline:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if records:
+            if self._session is None:
+                self._session = requests.Session()
+            self._ship(records)
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+
+def create_loki_handler(url, tags, auth=None, formatter=None):
+    """
+    Build a non-blocking, batching Loki handler configured from the environment.
+
+    Environment:
+        LOKI_QUEUE_SIZE: Records buffered in memory before spilling or dropping (default 10000).
+        LOKI_BATCH_SIZE: Records per push (default 500).
+        LOKI_FLUSH_INTERVAL_S: Longest a record waits before being pushed (default 2).
+        LOKI_TIMEOUT_S: HTTP timeout per push (default 5).
+        LOKI_SPILL_PATH: File for batches Loki could not take; unset to drop them instead.
+        LOKI_SPILL_MAX_BYTES: Size cap of the spill file (default 50 MB).
+
+    Returns:
+        logging.Handler: The handler to attach to a logger.
+    """
+    shipper = LokiBatchShipper(
+        url=url,
+        tags=tags,
+        auth=auth,
+        formatter=formatter,
+        queue_size=int(os.getenv("LOKI_QUEUE_SIZE", 10_000)),
+        batch_size=int(os.getenv("LOKI_BATCH_SIZE", 500)),
+        flush_interval=float(os.getenv("LOKI_FLUSH_INTERVAL_S", 2)),
+        timeout=float(os.getenv("LOKI_TIMEOUT_S", 5)),
+        spill_path=os.getenv("LOKI_SPILL_PATH") or None,
+        spill_max_bytes=int(os.getenv("LOKI_SPILL_MAX_BYTES", 50_000_000)),
+    )
+    atexit.register(shipper.stop)
+    return shipper.handler()
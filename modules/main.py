@@ -1,78 +1,128 @@
+"""
+Application factory.
+
+Importing this module is cheap and opens no connection. create_app() builds the
+Flask server and the Dash app, registers the pages and callbacks and starts the
+background services. MongoDB and Redis clients connect on first use, so a slow or
+unreachable dependency delays the first request that needs it, not worker boot.
+"""
 import os
-import json
-import dash
-import redis
 import random
-import sys
-
-from dash import Dash, html, dcc
-from flask import Flask
-import dash_bootstrap_components as dbc
+import threading
 
 from modules.custom_logger import create_logger
-from modules.callbacks import register_callbacks
-
-stylesheets = [
-    dbc.themes.FLATLY,
-    "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css",
-]
 
 logger = create_logger()
 
+_server = None
+_server_lock = threading.Lock()
+
+
+def _navbar_layout():
+    import dash
+    import dash_bootstrap_components as dbc
+    from dash import dcc, html
+
+    return html.Div(
+        [
+            dbc.NavbarSimple(
+                children=[
+                    dbc.NavItem(dbc.NavLink("Home", href="/", active="exact")),
+                    dbc.NavItem(dbc.NavLink("Goals", href="/goals", active="exact")),
+                    dbc.NavItem(dbc.NavLink("Mood Journal", href="/mood-journal", active="exact")),
+                    dbc.NavItem(dbc.NavLink("Mood Trends", href="/mood-analytics", active="exact")),
+                    dbc.NavItem(dbc.NavLink("Tasks", href="/tasks", active="exact")),
+                    dbc.NavItem(dbc.NavLink("Time", href="/time", active="exact")),
+                    dbc.NavItem(dbc.NavLink("Logout", id="logout-link")),
+                    dbc.Label(className="fa fa-moon", html_for="switch"),
+                    dbc.Switch(id="switch", value=True, className="d-inline-block ms-1", persistence=True),
+                    dbc.Label(className="fa fa-sun", html_for="switch"),
+                ],
+                brand="Human Flow Task Manager",
+                brand_href="/",
+                color="primary",
+                dark=True,
+                expand="lg",
+            ),
+            # Hidden Div for clientside callback
+            html.Div(id='theme-output', style={'display': 'none'}),
+            dcc.Location(id='url', refresh=False),
+            # Page content will be rendered by the callback
+            dash.page_container,
+        ]
+    )
+
+
+def start_background_services():
+    """
+    Start this process's background threads: the MongoDB health probe, the time event
+    writer and the index build. None of them blocks; each connects on its own thread.
+    """
+    from modules.health import get_health_monitor
+    from modules.indexes import ensure_indexes_in_background
+    from modules.time_tracking import get_time_event_log
+
+    # Callbacks only read the probe's cached state
+    get_health_monitor().start()
+    # Buffered time events are written and compacted in the background
+    get_time_event_log().start()
+    # Applied on a job worker when the queue is enabled
+    ensure_indexes_in_background()
+
+
+def create_app():
+    """
+    Build the application once per process and return its Flask server.
+
+    Dash keeps its page registry in module globals, so later calls return the same server.
+
+    Returns:
+        Flask: The WSGI application.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        import dash_bootstrap_components as dbc
+        from dash import Dash
+        from flask import Flask
+
+        from modules.callbacks import register_callbacks
+        from modules.connections import get_redis_client
+        from modules.metrics import register_metrics
+        from modules.rate_limit import register_rate_limits
+        from modules.sessions import register_sessions
+
+        server = Flask(__name__)
+        server.secret_key = os.getenv("SECRET_KEY", str(random.randint(0, 1000000000)))
+
+        # Pages are discovered here; their layouts are functions rendered per request
+        app = Dash(
+            __name__,
+            server=server,
+            suppress_callback_exceptions=True,
+            use_pages=True,
+            pages_folder='pages',
+            title='Dash App',
+            update_title='Loading...',
+            external_stylesheets=[
+                dbc.themes.FLATLY,
+                "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css",
+            ]
+        )
+        app.layout = _navbar_layout()
+
+        # Creating the client does not connect (REDIS_HOST / REDIS_PORT)
+        redis_client = get_redis_client()
 
+        # Request timing must be registered before the auth hook in register_callbacks
+        register_metrics(server, redis_client)
+        register_sessions(server, redis_client)
+        register_rate_limits(server)
+        register_callbacks(app, server, redis_client)
 
-server = Flask(__name__)
-server.secret_key = os.getenv("SECRET_KEY", str(random.randint(0, 1000000000)))
-
-app = Dash(
-    __name__,
-    server=server,
-    suppress_callback_exceptions=True,
-    use_pages=True,
-    pages_folder='pages',
-    title='Dash App',
-    update_title='Loading...',
-    external_stylesheets=stylesheets
-)
-
-app.layout = html.Div(
-    [
-        dbc.NavbarSimple(
-            children=[
-                dbc.NavItem(dbc.NavLink("Home", href="/", active="exact")),
-                dbc.NavItem(dbc.NavLink("Goals", href="/goals", active="exact")),
-                dbc.NavItem(dbc.NavLink("Mood Journal", href="/mood-journal", active="exact")),
-                dbc.NavItem(dbc.NavLink("Tasks", href="/tasks", active="exact")),
-                dbc.NavItem(dbc.NavLink("Logout", id="logout-link")),
-                dbc.Label(className="fa fa-moon", html_for="switch"),
-                dbc.Switch(id="switch", value=True, className="d-inline-block ms-1", persistence=True),
-                dbc.Label(className="fa fa-sun", html_for="switch"),
-            ],
-            brand="Human Flow Task Manager",
-            brand_href="/",
-            color="primary",
-            dark=True,
-            expand="lg",
-        ),
-        # Hidden Div for clientside callback
-        html.Div(id='theme-output', style={'display': 'none'}),
-        dcc.Location(id='url', refresh=False),
-        # Page content will be rendered by the callback
-        dash.page_container,
-    ]
-)
-
-# Redis config
-redis_host = os.getenv('REDIS_HOST', 'redis')
-redis_port = int(os.getenv('REDIS_PORT', 6379))
-redis_client = redis.Redis(host=redis_host, port=redis_port, db=0)
-
-# Verify Redis
-try:
-    redis_client.ping()
-    logger.info("Successfully connected to Redis.")
-except redis.ConnectionError as e:
-    logger.error(f"Failed to connect to Redis: {e}")
-
-
-register_callbacks(app, server, redis_client)
\ No newline at end of file
+        start_background_services()
+        _server = server
+        logger.info("Application created.")
+        return server
@@ -0,0 +1,211 @@
+"""
+Prometheus metrics for Flask requests, Dash callbacks, ORM operations, connection pools and background jobs.
+
+With several gunicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty, writable
+directory shared by the workers (gunicorn.conf.py clears it at startup and marks
+dead workers); /metrics then aggregates every worker's samples.
+"""
+import functools
+import os
+import time
+
+import dash
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from pymongo import monitoring
+
+from modules.custom_logger import create_logger
+
+logger = create_logger()
+
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    # Samples are written to files in this directory; it must exist before the first metric update
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Latency buckets in seconds, from a cached read to a stalled request
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Flask request latency.", ["method", "endpoint", "status"], buckets=BUCKETS
+)
+DASH_CALLBACK_SECONDS = Histogram(
+    "dash_callback_duration_seconds", "Dash callback latency.", ["callback"], buckets=BUCKETS
+)
+DASH_CALLBACK_ERRORS = Counter(
+    "dash_callback_errors_total", "Dash callbacks that raised an exception.", ["callback"]
+)
+ORM_OPERATION_SECONDS = Histogram(
+    "orm_operation_duration_seconds", "CustomORM operation latency.", ["operation", "collection"], buckets=BUCKETS
+)
+ORM_OPERATION_ERRORS = Counter(
+    "orm_operation_errors_total", "CustomORM operations that failed.", ["operation", "collection"]
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections", "MongoDB pool connections by state.", ["state"], multiprocess_mode="livesum"
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "MongoDB connection checkouts that failed.", ["reason"]
+)
+REDIS_POOL_CONNECTIONS = Gauge(
+    "redis_pool_connections", "Redis pool connections by state.", ["state"], multiprocess_mode="livesum"
+)
+JOBS_ENQUEUED = Counter("jobs_enqueued_total", "Background jobs enqueued.", ["queue", "job"])
+JOBS_FINISHED = Counter(
+    "jobs_finished_total", "Background job attempts by outcome (succeeded, retried, dead).", ["queue", "job", "outcome"]
+)
+JOB_SECONDS = Histogram(
+    "job_duration_seconds", "Background job run time.", ["queue", "job"],
+    buckets=BUCKETS + (30.0, 60.0, 300.0, 900.0)
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth", "Jobs per queue and state (ready, delayed, running, dead).", ["queue", "state"],
+    multiprocess_mode="max"
+)
+
+
+def observe_orm_operation(operation, collection_name, duration_seconds, failed=False):
+    """
+    Record one CustomORM operation.
+    """
+    ORM_OPERATION_SECONDS.labels(operation, collection_name).observe(duration_seconds)
+    if failed:
+        ORM_OPERATION_ERRORS.labels(operation, collection_name).inc()
+
+
+def timed_callback(function):
+    """
+    Wrap a Dash callback so its latency and failures are recorded under its function name.
+    PreventUpdate is normal control flow and does not count as a failure.
+    """
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except dash.exceptions.PreventUpdate:
+            raise
+        except Exception:
+            DASH_CALLBACK_ERRORS.labels(name).inc()
+            raise
+        finally:
+            DASH_CALLBACK_SECONDS.labels(name).observe(time.perf_counter() - started)
+    return wrapper
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Tracks open and checked-out MongoDB connections from pymongo's pool events.
+    """
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels("open").inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels("open").dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CONNECTIONS.labels("checked_out").inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS.labels("checked_out").dec()
+
+
+def update_redis_pool_metrics(client):
+    """
+    Copy the Redis connection pool's counters into gauges (cheap attribute reads).
+    """
+    pool = client.connection_pool
+    in_use = len(getattr(pool, "_in_use_connections", ()))
+    available = len(getattr(pool, "_available_connections", ()))
+    REDIS_POOL_CONNECTIONS.labels("in_use").set(in_use)
+    REDIS_POOL_CONNECTIONS.labels("idle").set(available)
+
+
+def metrics_response():
+    """
+    Render all metrics, aggregated across workers when running in multiprocess mode.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+
+def start_metrics_server(port):
+    """
+    Serve /metrics on its own port, for processes without a Flask app (e.g. job workers).
+
+    Args:
+        port (int): The port to listen on.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+    logger.info(f"Metrics served on port {port}.")
+
+
+def register_metrics(server, redis_client=None):
+    """
+    Time every Flask request and serve /metrics.
+
+    Args:
+        server (Flask): The Flask app.
+        redis_client (redis.Redis, optional): Client whose pool is reported on each request.
+    """
+    @server.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @server.after_request
+    def observe_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(request.method, endpoint, response.status_code).observe(
+                time.perf_counter() - started
+            )
+        if redis_client is not None:
+            update_redis_pool_metrics(redis_client)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        return metrics_response()
+
+    logger.info("Metrics enabled at /metrics.")
@@ -0,0 +1,260 @@
+import argparse
+import collections
+import datetime
+
+import dotenv
+from pymongo import UpdateOne
+
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+# Kept up to date by CustomORM writes to mood_journal (see modules.rollups)
+ROLLUP_COLLECTION = "mood_rollups"
+PERIODS = ("day", "week", "month")
+# Only these fields are needed to maintain the rollups (pre-images of updates/deletes)
+ROLLUP_FIELDS = {"_id": 1, "date": 1, "mood": 1}
+META_ID = "meta"
+
+_built_databases = set()
+
+
+def _day(value):
+    # Journal dates are "YYYY-MM-DD" strings; anything else is not counted
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _mood(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 1 <= value <= 10:
+        return None
+    return int(value)
+
+
+def period_start(day, period):
+    """
+    Return the first day of the period containing `day`.
+
+    Args:
+        day (date): The entry's date.
+        period (str): "day", "week" (ISO weeks, starting Monday) or "month".
+
+    Returns:
+        str: The period's first day as "YYYY-MM-DD".
+    """
+    if period == "week":
+        day = day - datetime.timedelta(days=day.weekday())
+    elif period == "month":
+        day = day.replace(day=1)
+    return day.isoformat()
+
+
+def rollup_keys(day):
+    """
+    Returns:
+        list: (rollup _id, period, start) for every rollup an entry on `day` counts towards.
+    """
+    keys = [(f"{period}:{period_start(day, period)}", period, period_start(day, period)) for period in PERIODS]
+    return keys + [("all", "all", "")]
+
+
+def rollup_deltas(removed=(), added=()):
+    """
+    Fold removed and added journal entries into per-rollup increments.
+
+    Args:
+        removed (iterable): Entries (with date and mood) that no longer count.
+        added (iterable): Entries that now count.
+
+    Returns:
+        dict: rollup _id -> {"period", "start", "count", "sum", "hist": {mood: n}}, zero deltas omitted.
+    """
+    deltas = {}
+    for sign, documents in ((-1, removed), (1, added)):
+        for document in documents:
+            day, mood = _day(document.get("date")), _mood(document.get("mood"))
+            if day is None or mood is None:
+                continue
+            for key, period, start in rollup_keys(day):
+                delta = deltas.setdefault(key, {"period": period, "start": start, "count": 0, "sum": 0, "hist": {}})
+                delta["count"] += sign
+                delta["sum"] += sign * mood
+                delta["hist"][str(mood)] = delta["hist"].get(str(mood), 0) + sign
+    for key in [key for key, delta in deltas.items() if not delta["count"] and not delta["sum"]
+                and not any(delta["hist"].values())]:
+        del deltas[key]
+    return deltas
+
+
+def apply_rollup_changes(db, removed=(), added=()):
+    """
+    Update the materialized rollups for entries removed from and/or added to the journal.
+
+    Each affected rollup is changed with an atomic $inc, so concurrent writers never
+    lose updates and the cost is independent of the journal's size.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        removed (iterable): Pre-images of deleted entries, or of updated entries before the update.
+        added (iterable): Inserted entries, or updated entries after the update.
+
+    Returns:
+        bool: True if the rollups were updated, False otherwise.
+    """
+    deltas = rollup_deltas(removed, added)
+    if not deltas:
+        return True
+    operations = []
+    for key, delta in deltas.items():
+        increments = {"count": delta["count"], "sum": delta["sum"]}
+        increments.update({f"hist.{mood}": n for mood, n in delta["hist"].items() if n})
+        operations.append(UpdateOne(
+            {"_id": key},
+            {"$inc": increments, "$setOnInsert": {"period": delta["period"], "start": delta["start"]}},
+            upsert=True,
+        ))
+    try:
+        db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+        if any(delta["count"] < 0 for delta in deltas.values()):
+            db[ROLLUP_COLLECTION].delete_many({"_id": {"$in": list(deltas)}, "count": {"$lte": 0}})
+        return True
+    except Exception as e:
+        logger.error(f"Failed to update mood rollups: {e}")
+        return False
+
+
+def rebuild_rollups(db, source="mood_journal"):
+    """
+    Recompute every rollup from the journal.
+
+    MongoDB groups the journal by day and mood, so only one small document per
+    (day, mood) pair reaches Python; weeks, months and the overall distribution are
+    folded from those. Needed once for journals written before the rollups existed,
+    and after bulk writes.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        source (str): The journal collection.
+
+    Returns:
+        bool: True if the rollups were rebuilt, False otherwise.
+    """
+    pipeline = [
+        {"$match": {"date": {"$type": "string"}, "mood": {"$gte": 1, "$lte": 10}}},
+        # Journal dates are already days ("YYYY-MM-DD"); _day() trims any time part when folding
+        {"$group": {"_id": {"day": "$date", "mood": "$mood"}, "n": {"$sum": 1}}},
+    ]
+    try:
+        rollups = {}
+        for group in db[source].aggregate(pipeline, allowDiskUse=True):
+            day, mood = _day(group["_id"]["day"]), _mood(group["_id"]["mood"])
+            if day is None or mood is None:
+                continue
+            for key, period, start in rollup_keys(day):
+                rollup = rollups.setdefault(key, {"_id": key, "period": period, "start": start,
+                                                  "count": 0, "sum": 0, "hist": {}})
+                rollup["count"] += group["n"]
+                rollup["sum"] += group["n"] * mood
+                rollup["hist"][str(mood)] = rollup["hist"].get(str(mood), 0) + group["n"]
+        db[ROLLUP_COLLECTION].delete_many({})
+        if rollups:
+            db[ROLLUP_COLLECTION].insert_many(list(rollups.values()))
+        db[ROLLUP_COLLECTION].insert_one({
+            "_id": META_ID, "period": "meta", "built_at": datetime.datetime.now(datetime.timezone.utc)
+        })
+        logger.info(f"Rebuilt {len(rollups)} mood rollups from '{source}'.")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to rebuild mood rollups: {e}")
+        return False
+
+
+def ensure_rollups(db):
+    """
+    Build the rollups if they have never been built (e.g. an existing journal).
+
+    Checked once per process and database.
+
+    Args:
+        db (Database): The MongoDB database instance.
+
+    Returns:
+        bool: True if the rollups are available.
+    """
+    if db.name in _built_databases:
+        return True
+    if db[ROLLUP_COLLECTION].find_one({"_id": META_ID}, {"_id": 1}) is None and not rebuild_rollups(db):
+        return False
+    _built_databases.add(db.name)
+    return True
+
+
+def trend_points(rollups):
+    """
+    Turn rollup documents into chart points.
+
+    Args:
+        rollups (list): Rollup documents of one period, ordered by start.
+
+    Returns:
+        list: {"start", "count", "average"} per period.
+    """
+    return [
+        {"start": rollup["start"], "count": rollup["count"], "average": rollup["sum"] / rollup["count"]}
+        for rollup in rollups if rollup.get("count")
+    ]
+
+
+def rolling_mean(daily_rollups, window=7):
+    """
+    Entry-weighted rolling mean over calendar days (days without entries count as empty).
+
+    Args:
+        daily_rollups (list): Daily rollup documents ordered by start.
+        window (int): The window length in days.
+
+    Returns:
+        list: {"start", "average"} for every day that has entries.
+    """
+    points = []
+    window_sum = window_count = 0
+    in_window = collections.deque()
+    for rollup in daily_rollups:
+        if not rollup.get("count"):
+            continue
+        day = datetime.date.fromisoformat(rollup["start"])
+        in_window.append((day, rollup["count"], rollup["sum"]))
+        window_count += rollup["count"]
+        window_sum += rollup["sum"]
+        while in_window[0][0] <= day - datetime.timedelta(days=window):
+            _, count, total = in_window.popleft()
+            window_count -= count
+            window_sum -= total
+        points.append({"start": rollup["start"], "average": window_sum / window_count})
+    return points
+
+
+def distribution(rollup):
+    """
+    Returns:
+        list: The number of entries for each mood 1-10 in a rollup document.
+    """
+    hist = (rollup or {}).get("hist", {})
+    return [max(hist.get(str(mood), 0), 0) for mood in range(1, 11)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the mood journal rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every rollup from the journal.")
+    args = parser.parse_args()
+    from modules.connections import get_database
+
+    database = get_database()
+    ok = rebuild_rollups(database) if args.rebuild else ensure_rollups(database)
+    raise SystemExit(0 if ok else 1)
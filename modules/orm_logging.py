@@ -0,0 +1,118 @@
+import logging
+import os
+import random
+import time
+
+import dotenv
+
+from modules.custom_logger import create_logger
+from modules.metrics import observe_orm_operation
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+
+def _parse_sampling(spec):
+    # "find_many=0.01,find_page=0.1" -> {"find_many": 0.01, "find_page": 0.1}
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = float(rate)
+        except ValueError:
+            logger.warning(f"Ignoring invalid ORM_LOG_SAMPLING entry: {item!r}")
+    return rates
+
+
+class OperationLogger:
+    """
+    Structured, sampled logging for ORM operations.
+
+    Each record carries collection, operation, duration_ms and count as record
+    attributes (see the "orm" extra), so the JSON formatter and Loki can query
+    them. Nothing is formatted unless the level is enabled and the record is
+    sampled; operations slower than `slow_ms` and failures are always logged.
+
+    Environment:
+        ORM_LOG_LEVEL: Level of routine operation records (default DEBUG).
+        ORM_LOG_SAMPLE_RATE: Fraction of routine records kept (default 1.0).
+        ORM_LOG_SAMPLING: Per-operation rates, e.g. "find_many=0.01,insert_one=1".
+        ORM_SLOW_MS: Operations at least this slow are logged at WARNING (default 500).
+    """
+
+    def __init__(self, level=None, sample_rate=None, sampling=None, slow_ms=None):
+        self.level = logging.getLevelName(level or os.getenv("ORM_LOG_LEVEL", "DEBUG").upper())
+        if not isinstance(self.level, int):
+            self.level = logging.DEBUG
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("ORM_LOG_SAMPLE_RATE", 1.0))
+        self.sampling = sampling if sampling is not None else _parse_sampling(os.getenv("ORM_LOG_SAMPLING", ""))
+        self.slow_ms = slow_ms if slow_ms is not None else float(os.getenv("ORM_SLOW_MS", 500))
+
+    def _sampled(self, operation):
+        rate = self.sampling.get(operation, self.sample_rate)
+        return rate >= 1 or random.random() < rate
+
+    def success(self, operation, collection_name, started, count=None, **fields):
+        """
+        Log a completed operation.
+
+        Args:
+            operation (str): The ORM method, e.g. "find_many".
+            collection_name (str): The collection it touched.
+            started (float): time.perf_counter() when the operation began.
+            count (int, optional): Documents returned or written.
+            **fields: Extra structured attributes.
+        """
+        duration_ms = (time.perf_counter() - started) * 1000
+        # Metrics see every operation; only the log record is sampled
+        observe_orm_operation(operation, collection_name, duration_ms / 1000)
+        if duration_ms >= self.slow_ms:
+            level = logging.WARNING
+        elif logger.isEnabledFor(self.level) and self._sampled(operation):
+            level = self.level
+        else:
+            return
+        logger.log(
+            level,
+            "%s on '%s' took %.1f ms (%s documents)",
+            operation, collection_name, duration_ms, "-" if count is None else count,
+            extra={"orm": {
+                "operation": operation,
+                "collection": collection_name,
+                "duration_ms": round(duration_ms, 3),
+                "count": count,
+                **fields,
+            }},
+        )
+
+    def failure(self, operation, collection_name, started, error):
+        """
+        Log a failed operation; failures are never sampled out.
+        """
+        duration_ms = (time.perf_counter() - started) * 1000
+        observe_orm_operation(operation, collection_name, duration_ms / 1000, failed=True)
+        logger.error(
+            "%s on '%s' failed after %.1f ms: %s",
+            operation, collection_name, duration_ms, error,
+            extra={"orm": {
+                "operation": operation,
+                "collection": collection_name,
+                "duration_ms": round(duration_ms, 3),
+                "error": str(error),
+            }},
+        )
+
+
+_operation_logger = None
+
+
+def get_operation_logger():
+    """
+    Returns:
+        OperationLogger: The process-wide ORM operation logger.
+    """
+    global _operation_logger
+    if _operation_logger is None:
+        _operation_logger = OperationLogger()
+    return _operation_logger
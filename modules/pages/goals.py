@@ -1,14 +1,41 @@
 import dash
 import dash_bootstrap_components as dbc
-from dash import html
-
-from modules.custom_logger import create_logger
+from dash import html, dcc
 
 dash.register_page(__name__)
 
-logger = create_logger()
 
-layout = html.Div([
-    html.H1("Welcome to Human Flow Task Manager")
-    
-])
\ No newline at end of file
+def layout(**kwargs):
+    return html.Div([
+        html.H1("Goals", className="text-center"),
+
+        dbc.Alert(id="goals-alert", is_open=False, dismissable=True, duration=5000),
+
+        dbc.Card(
+            dbc.CardBody([
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Input(id="goal-title-input", placeholder="New goal"), md=5),
+                        dbc.Col(dcc.Dropdown(id="goal-parent-input", placeholder="Top-level goal"), md=3),
+                        dbc.Col(dbc.Input(id="goal-due-input", type="date"), md=3),
+                        dbc.Col(dbc.Button("Add", id="goal-add-button", color="primary"), md=1)
+                    ],
+                    className="g-2 mb-2"
+                ),
+                dbc.Row(
+                    [
+                        dbc.Col(dcc.Dropdown(id="goal-selected-input", placeholder="Goal..."), md=5),
+                        dbc.Col(dcc.Dropdown(id="goal-move-parent-input", placeholder="Move to top level"), md=3),
+                        dbc.Col(dbc.Button("Move", id="goal-move-button", color="secondary"), md="auto"),
+                        dbc.Col(dbc.Button("Delete", id="goal-delete-button", color="danger"), md="auto")
+                    ],
+                    className="g-2"
+                )
+            ]),
+            className="my-3"
+        ),
+
+        # Progress is stored on every goal, so the whole tree comes from one read of the goals collection
+        dcc.Loading(html.Div(id="goals-tree")),
+        dcc.Interval(id="goals-interval", interval=30 * 1000, n_intervals=0)
+    ])
@@ -0,0 +1,48 @@
+import dash
+from dash import html, dcc
+import dash_bootstrap_components as dbc
+
+dash.register_page(__name__)
+
+
+def layout(**kwargs):
+    return html.Div([
+        html.H1("Mood Trends", className="text-center"),
+
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.RadioItems(
+                        id="mood-analytics-period",
+                        options=[
+                            {"label": "Daily", "value": "day"},
+                            {"label": "Weekly", "value": "week"},
+                            {"label": "Monthly", "value": "month"}
+                        ],
+                        value="day",
+                        inline=True
+                    ),
+                    width="auto"
+                ),
+                dbc.Col(
+                    dbc.Select(
+                        id="mood-analytics-range",
+                        options=[
+                            {"label": "Last 30 days", "value": "30"},
+                            {"label": "Last 90 days", "value": "90"},
+                            {"label": "Last year", "value": "365"},
+                            {"label": "All time", "value": "all"}
+                        ],
+                        value="90"
+                    ),
+                    width=3
+                ),
+                dbc.Col(dbc.Button("Refresh", id="mood-analytics-refresh", color="primary"), width="auto")
+            ],
+            className="my-3 align-items-center"
+        ),
+
+        # Both charts are read from the precomputed mood_rollups, never from the journal itself
+        dcc.Loading(dcc.Graph(id="mood-analytics-trend")),
+        dcc.Loading(dcc.Graph(id="mood-analytics-distribution"))
+    ])
@@ -0,0 +1,87 @@
+import dash
+from dash import html, dcc, dash_table
+import dash_bootstrap_components as dbc
+
+dash.register_page(__name__)
+
+TASK_TABLE_PAGE_SIZE = 50
+
+
+def layout(**kwargs):
+    return html.Div([
+        html.H1("Tasks", className="text-center"),
+
+        dbc.Alert(id="tasks-alert", is_open=False, dismissable=True, duration=5000),
+
+        dbc.Card(
+            dbc.CardBody(
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Input(id="task-title-input", placeholder="New task"), md=3),
+                        dbc.Col(
+                            dbc.Select(
+                                id="task-priority-input",
+                                options=[{"label": f"Priority {p}", "value": str(p)} for p in range(1, 6)],
+                                value="3"
+                            ),
+                            md=2
+                        ),
+                        dbc.Col(dbc.Input(id="task-due-input", type="date"), md=2),
+                        dbc.Col(dcc.Dropdown(id="task-goal-input", placeholder="Goal..."), md=2),
+                        dbc.Col(
+                            # Options are searched on the server, so users with many tasks get a short list
+                            dcc.Dropdown(id="task-depends-input", multi=True, placeholder="Depends on..."),
+                            md=2
+                        ),
+                        dbc.Col(dbc.Button("Add", id="task-add-button", color="primary"), md=1)
+                    ],
+                    className="g-2"
+                )
+            ),
+            className="my-3"
+        ),
+
+        html.H4("Ready now"),
+        dash_table.DataTable(
+            id="tasks-ready-table",
+            columns=[
+                {"name": "Task", "id": "title"},
+                {"name": "Priority", "id": "priority", "type": "numeric"},
+                {"name": "Due", "id": "due_date"},
+                {"name": "Status", "id": "status"}
+            ],
+            data=[],
+            style_cell={"textAlign": "left"}
+        ),
+
+        html.H4("All tasks", className="mt-4"),
+        html.Div(
+            [
+                dbc.Button("Start", id="task-start-button", color="secondary", size="sm", className="me-2"),
+                dbc.Button("Done", id="task-done-button", color="success", size="sm", className="me-2"),
+                dbc.Button("Reopen", id="task-reopen-button", color="secondary", size="sm", className="me-2"),
+                dbc.Button("Delete", id="task-delete-button", color="danger", size="sm")
+            ],
+            className="my-2"
+        ),
+        # Rows are listed in dependency order; only the current page is sent to the browser
+        dash_table.DataTable(
+            id="tasks-table",
+            columns=[
+                {"name": "Task", "id": "title"},
+                {"name": "Status", "id": "status"},
+                {"name": "Priority", "id": "priority", "type": "numeric"},
+                {"name": "Due", "id": "due_date"},
+                {"name": "Waiting on", "id": "waiting_on"}
+            ],
+            data=[],
+            row_selectable="multi",
+            selected_rows=[],
+            page_action="custom",
+            page_current=0,
+            page_size=TASK_TABLE_PAGE_SIZE,
+            page_count=1,
+            style_cell={"textAlign": "left", "overflow": "hidden", "textOverflow": "ellipsis", "maxWidth": 0}
+        ),
+        dcc.Interval(id="tasks-interval", interval=30 * 1000, n_intervals=0)
+    ])
@@ -0,0 +1,45 @@
+import dash
+from dash import html, dcc, dash_table
+import dash_bootstrap_components as dbc
+
+dash.register_page(__name__)
+
+
+def layout(**kwargs):
+    return html.Div([
+        html.H1("Time", className="text-center"),
+
+        dbc.Alert(id="time-alert", is_open=False, dismissable=True, duration=5000),
+
+        dbc.Card(
+            dbc.CardBody([
+                dbc.Row(
+                    [
+                        dbc.Col(dcc.Dropdown(id="time-task-input", placeholder="Task..."), md=6),
+                        dbc.Col(dbc.Button("Start", id="time-start-button", color="success"), md="auto"),
+                        dbc.Col(dbc.Button("Pause", id="time-pause-button", color="secondary"), md="auto"),
+                        dbc.Col(dbc.Button("Stop", id="time-stop-button", color="danger"), md="auto")
+                    ],
+                    className="g-2"
+                ),
+                html.P(id="time-timer-status", className="mt-2 mb-0 text-muted")
+            ]),
+            className="my-3"
+        ),
+
+        dbc.Row(
+            [
+                dbc.Col(html.H4(["This week: ", html.Span(id="time-week-total")]), md=8),
+                dbc.Col(dbc.Input(id="time-week-input", type="date"), md=4)
+            ],
+            className="align-items-center"
+        ),
+        # Read from the per-day aggregates only, never from the raw time events
+        dash_table.DataTable(
+            id="time-timesheet-table",
+            columns=[],
+            data=[],
+            style_cell={"textAlign": "left"}
+        ),
+        dcc.Interval(id="time-interval", interval=30 * 1000, n_intervals=0)
+    ])
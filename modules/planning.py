@@ -0,0 +1,218 @@
+import heapq
+import time
+
+from modules.custom_logger import create_logger
+
+logger = create_logger()
+
+DEFAULT_PRIORITY = 3
+NO_DUE_DATE = "9999-12-31"
+# Lazy heap entries are compacted once stale ones outnumber live ones by this factor
+COMPACT_FACTOR = 2
+
+
+def task_key(task_id, task):
+    """
+    Urgency of a task on its own: lower sorts first.
+
+    Returns:
+        tuple: (priority, due date, _id as text), so equal tasks still order deterministically.
+    """
+    return (task.get("priority") or DEFAULT_PRIORITY, task.get("due_date") or NO_DUE_DATE, str(task_id))
+
+
+class Scheduler:
+    """
+    Orders one user's unfinished tasks by priority, due date and dependencies.
+
+    Each task is scheduled with its effective key: the most urgent key among itself
+    and every unfinished task that (transitively) waits on it, so a low-priority
+    prerequisite of an urgent task is done early. The unblocked tasks sit in a heap
+    ordered by effective key, ties (tasks sharing an inherited key) broken by their own key.
+
+    Both are maintained incrementally from TaskGraph.changed: a change re-evaluates
+    the task and walks up its prerequisites only while their effective keys change,
+    and heap entries are invalidated lazily by version. Asking for the next tasks or
+    the first n steps of the plan then costs O(n log n) rather than a full re-plan.
+
+    Attributes:
+        graph (TaskGraph): The user's dependency graph (see modules.tasks).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._effective = {}
+        self._version = {}
+        self._heap = []
+        graph.changed.clear()
+        self._rebuild()
+
+    def _own_key(self, task_id):
+        if task_id not in self.graph.tasks or self.graph._is_done(task_id):
+            return None
+        return task_key(task_id, self.graph.tasks[task_id])
+
+    def _compute_effective(self, task_id):
+        best = self._own_key(task_id)
+        if best is None:
+            return None
+        for dependent in self.graph.dependents.get(task_id, ()):
+            key = self._effective.get(dependent)
+            if key is not None and key < best:
+                best = key
+        return best
+
+    def _push(self, task_id):
+        version = self._version.get(task_id, 0) + 1
+        self._version[task_id] = version
+        if task_id in self.graph._unblocked and self._effective.get(task_id) is not None:
+            heapq.heappush(self._heap, (self._effective[task_id], self._own_key(task_id), version, task_id))
+
+    def _rebuild(self):
+        # Effective keys flow from dependents to prerequisites: visit in reverse dependency order
+        self._effective = {}
+        for task_id in reversed(self.graph.topological_order()):
+            self._effective[task_id] = self._compute_effective(task_id)
+        self._version = {task_id: 1 for task_id in self.graph.unblocked()}
+        self._heap = [(self._effective[task_id], self._own_key(task_id), 1, task_id) for task_id in self._version
+                      if self._effective.get(task_id) is not None]
+        heapq.heapify(self._heap)
+
+    def sync(self):
+        """
+        Apply the graph changes recorded since the last call.
+
+        Returns:
+            int: The number of tasks whose effective key or readiness was re-evaluated.
+        """
+        changed = self.graph.changed
+        if not changed:
+            return 0
+        self.graph.changed = set()
+        work = list(changed)
+        seen = 0
+        while work:
+            task_id = work.pop()
+            seen += 1
+            if task_id not in self.graph.tasks:
+                self._effective.pop(task_id, None)
+                self._version[task_id] = self._version.get(task_id, 0) + 1
+                continue
+            key = self._compute_effective(task_id)
+            if key != self._effective.get(task_id) or task_id not in self._effective:
+                self._effective[task_id] = key
+                # Prerequisites inherit urgency from this task
+                work.extend(self.graph.prerequisites.get(task_id, ()))
+            self._push(task_id)
+        if len(self._heap) > COMPACT_FACTOR * len(self.graph._unblocked) + 64:
+            self._heap = [entry for entry in self._heap if self._version.get(entry[3]) == entry[2]]
+            heapq.heapify(self._heap)
+        return seen
+
+    def _live(self, entry):
+        _, _, version, task_id = entry
+        return self._version.get(task_id) == version and task_id in self.graph._unblocked
+
+    def next_tasks(self, limit=10):
+        """
+        The most urgent tasks that can be started now.
+
+        Args:
+            limit (int): How many tasks to return.
+
+        Returns:
+            list: Task _ids, most urgent first.
+        """
+        self.sync()
+        picked, popped = [], []
+        while self._heap and len(picked) < limit:
+            entry = heapq.heappop(self._heap)
+            if self._live(entry):
+                picked.append(entry[3])
+                popped.append(entry)
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        return picked
+
+    def plan(self, limit=None):
+        """
+        The order to work through the unfinished tasks.
+
+        Repeatedly takes the most urgent unblocked task and releases the tasks
+        waiting on it (Kahn's algorithm with a heap). The simulation starts from the
+        maintained heap and blocked counts, so the first `limit` steps touch only the
+        tasks they release, not the whole graph.
+
+        Args:
+            limit (int, optional): Stop after this many tasks; None plans every task.
+
+        Returns:
+            list: Task _ids in the order they should be done.
+        """
+        self.sync()
+        heap = [entry for entry in self._heap if self._live(entry)]
+        heapq.heapify(heap)
+        pending = {}
+        order = []
+        while heap and (limit is None or len(order) < limit):
+            task_id = heapq.heappop(heap)[3]
+            order.append(task_id)
+            for dependent in self.graph.dependents.get(task_id, ()):
+                key = self._effective.get(dependent)
+                if key is None:
+                    continue
+                remaining = pending.get(dependent, self.graph._pending.get(dependent, 0)) - 1
+                pending[dependent] = remaining
+                if remaining == 0:
+                    heapq.heappush(heap, (key, self._own_key(dependent), 0, dependent))
+        return order
+
+    def effective_key(self, task_id):
+        """
+        Returns:
+            tuple: The task's effective (priority, due date, _id) key, or None if it is done.
+        """
+        self.sync()
+        return self._effective.get(task_id)
+
+
+def scheduler_benchmark(graph, repeat=100):
+    """
+    Time the Scheduler operations the pages call on every interaction.
+
+    Args:
+        graph (TaskGraph): A populated graph; it is modified (priorities change).
+        repeat (int): Calls averaged for the per-interaction operations.
+
+    Returns:
+        dict: Milliseconds per operation.
+    """
+    def timed(function, times=1):
+        started = time.perf_counter()
+        for _ in range(times):
+            function()
+        return round((time.perf_counter() - started) * 1000 / times, 3)
+
+    results = {}
+    scheduler = None
+
+    def build():
+        nonlocal scheduler
+        scheduler = Scheduler(graph)
+
+    results["scheduler_build_ms"] = timed(build)
+    results["next_tasks_ms"] = timed(lambda: scheduler.next_tasks(10), repeat)
+    results["plan_50_ms"] = timed(lambda: scheduler.plan(50), repeat)
+    task_ids = list(graph.tasks)
+    state = {"i": 0}
+
+    def replan():
+        # One task's priority changes, then the page asks for the next tasks again
+        task_id = task_ids[state["i"] % len(task_ids)]
+        state["i"] += 7919
+        graph.upsert({**graph.tasks[task_id], "_id": task_id, "priority": state["i"] % 5 + 1})
+        scheduler.next_tasks(10)
+
+    results["replan_after_change_ms"] = timed(replan, repeat)
+    results["full_plan_ms"] = timed(scheduler.plan)
+    return results
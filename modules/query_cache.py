@@ -0,0 +1,177 @@
+import functools
+import hashlib
+import os
+import time
+
+import dotenv
+from bson import json_util
+
+from modules.connections import get_redis_client
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+KEY_PREFIX = "ormcache"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+DEFAULT_TTL = int(os.getenv("ORM_CACHE_TTL_S", 30))
+# After a Redis error, bypass the cache for this long instead of paying a timeout per call
+RETRY_AFTER = float(os.getenv("ORM_CACHE_RETRY_S", 5))
+
+# One round trip per read: look up the collection's generation, then the entry
+# under that generation, and count the hit or miss. Writes bump the generation,
+# which orphans every older entry of the collection (they expire via their TTL).
+_READ_SCRIPT = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+local value = redis.call('GET', ARGV[1] .. ':' .. generation .. ':' .. ARGV[2])
+if value then
+    redis.call('HINCRBY', KEYS[2], 'hits', 1)
+    redis.call('HINCRBY', KEYS[2], 'hits:' .. ARGV[3], 1)
+else
+    redis.call('HINCRBY', KEYS[2], 'misses', 1)
+    redis.call('HINCRBY', KEYS[2], 'misses:' .. ARGV[3], 1)
+end
+return {generation, value}
+"""
+
+
+class QueryCache:
+    """
+    Read-through cache for ORM query results, shared by all workers through Redis.
+
+    Entries are keyed by collection, generation and a hash of the query. Any write
+    to a collection increments its generation, so invalidation is a single INCR
+    regardless of how many queries are cached. Redis errors never fail a read;
+    the query just goes to MongoDB.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._script = None
+        self._down_until = 0.0
+
+    def _available(self):
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, action, collection_name, error):
+        self._down_until = time.monotonic() + RETRY_AFTER
+        logger.warning(f"Query cache {action} failed for '{collection_name}', bypassing for {RETRY_AFTER}s: {error}")
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_client()
+        return self._client
+
+    def _generation_key(self, collection_name):
+        return f"{KEY_PREFIX}:gen:{collection_name}"
+
+    def read_through(self, collection_name, key_parts, load, ttl=DEFAULT_TTL):
+        """
+        Return the cached result for a query, or run `load` and cache its result.
+
+        Args:
+            collection_name (str): The collection the query reads.
+            key_parts: JSON-serializable description of the query (method, arguments).
+            load (callable): Runs the query; None results are not cached.
+            ttl (int): Seconds to keep the result.
+
+        Returns:
+            The query result.
+        """
+        if not self._available():
+            return load()
+        digest = hashlib.sha1(json_util.dumps(key_parts, sort_keys=True).encode("utf-8")).hexdigest()
+        prefix = f"{KEY_PREFIX}:{collection_name}"
+        try:
+            if self._script is None:
+                self._script = self.client.register_script(_READ_SCRIPT)
+            generation, cached = self._script(
+                keys=[self._generation_key(collection_name), STATS_KEY],
+                args=[prefix, digest, collection_name],
+            )
+        except Exception as e:
+            self._failed("read", collection_name, e)
+            return load()
+
+        if cached is not None:
+            return json_util.loads(cached)
+
+        result = load()
+        if result is not None:
+            try:
+                # Stored under the generation read above: if a write raced us, the entry is already stale-keyed
+                self.client.set(f"{prefix}:{generation.decode()}:{digest}", json_util.dumps(result), ex=ttl)
+            except Exception as e:
+                self._failed("store", collection_name, e)
+        return result
+
+    def invalidate(self, collection_name):
+        """
+        Drop every cached query of a collection.
+
+        Args:
+            collection_name (str): The collection that was written.
+        """
+        if not self._available():
+            return
+        try:
+            self.client.incr(self._generation_key(collection_name))
+        except Exception as e:
+            self._failed("invalidation", collection_name, e)
+
+    def stats(self):
+        """
+        Return hit/miss counters aggregated across all workers.
+
+        Returns:
+            dict: {"hits", "misses", "hit_ratio", "collections": {name: {"hits", "misses"}}}.
+        """
+        try:
+            raw = {key.decode(): int(value) for key, value in self.client.hgetall(STATS_KEY).items()}
+        except Exception as e:
+            logger.warning(f"Failed to read query cache stats: {e}")
+            raw = {}
+        collections = {}
+        for key, value in raw.items():
+            kind, _, collection_name = key.partition(":")
+            if collection_name:
+                collections.setdefault(collection_name, {"hits": 0, "misses": 0})[kind] = value
+        hits, misses = raw.get("hits", 0), raw.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "collections": collections,
+        }
+
+
+_query_cache = QueryCache()
+
+
+def get_query_cache():
+    """
+    Returns:
+        QueryCache: The process-wide query cache.
+    """
+    return _query_cache
+
+
+def cached_read(method):
+    """
+    Cache a CustomORM read method in Redis when the instance opted in with cache_ttl.
+
+    The wrapped method must take the collection name as its first argument.
+    """
+    @functools.wraps(method)
+    def wrapper(self, collection_name, *args, **kwargs):
+        if not self.cache_ttl:
+            return method(self, collection_name, *args, **kwargs)
+        return get_query_cache().read_through(
+            collection_name,
+            [method.__name__, args, kwargs],
+            lambda: method(self, collection_name, *args, **kwargs),
+            self.cache_ttl,
+        )
+    return wrapper
@@ -0,0 +1,148 @@
+import os
+import time
+import uuid
+
+import dotenv
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+from modules.connections import redis_settings
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+KEY_PREFIX = "LIMITER"
+LOGIN_WINDOW_S = int(os.getenv("LOGIN_WINDOW_S", 3600))
+LOGIN_IP_LIMIT = int(os.getenv("LOGIN_IP_LIMIT", 10))
+LOGIN_USER_LIMIT = int(os.getenv("LOGIN_USER_LIMIT", 5))
+# Coarse per-IP cap on login POSTs, applied by Flask-Limiter before the password is checked
+LOGIN_REQUEST_LIMIT = os.getenv("LOGIN_REQUEST_LIMIT", "30 per minute")
+
+# Sliding-window check-and-record over several keys in one atomic round trip.
+# KEYS: one sorted set per limited subject. ARGV: now_ms, window_ms, member, then one limit per key.
+# Returns {1, 0} when the attempt was recorded, {0, retry_after_ms} when a key is at its limit.
+SLIDING_WINDOW = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[3 + i]) then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry_after > 0 then
+    return {0, retry_after}
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[3])
+    redis.call('PEXPIRE', key, window)
+end
+return {1, 0}
+"""
+
+limiter = Limiter(key_func=get_remote_address, strategy="moving-window", swallow_errors=True)
+
+
+def login_keys(ip, username):
+    """
+    Returns:
+        dict: Limiter key -> attempts allowed per window, for the client IP and the username.
+    """
+    return {
+        f"{KEY_PREFIX}/{ip}/login-attempts": LOGIN_IP_LIMIT,
+        f"{KEY_PREFIX}/user:{username}/login-attempts": LOGIN_USER_LIMIT,
+    }
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window attempt limiter backed by one Redis sorted set per key.
+
+    hit() trims the window, checks every key and records the attempt in a single
+    Lua script, so concurrent attempts cannot slip past the limit between a read
+    and a write.
+
+    Attributes:
+        redis_client (redis.Redis): The Redis client.
+        window (float): Window length in seconds.
+    """
+
+    def __init__(self, redis_client, window=LOGIN_WINDOW_S):
+        self.redis_client = redis_client
+        self.window = window
+        self._script = redis_client.register_script(SLIDING_WINDOW)
+
+    def hit(self, limits):
+        """
+        Record an attempt against every key unless one of them is at its limit.
+
+        Args:
+            limits (dict): Key -> attempts allowed per window.
+
+        Returns:
+            tuple: (allowed, retry_after_seconds), or None if Redis could not be reached.
+        """
+        now_ms = int(time.time() * 1000)
+        try:
+            allowed, retry_after_ms = self._script(
+                keys=list(limits),
+                args=[now_ms, int(self.window * 1000), f"{now_ms}-{uuid.uuid4().hex[:8]}", *limits.values()],
+            )
+        except Exception as e:
+            logger.error(f"Rate limiter unavailable: {e}")
+            return None
+        return bool(allowed), int(retry_after_ms) / 1000
+
+    def reset(self, keys):
+        """
+        Forget the recorded attempts of the given keys.
+        """
+        try:
+            self.redis_client.unlink(*keys)
+        except Exception as e:
+            logger.error(f"Failed to reset rate limits: {e}")
+
+
+def clear_rate_limits(redis_client, ip, batch_size=500):
+    """
+    Delete every limiter key of an IP address: the login attempts and Flask-Limiter's counters.
+
+    Keys are found with SCAN and removed with UNLINK in batches, so Redis is never
+    blocked by a keyspace-wide KEYS or a large synchronous DELETE.
+
+    Returns:
+        int: The number of keys deleted.
+    """
+    deleted = 0
+    batch = []
+    # Flask-Limiter's storage adds its own prefix in front of LIMITER/<ip>/...
+    for key in redis_client.scan_iter(match=f"*{KEY_PREFIX}/{ip}/*", count=1000):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            deleted += redis_client.unlink(*batch)
+            batch = []
+    if batch:
+        deleted += redis_client.unlink(*batch)
+    logger.info(f"Rate limits for {ip} cleared ({deleted} keys).")
+    return deleted
+
+
+def register_rate_limits(server):
+    """
+    Attach Flask-Limiter to the app, storing its counters in the shared Redis.
+
+    RATELIMIT_STORAGE_URI overrides the storage (e.g. memory:// for a single process).
+    Limiter errors are logged and the request is let through.
+    """
+    settings = redis_settings()
+    server.config.setdefault(
+        "RATELIMIT_STORAGE_URI",
+        os.getenv("RATELIMIT_STORAGE_URI") or f"redis://{settings['host']}:{settings['port']}/{settings['db']}",
+    )
+    server.config.setdefault("RATELIMIT_HEADERS_ENABLED", True)
+    limiter.init_app(server)
+    logger.info(f"Login requests limited to {LOGIN_REQUEST_LIMIT} per IP.")
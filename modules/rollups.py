@@ -0,0 +1,90 @@
+from modules.connections import get_database
+from modules.custom_logger import create_logger
+from modules.jobs import job, queue_enabled
+from modules import goal_progress, mood_analytics
+
+logger = create_logger()
+
+# Source collection -> materialized rollups derived from it, maintained by CustomORM and AsyncCustomORM writes.
+# Each entry names the fields its pre-/post-images need, how to apply removed/added documents
+# incrementally, and how to rebuild from scratch when a write has no pre-images (bulk updates, drops).
+ROLLUPS = {
+    "mood_journal": [(mood_analytics.ROLLUP_FIELDS, mood_analytics.apply_rollup_changes,
+                      mood_analytics.rebuild_rollups)],
+    "tasks": [(goal_progress.PROGRESS_FIELDS, goal_progress.apply_progress_changes,
+               goal_progress.rebuild_progress)],
+}
+
+
+def has_rollups(collection_name):
+    """
+    Returns:
+        bool: True if writes to the collection must update materialized rollups.
+    """
+    return collection_name in ROLLUPS
+
+
+def rollup_fields(collection_name):
+    """
+    Returns:
+        dict: The projection covering every field the collection's rollups read.
+    """
+    fields = {"_id": 1}
+    for projection, _, _ in ROLLUPS.get(collection_name, ()):
+        fields.update(projection)
+    return fields
+
+
+def apply_rollup_changes(db, collection_name, removed=(), added=()):
+    """
+    Update every rollup of a collection for removed and/or added documents.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        collection_name (str): The collection that was written.
+        removed (iterable): Pre-images of deleted or updated documents.
+        added (iterable): Inserted documents, or updated documents after the update.
+
+    Returns:
+        bool: True if all rollups were updated, False otherwise.
+    """
+    removed, added = list(removed), list(added)
+    results = [apply(db, removed, added) for _, apply, _ in ROLLUPS.get(collection_name, ())]
+    return all(results)
+
+
+def rebuild_rollups(db, collection_name):
+    """
+    Recompute every rollup of a collection from its documents.
+
+    Returns:
+        bool: True if all rollups were rebuilt, False otherwise.
+    """
+    results = [rebuild(db, collection_name) for _, _, rebuild in ROLLUPS.get(collection_name, ())]
+    return all(results)
+
+
+@job(queue="rollups", max_attempts=5, unique=True)
+def rebuild_rollups_job(collection_name):
+    """
+    Rebuild a collection's rollups on a job worker.
+
+    Raises:
+        RuntimeError: If a rollup could not be rebuilt, so the job is retried.
+    """
+    if not rebuild_rollups(get_database(), collection_name):
+        raise RuntimeError(f"rollups of '{collection_name}' were not rebuilt")
+
+
+def schedule_rebuild(db, collection_name):
+    """
+    Rebuild a collection's rollups on the job queue when it is enabled, inline otherwise.
+
+    Concurrent requests for the same collection are merged into one queued rebuild.
+
+    Returns:
+        bool: True if the rebuild was queued or succeeded, False otherwise.
+    """
+    if queue_enabled() and rebuild_rollups_job.delay(collection_name) is not None:
+        return True
+    return rebuild_rollups(db, collection_name)
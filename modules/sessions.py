@@ -0,0 +1,153 @@
+import os
+import re
+import secrets
+import time
+
+import dotenv
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from modules.custom_logger import create_logger
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+SESSION_PREFIX = "session:"
+# 128 random bits, URL-safe base64 without padding
+SESSION_ID_BYTES = 16
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+
+class RedisSession(CallbackDict, SessionMixin):
+    """
+    Session data held in Redis; the cookie only carries the session id.
+
+    Attributes:
+        sid (str): The session id.
+        new (bool): True if the session did not exist before this request.
+        modified (bool): True if the data changed during this request.
+        refreshed_at (float): Unix time the session's expiry was last extended.
+        owner (str): The username the session was loaded for, used to rotate the id on login.
+    """
+
+    def __init__(self, initial=None, sid=None, new=False, refreshed_at=0.0):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.refreshed_at = refreshed_at
+        self.owner = self.get("username")
+
+
+class RedisSessionInterface(SessionInterface):
+    """
+    Server-side Flask sessions stored in Redis.
+
+    A request that does not change the session neither writes to Redis nor sends
+    a Set-Cookie header. The expiry of a permanent session is extended at most
+    once every `refresh_interval` seconds. The session id is rotated when the
+    logged-in user changes, so an id planted before login is useless afterwards.
+
+    Attributes:
+        redis_client (redis.Redis): The Redis client.
+        refresh_interval (float): Minimum seconds between expiry extensions of an unchanged session.
+    """
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, redis_client, refresh_interval=None):
+        self.redis_client = redis_client
+        self.refresh_interval = float(refresh_interval if refresh_interval is not None
+                                      else os.getenv("SESSION_REFRESH_S", 3600))
+
+    def _new_session(self):
+        return RedisSession(sid=secrets.token_urlsafe(SESSION_ID_BYTES), new=True, refreshed_at=time.time())
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or not SESSION_ID_PATTERN.match(sid):
+            return self._new_session()
+        try:
+            stored = self.redis_client.get(SESSION_PREFIX + sid)
+        except Exception as e:
+            logger.error(f"Failed to load session: {e}")
+            return self._new_session()
+        if stored is None:
+            return self._new_session()
+        try:
+            stored = self.serializer.loads(stored)
+            return RedisSession(stored["data"], sid=sid, refreshed_at=stored["refreshed_at"])
+        except Exception as e:
+            logger.warning(f"Discarded unreadable session: {e}")
+            return self._new_session()
+
+    def _delete_cookie(self, app, response):
+        response.delete_cookie(
+            self.get_cookie_name(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            httponly=self.get_cookie_httponly(app),
+        )
+
+    def save_session(self, app, session, response):
+        # A logged-out session still carries the "_permanent" flag but nothing worth storing
+        if not set(session) - {"_permanent"}:
+            if session.modified and not session.new:
+                try:
+                    self.redis_client.delete(SESSION_PREFIX + session.sid)
+                except Exception as e:
+                    logger.error(f"Failed to delete session: {e}")
+                self._delete_cookie(app, response)
+            return
+
+        now = time.time()
+        if session.get("username") != session.owner and not session.new:
+            # Rotate the id when a different user logs in on this browser
+            try:
+                self.redis_client.delete(SESSION_PREFIX + session.sid)
+            except Exception as e:
+                logger.error(f"Failed to delete session: {e}")
+            session.sid = secrets.token_urlsafe(SESSION_ID_BYTES)
+            session.modified = True
+        if not session.modified and not session.new and now - session.refreshed_at < self.refresh_interval:
+            return
+
+        lifetime = int(app.permanent_session_lifetime.total_seconds()) if session.permanent else 24 * 3600
+        stored = self.serializer.dumps({"data": dict(session), "refreshed_at": now})
+        try:
+            self.redis_client.set(SESSION_PREFIX + session.sid, stored, ex=lifetime)
+        except Exception as e:
+            logger.error(f"Failed to save session: {e}")
+            return
+        response.vary.add("Cookie")
+        response.set_cookie(
+            self.get_cookie_name(app),
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def register_sessions(server, redis_client):
+    """
+    Use server-side Redis sessions unless SESSION_BACKEND is "cookie".
+
+    Args:
+        server (Flask): The Flask app.
+        redis_client (redis.Redis): The Redis client sessions are stored with.
+    """
+    backend = os.getenv("SESSION_BACKEND", "redis").strip().lower()
+    if backend == "cookie":
+        logger.info("Sessions are stored in signed cookies.")
+        return
+    server.session_interface = RedisSessionInterface(redis_client)
+    logger.info("Sessions are stored in Redis.")
@@ -0,0 +1,609 @@
+import collections
+import datetime
+import threading
+import time
+
+import dotenv
+from bson import ObjectId
+
+from modules.change_feed import changes_since, current_sequence
+from modules.custom_logger import create_logger
+from modules.customORM import CustomORM
+from modules.goal_progress import GOAL_COLLECTION
+from modules.planning import Scheduler, scheduler_benchmark
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+TASK_COLLECTION = "tasks"
+TASK_STATUSES = ("todo", "in_progress", "done")
+DONE = "done"
+# Fields kept in memory for every task; notes and other large fields stay in MongoDB
+GRAPH_FIELDS = ["owner", "title", "status", "priority", "due_date", "depends_on", "goal", "estimate_minutes"]
+
+
+class DependencyCycleError(Exception):
+    """Raised when a dependency would make a task (indirectly) depend on itself."""
+
+
+class TaskGraph:
+    """
+    In-memory dependency DAG of one user's tasks.
+
+    An edge prerequisite -> task means the prerequisite must be done first. Besides
+    the adjacency sets, each task keeps the number of unfinished prerequisites, so
+    the set of unblocked tasks is maintained as edges and statuses change and
+    "what can I work on now" never walks the graph.
+
+    Attributes:
+        tasks (dict): task _id -> task fields (see GRAPH_FIELDS).
+        prerequisites (dict): task _id -> set of _ids it depends on.
+        dependents (dict): task _id -> set of _ids that depend on it.
+        changed (set): _ids whose fields, edges or blocked state changed since a
+            consumer (see modules.planning) last drained it.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.prerequisites = collections.defaultdict(set)
+        self.dependents = collections.defaultdict(set)
+        self._pending = {}
+        self._unblocked = set()
+        self._order = None
+        self.changed = set()
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __contains__(self, task_id):
+        return task_id in self.tasks
+
+    def _is_done(self, task_id):
+        return self.tasks[task_id].get("status") == DONE
+
+    def _refresh(self, task_id):
+        # Keep the unblocked set in line with the task's status and pending count
+        self.changed.add(task_id)
+        if task_id in self.tasks and not self._is_done(task_id) and self._pending.get(task_id, 0) == 0:
+            self._unblocked.add(task_id)
+        else:
+            self._unblocked.discard(task_id)
+
+    def _adjust_dependents(self, task_id, delta):
+        for dependent in self.dependents.get(task_id, ()):
+            self._pending[dependent] += delta
+            self._refresh(dependent)
+
+    def _set_fields(self, task):
+        task_id = task["_id"]
+        previous = self.tasks.get(task_id)
+        self.tasks[task_id] = {name: task.get(name) for name in GRAPH_FIELDS}
+        self.changed.add(task_id)
+        self._pending.setdefault(task_id, 0)
+        if previous is not None:
+            was_done, is_done = previous.get("status") == DONE, self._is_done(task_id)
+            if was_done != is_done:
+                # Finishing a task unblocks its dependents; reopening it blocks them again
+                self._adjust_dependents(task_id, 1 if was_done else -1)
+
+    def _link(self, task_id, prerequisite_id):
+        self.prerequisites[task_id].add(prerequisite_id)
+        self.dependents[prerequisite_id].add(task_id)
+        self.changed.update((task_id, prerequisite_id))
+        if not self._is_done(prerequisite_id):
+            self._pending[task_id] += 1
+            self._refresh(task_id)
+
+    def _wanted_prerequisites(self, task):
+        return {
+            prerequisite for prerequisite in task.get("depends_on") or []
+            if prerequisite != task["_id"] and prerequisite in self.tasks
+        }
+
+    def load(self, tasks):
+        """
+        Build the graph from a user's task documents in O(V+E).
+
+        Edges are added without per-edge cycle checks; the stored dependencies were
+        checked when they were written, and topological_order() reports any cycle.
+
+        Args:
+            tasks (list): Task documents with _id and optionally depends_on.
+        """
+        for task in tasks:
+            self._set_fields(task)
+        for task in tasks:
+            for prerequisite in self._wanted_prerequisites(task) - self.prerequisites.get(task["_id"], set()):
+                self._link(task["_id"], prerequisite)
+        for task_id in self.tasks:
+            self._refresh(task_id)
+        self._order = None
+
+    def upsert(self, task):
+        """
+        Add a task or replace its fields and dependencies.
+        """
+        self.upsert_many([task])
+
+    def upsert_many(self, tasks):
+        """
+        Add or replace several tasks, e.g. the changes read from the change log.
+
+        All tasks are added before any dependency, so a task may depend on another
+        one in the same batch. Dependencies on tasks that are not in the graph
+        (deleted, or another user's) are ignored, and a dependency that would close
+        a cycle is skipped and logged.
+
+        Args:
+            tasks (list): Task documents with _id and optionally depends_on.
+        """
+        for task in tasks:
+            self._set_fields(task)
+        for task in tasks:
+            task_id = task["_id"]
+            wanted = self._wanted_prerequisites(task)
+            current = self.prerequisites.get(task_id, set())
+            for prerequisite in current - wanted:
+                self.remove_dependency(task_id, prerequisite)
+            for prerequisite in wanted - current:
+                try:
+                    self.add_dependency(task_id, prerequisite)
+                except DependencyCycleError:
+                    logger.warning(f"Ignoring dependency {prerequisite} of task {task_id}: it would create a cycle.")
+            self._refresh(task_id)
+        self._order = None
+
+    def remove(self, task_id):
+        """
+        Remove a task and all of its edges.
+        """
+        if task_id not in self.tasks:
+            return
+        for prerequisite in list(self.prerequisites.get(task_id, ())):
+            self.remove_dependency(task_id, prerequisite)
+        if not self._is_done(task_id):
+            self._adjust_dependents(task_id, -1)
+        for dependent in self.dependents.pop(task_id, set()):
+            self.prerequisites[dependent].discard(task_id)
+        self.prerequisites.pop(task_id, None)
+        self._pending.pop(task_id, None)
+        self._unblocked.discard(task_id)
+        self.changed.add(task_id)
+        del self.tasks[task_id]
+        self._order = None
+
+    def would_create_cycle(self, task_id, prerequisite_id):
+        """
+        Check whether `task_id` depending on `prerequisite_id` would close a cycle.
+
+        True if the prerequisite is already reachable from the task through its
+        dependents. The search is O(V+E) in the worst case, but only visits the
+        tasks downstream of `task_id`.
+
+        Returns:
+            bool: True if the edge would create a cycle.
+        """
+        if task_id == prerequisite_id:
+            return True
+        seen = {task_id}
+        stack = [task_id]
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if dependent == prerequisite_id:
+                    return True
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return False
+
+    def add_dependency(self, task_id, prerequisite_id):
+        """
+        Make `task_id` depend on `prerequisite_id`.
+
+        Raises:
+            KeyError: If either task is not in the graph.
+            DependencyCycleError: If the dependency would create a cycle.
+        """
+        if task_id not in self.tasks or prerequisite_id not in self.tasks:
+            raise KeyError(prerequisite_id if task_id in self.tasks else task_id)
+        if prerequisite_id in self.prerequisites.get(task_id, ()):
+            return
+        if self.would_create_cycle(task_id, prerequisite_id):
+            raise DependencyCycleError(f"Task {task_id} cannot depend on {prerequisite_id}: that would create a cycle.")
+        self._link(task_id, prerequisite_id)
+        self._order = None
+
+    def remove_dependency(self, task_id, prerequisite_id):
+        """
+        Drop the dependency of `task_id` on `prerequisite_id`, if present.
+        """
+        if prerequisite_id not in self.prerequisites.get(task_id, ()):
+            return
+        self.prerequisites[task_id].discard(prerequisite_id)
+        self.dependents[prerequisite_id].discard(task_id)
+        self.changed.update((task_id, prerequisite_id))
+        if prerequisite_id in self.tasks and not self._is_done(prerequisite_id):
+            self._pending[task_id] -= 1
+            self._refresh(task_id)
+        self._order = None
+
+    def topological_order(self):
+        """
+        Order the tasks so every task comes after its prerequisites (Kahn's algorithm, O(V+E)).
+
+        The order is cached until the graph changes.
+
+        Returns:
+            list: Task _ids.
+        """
+        if self._order is not None:
+            return self._order
+        indegree = {task_id: len(self.prerequisites.get(task_id, ())) for task_id in self.tasks}
+        queue = collections.deque(task_id for task_id, degree in indegree.items() if degree == 0)
+        order = []
+        while queue:
+            task_id = queue.popleft()
+            order.append(task_id)
+            for dependent in self.dependents.get(task_id, ()):
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+        if len(order) < len(self.tasks):
+            # Only possible if concurrent writers raced past the cycle check; keep every task visible
+            stuck = [task_id for task_id, degree in indegree.items() if degree > 0]
+            logger.warning(f"Task dependencies contain a cycle through {len(stuck)} tasks.")
+            order.extend(stuck)
+        self._order = order
+        return order
+
+    def unblocked(self):
+        """
+        Returns:
+            set: _ids of unfinished tasks whose prerequisites are all done.
+        """
+        return set(self._unblocked)
+
+    def is_blocked(self, task_id):
+        """
+        Returns:
+            bool: True if the task has unfinished prerequisites.
+        """
+        return self._pending.get(task_id, 0) > 0
+
+    def blockers(self, task_id):
+        """
+        Returns:
+            list: _ids of the task's unfinished prerequisites.
+        """
+        return [
+            prerequisite for prerequisite in self.prerequisites.get(task_id, ())
+            if prerequisite in self.tasks and not self._is_done(prerequisite)
+        ]
+
+
+_graphs = {}
+_schedulers = {}
+_graphs_lock = threading.Lock()
+
+
+class TaskManager:
+    """
+    Task operations for one user, stored through CustomORM.
+
+    Each process keeps one TaskGraph per user. It is loaded with a single indexed
+    query the first time and then brought up to date from the change log (see
+    modules.change_feed), so writes made by any worker are applied incrementally
+    instead of reloading every task. The user's Scheduler (see modules.planning)
+    follows the same graph, so re-planning after a write only touches what changed.
+
+    Attributes:
+        orm (CustomORM): The ORM used for reads and writes.
+        owner (str): The user whose tasks are managed.
+    """
+
+    def __init__(self, owner, orm=None):
+        self.owner = owner
+        self.orm = orm or CustomORM()
+
+    def _load(self):
+        seq = current_sequence(self.orm.db, TASK_COLLECTION)
+        documents = self.orm.find_many(TASK_COLLECTION, {"owner": self.owner}, projection=GRAPH_FIELDS)
+        if documents is None:
+            return None
+        graph = TaskGraph()
+        graph.load(documents)
+        logger.info(f"Loaded {len(graph)} tasks of '{self.owner}'.")
+        return graph, seq
+
+    def graph(self):
+        """
+        Return the user's up-to-date dependency graph.
+
+        Returns:
+            TaskGraph: The graph, or None if the tasks could not be loaded.
+        """
+        with _graphs_lock:
+            cached = _graphs.get(self.owner)
+            if cached is None:
+                cached = self._load()
+                if cached is None:
+                    return None
+                _graphs[self.owner] = cached
+                return cached[0]
+
+            graph, seq = cached
+            changes = changes_since(self.orm.db, TASK_COLLECTION, seq)
+            if changes is None:
+                cached = self._load()
+                if cached is None:
+                    return None
+                _graphs[self.owner] = cached
+                return cached[0]
+            if changes["upserted"]:
+                fresh = self.orm.find_many(
+                    TASK_COLLECTION,
+                    {"_id": {"$in": changes["upserted"]}, "owner": self.owner},
+                    projection=GRAPH_FIELDS,
+                )
+                if fresh is None:
+                    return graph
+                graph.upsert_many(fresh)
+                # Changed _ids not returned were moved to another owner
+                returned = {document["_id"] for document in fresh}
+                for task_id in changes["upserted"]:
+                    if task_id not in returned and task_id in graph:
+                        graph.remove(task_id)
+            for task_id in changes["deleted"]:
+                graph.remove(task_id)
+            _graphs[self.owner] = (graph, changes["seq"])
+            return graph
+
+    def get_task(self, task_id):
+        """
+        Returns:
+            dict: The full task document, or None if it does not exist or belongs to another user.
+        """
+        return self.orm.find_one(TASK_COLLECTION, {"_id": ObjectId(task_id), "owner": self.owner})
+
+    def create_task(self, title, priority=3, due_date=None, depends_on=(), goal=None, estimate_minutes=None,
+                    notes=""):
+        """
+        Create a task.
+
+        Args:
+            title (str): The task's title.
+            priority (int): 1 (highest) to 5 (lowest).
+            due_date (str, optional): "YYYY-MM-DD".
+            depends_on (iterable): _ids of the user's tasks that must be done first.
+            goal (ObjectId, optional): The goal the task counts towards.
+            estimate_minutes (int, optional): Expected effort.
+            notes (str): Free text.
+
+        Returns:
+            ObjectId: The new task's _id, or None if it could not be created.
+        """
+        graph = self.graph()
+        if graph is None:
+            return None
+        depends_on = [ObjectId(task_id) for task_id in depends_on]
+        missing = [task_id for task_id in depends_on if task_id not in graph]
+        if missing:
+            logger.warning(f"Cannot create task: unknown prerequisites {missing}.")
+            return None
+        goal = self._owned_goal(goal)
+        if goal is False:
+            return None
+        now = datetime.datetime.now(datetime.timezone.utc)
+        document = {
+            "_id": ObjectId(),
+            "owner": self.owner,
+            "title": title,
+            "status": "todo",
+            "priority": int(priority),
+            "due_date": due_date or None,
+            "depends_on": depends_on,
+            "goal": goal,
+            "estimate_minutes": estimate_minutes,
+            "notes": notes,
+            "created_at": now,
+            "updated_at": now,
+        }
+        # A new task has no dependents yet, so none of its dependencies can close a cycle
+        if not self.orm.insert_one(TASK_COLLECTION, document):
+            return None
+        return document["_id"]
+
+    def _owned_goal(self, goal):
+        # Goal progress is rolled up the goal's hierarchy, so only the user's own goals are accepted
+        if goal is None:
+            return None
+        goal = ObjectId(goal)
+        if self.orm.find_one(GOAL_COLLECTION, {"_id": goal, "owner": self.owner}) is None:
+            logger.warning(f"Unknown goal {goal} for '{self.owner}'.")
+            return False
+        return goal
+
+    def _update(self, task_id, changes):
+        changes = {**changes, "updated_at": datetime.datetime.now(datetime.timezone.utc)}
+        return self.orm.update_one(
+            TASK_COLLECTION, {"_id": ObjectId(task_id), "owner": self.owner}, {"$set": changes}
+        )
+
+    def update_task(self, task_id, **fields):
+        """
+        Change a task's title, priority, due date, goal, estimate or notes.
+
+        Returns:
+            bool: True if the task was updated, False otherwise.
+        """
+        allowed = {"title", "priority", "due_date", "goal", "estimate_minutes", "notes"}
+        unknown = set(fields) - allowed
+        if unknown:
+            logger.error(f"Cannot update task fields {sorted(unknown)}.")
+            return False
+        if "goal" in fields:
+            fields["goal"] = self._owned_goal(fields["goal"])
+            if fields["goal"] is False:
+                return False
+        return self._update(task_id, fields)
+
+    def set_status(self, task_id, status):
+        """
+        Move a task to "todo", "in_progress" or "done".
+
+        Returns:
+            bool: True if the status was changed, False otherwise.
+        """
+        if status not in TASK_STATUSES:
+            logger.error(f"Invalid task status: {status!r}")
+            return False
+        changes = {"status": status}
+        if status == DONE:
+            changes["completed_at"] = datetime.datetime.now(datetime.timezone.utc)
+        return self._update(task_id, changes)
+
+    def add_dependency(self, task_id, prerequisite_id):
+        """
+        Make a task depend on another one, refusing dependencies that would create a cycle.
+
+        Returns:
+            bool: True if the dependency was added, False otherwise.
+        """
+        task_id, prerequisite_id = ObjectId(task_id), ObjectId(prerequisite_id)
+        graph = self.graph()
+        if graph is None:
+            return False
+        try:
+            if graph.would_create_cycle(task_id, prerequisite_id):
+                raise DependencyCycleError(f"Task {task_id} cannot depend on {prerequisite_id}.")
+            if task_id not in graph or prerequisite_id not in graph:
+                raise KeyError(prerequisite_id if task_id in graph else task_id)
+        except (DependencyCycleError, KeyError) as e:
+            logger.warning(f"Rejected dependency: {e}")
+            return False
+        return self.orm.update_one(
+            TASK_COLLECTION,
+            {"_id": task_id, "owner": self.owner},
+            {"$addToSet": {"depends_on": prerequisite_id},
+             "$set": {"updated_at": datetime.datetime.now(datetime.timezone.utc)}},
+        )
+
+    def remove_dependency(self, task_id, prerequisite_id):
+        """
+        Returns:
+            bool: True if the dependency was removed (or did not exist), False otherwise.
+        """
+        return self.orm.update_one(
+            TASK_COLLECTION,
+            {"_id": ObjectId(task_id), "owner": self.owner},
+            {"$pull": {"depends_on": ObjectId(prerequisite_id)},
+             "$set": {"updated_at": datetime.datetime.now(datetime.timezone.utc)}},
+        )
+
+    def delete_task(self, task_id):
+        """
+        Delete a task and remove it from its dependents' prerequisites.
+
+        Returns:
+            bool: True if the task was deleted, False otherwise.
+        """
+        task_id = ObjectId(task_id)
+        graph = self.graph()
+        if graph is None:
+            return False
+        for dependent in list(graph.dependents.get(task_id, ())):
+            self.remove_dependency(dependent, task_id)
+        return self.orm.delete_one(TASK_COLLECTION, {"_id": task_id, "owner": self.owner})
+
+    def scheduler(self):
+        """
+        Return the user's Scheduler, kept in step with graph().
+
+        Returns:
+            Scheduler: The scheduler, or None if the tasks could not be loaded.
+        """
+        graph = self.graph()
+        if graph is None:
+            return None
+        with _graphs_lock:
+            scheduler = _schedulers.get(self.owner)
+            if scheduler is None or scheduler.graph is not graph:
+                scheduler = _schedulers[self.owner] = Scheduler(graph)
+            return scheduler
+
+    @staticmethod
+    def _task_list(graph, task_ids):
+        return [{"_id": task_id, **graph.tasks[task_id]} for task_id in task_ids if task_id in graph]
+
+    def ready_tasks(self, limit=50):
+        """
+        Unfinished tasks whose prerequisites are all done, most urgent first.
+
+        Urgency is the task's priority and due date, raised to that of the most
+        urgent task waiting on it (see modules.planning).
+
+        Returns:
+            list: Task fields with their _id.
+        """
+        scheduler = self.scheduler()
+        if scheduler is None:
+            return []
+        with _graphs_lock:
+            return self._task_list(scheduler.graph, scheduler.next_tasks(limit))
+
+    def plan(self, limit=None):
+        """
+        The order to work through the user's unfinished tasks, respecting dependencies.
+
+        Args:
+            limit (int, optional): Only the first `limit` tasks of the plan.
+
+        Returns:
+            list: Task fields with their _id, in plan order.
+        """
+        scheduler = self.scheduler()
+        if scheduler is None:
+            return []
+        with _graphs_lock:
+            return self._task_list(scheduler.graph, scheduler.plan(limit))
+
+
+def task_graph_benchmark(tasks=20_000, edges_per_task=2, seed=0):
+    """
+    Time the TaskGraph operations on a synthetic DAG.
+
+    Returns:
+        dict: Milliseconds for building the graph, a topological order, the unblocked
+        query, a cycle check and a status change, plus the Scheduler timings (see
+        modules.planning.scheduler_benchmark).
+    """
+    import random
+
+    rng = random.Random(seed)
+    ids = [ObjectId() for _ in range(tasks)]
+    documents = [
+        {
+            "_id": task_id,
+            "status": "todo",
+            "priority": rng.randint(1, 5),
+            # Only earlier tasks as prerequisites, so the synthetic graph is acyclic
+            "depends_on": rng.sample(ids[:index], min(index, edges_per_task)),
+        }
+        for index, task_id in enumerate(ids)
+    ]
+
+    def timed(function):
+        started = time.perf_counter()
+        function()
+        return round((time.perf_counter() - started) * 1000, 3)
+
+    graph = TaskGraph()
+    results = {"tasks": tasks, "edges": sum(len(document["depends_on"]) for document in documents)}
+    results["load_ms"] = timed(lambda: graph.load(documents))
+    results["topological_order_ms"] = timed(graph.topological_order)
+    results["unblocked_ms"] = timed(graph.unblocked)
+    results["cycle_check_ms"] = timed(lambda: graph.would_create_cycle(ids[0], ids[-1]))
+    results["complete_task_ms"] = timed(lambda: graph.upsert({**documents[0], "status": DONE}))
+    results.update(scheduler_benchmark(graph))
+    return results
@@ -0,0 +1,447 @@
+import atexit
+import datetime
+import os
+import threading
+import time
+
+import dotenv
+from bson import ObjectId
+from pymongo import ASCENDING, DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from modules.custom_logger import create_logger
+from modules.customORM import CustomORM, encode_resume_token, keyset_query
+from modules.mood_analytics import period_start
+from modules.tasks import TASK_COLLECTION
+
+dotenv.load_dotenv()
+
+logger = create_logger()
+
+# Append-only log of timer events; never updated, trimmed by a TTL index (see modules.indexes)
+EVENT_COLLECTION = "time_events"
+# Per-task, per-day totals folded from the events; the only collection timesheets read
+DAILY_COLLECTION = "time_daily"
+# One document per user with the timer that is running or paused right now
+TIMER_COLLECTION = "time_timers"
+# Compaction watermark and lease, plus the intervals still open at the watermark
+COMPACTION_COLLECTION = "time_compaction"
+WATERMARK_ID = "watermark"
+
+EVENT_TYPES = ("start", "pause", "stop")
+
+
+def _utc(value):
+    # MongoDB hands back naive UTC datetimes
+    return value.replace(tzinfo=datetime.timezone.utc) if value.tzinfo is None else value
+
+
+def split_by_day(start, end):
+    """
+    Split a time interval at UTC midnights.
+
+    Args:
+        start (datetime): The interval's start.
+        end (datetime): The interval's end.
+
+    Returns:
+        list: (day as "YYYY-MM-DD", seconds) for every day the interval touches.
+    """
+    start, end = _utc(start), _utc(end)
+    parts = []
+    while start < end:
+        midnight = datetime.datetime.combine(
+            start.date() + datetime.timedelta(days=1), datetime.time(), datetime.timezone.utc
+        )
+        part_end = min(end, midnight)
+        parts.append((start.date().isoformat(), (part_end - start).total_seconds()))
+        start = part_end
+    return parts
+
+
+def _open_id(owner, task):
+    return f"open:{owner}:{task}"
+
+
+def fold_events(events, running_since):
+    """
+    Turn timer events into the time worked per task and day.
+
+    A task accrues time from a "start" until the next "pause" or "stop". Intervals
+    still running after the last event are carried over in `running_since`.
+
+    Args:
+        events (list): Events with owner, task, type and at, in time order.
+        running_since (dict): (owner, task) -> start of the open interval; updated in place.
+
+    Returns:
+        dict: (owner, task, day) -> [seconds, intervals closed].
+    """
+    totals = {}
+    for event in events:
+        key = (event["owner"], event["task"])
+        if event["type"] == "start":
+            running_since.setdefault(key, event["at"])
+        elif running_since.get(key) is not None:
+            started = running_since.pop(key)
+            parts = split_by_day(started, event["at"])
+            for day, seconds in parts:
+                total = totals.setdefault(key + (day,), [0.0, 0])
+                total[0] += seconds
+            if parts:
+                totals[key + (parts[-1][0],)][1] += 1
+    return totals
+
+
+def compact_events(db, now=None, lag=30.0, batch_size=5000, lease=300.0):
+    """
+    Fold the events written since the last compaction into the daily aggregates.
+
+    Events are read in (at, _id) order after a watermark, so each one is folded
+    exactly once and the raw log is never modified. Only events older than `lag`
+    seconds are taken, which leaves time for buffered events from other workers to
+    land. A lease on the watermark document keeps concurrent workers from folding
+    the same events.
+
+    Args:
+        db (Database): The MongoDB database instance.
+        now (datetime, optional): The current time; defaults to now.
+        lag (float): Seconds an event must be old before it is compacted.
+        batch_size (int): Events read per round trip.
+        lease (float): Seconds the compaction may hold the lease.
+
+    Returns:
+        int: The number of events compacted, or None if another worker holds the lease or it failed.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    state = db[COMPACTION_COLLECTION]
+    try:
+        watermark = state.find_one_and_update(
+            {"_id": WATERMARK_ID, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"lease_until": now + datetime.timedelta(seconds=lease)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return None
+    token = watermark.get("token")
+    compacted = 0
+    try:
+        while True:
+            query = keyset_query({"at": {"$lt": now - datetime.timedelta(seconds=lag)}}, "at", ASCENDING, token)
+            events = list(db[EVENT_COLLECTION].find(query, sort=[("at", ASCENDING), ("_id", ASCENDING)],
+                                                    limit=batch_size))
+            if not events:
+                break
+            keys = {(event["owner"], event["task"]) for event in events}
+            running_since = {
+                (document["owner"], document["task"]): document["since"]
+                for document in state.find({"_id": {"$in": [_open_id(*key) for key in keys]}})
+            }
+            totals = fold_events(events, running_since)
+            operations = [
+                UpdateOne(
+                    {"_id": f"{owner}:{task}:{day}"},
+                    {"$inc": {"seconds": seconds, "intervals": intervals},
+                     "$setOnInsert": {"owner": owner, "task": task, "day": day}},
+                    upsert=True,
+                )
+                for (owner, task, day), (seconds, intervals) in totals.items()
+            ]
+            if operations:
+                db[DAILY_COLLECTION].bulk_write(operations, ordered=False)
+            carried = [
+                UpdateOne({"_id": _open_id(*key)}, {"$set": {"owner": key[0], "task": key[1], "since": since}},
+                          upsert=True)
+                if key in running_since else DeleteOne({"_id": _open_id(*key)})
+                for key, since in ((key, running_since.get(key)) for key in keys)
+            ]
+            state.bulk_write(carried, ordered=False)
+            last = events[-1]
+            token = encode_resume_token(last["at"], last["_id"])
+            state.update_one({"_id": WATERMARK_ID}, {"$set": {"token": token}})
+            compacted += len(events)
+            if len(events) < batch_size:
+                break
+        if compacted:
+            logger.info(f"Compacted {compacted} time events.")
+        return compacted
+    except Exception as e:
+        logger.error(f"Failed to compact time events: {e}")
+        return None
+    finally:
+        state.update_one({"_id": WATERMARK_ID}, {"$set": {"lease_until": None}})
+
+
+class TimeEventLog:
+    """
+    Buffers timer events and writes them to the event log in bulk.
+
+    Request threads only append to an in-memory buffer. A daemon thread writes the
+    buffer with one insert_many every `flush_interval` seconds (sooner once
+    `batch_size` events are waiting) and runs compact_events() every
+    `compact_interval` seconds. Events still buffered at exit are flushed.
+    """
+
+    def __init__(self, flush_interval=2.0, batch_size=500, compact_interval=60.0, compaction_lag=30.0,
+                 max_buffered=50_000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.compact_interval = compact_interval
+        self.compaction_lag = compaction_lag
+        self.max_buffered = max_buffered
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_compaction = 0.0
+
+    def start(self):
+        """
+        Start the writer thread for the current process if it is not running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Events buffered before a fork belong to the parent
+                self._buffer = []
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="time-event-log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the writer thread after flushing the buffer.
+        """
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+    def append(self, events):
+        """
+        Queue events for the next bulk write.
+
+        Args:
+            events (list): Event documents (owner, task, type, at).
+        """
+        self.start()
+        with self._buffer_lock:
+            room = self.max_buffered - len(self._buffer)
+            if room < len(events):
+                logger.error(f"Time event buffer full; dropped {len(events) - max(room, 0)} events.")
+            self._buffer.extend(events[:max(room, 0)])
+            waiting = len(self._buffer)
+        if waiting >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Write the buffered events now.
+
+        Returns:
+            int: The number of events written.
+        """
+        with self._buffer_lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return 0
+        results = CustomORM().insert_many(EVENT_COLLECTION, events, batch_size=self.batch_size, ordered=False)
+        retry = []
+        for result in results:
+            batch = events[result.offset:result.offset + result.size]
+            if result.inserted + len(result.errors) < result.size:
+                # The whole batch failed (e.g. the database is down)
+                retry.extend(batch)
+            else:
+                # A duplicate _id means an earlier attempt already wrote the event
+                retry.extend(events[error["index"]] for error in result.errors if error.get("code") != 11000)
+        if retry:
+            with self._buffer_lock:
+                self._buffer = retry[:max(self.max_buffered - len(self._buffer), 0)] + self._buffer
+            logger.warning(f"{len(retry)} time events not written; they will be retried.")
+        return len(events) - len(retry)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            if time.monotonic() - self._last_compaction >= self.compact_interval:
+                self._last_compaction = time.monotonic()
+                orm = CustomORM()
+                if orm.connection_health:
+                    compact_events(orm.db, lag=self.compaction_lag)
+
+
+_event_log = None
+_event_log_lock = threading.Lock()
+
+
+def get_time_event_log():
+    """
+    Return the process-wide TimeEventLog, configured from the environment.
+
+    Returns:
+        TimeEventLog: The shared event log.
+    """
+    global _event_log
+    if _event_log is None:
+        with _event_log_lock:
+            if _event_log is None:
+                _event_log = TimeEventLog(
+                    flush_interval=float(os.getenv("TIME_EVENT_FLUSH_INTERVAL_S", "2")),
+                    batch_size=int(os.getenv("TIME_EVENT_BATCH_SIZE", "500")),
+                    compact_interval=float(os.getenv("TIME_COMPACTION_INTERVAL_S", "60")),
+                    compaction_lag=float(os.getenv("TIME_COMPACTION_LAG_S", "30")),
+                )
+                atexit.register(_event_log.stop)
+    return _event_log
+
+
+class TimeTracker:
+    """
+    One user's timer and timesheets.
+
+    A user has at most one timer, running or paused. Starting another task stops
+    the current one. Every transition is appended to the event log, and all
+    reporting reads the compacted daily aggregates plus the one open timer, so it
+    costs the same however many events have been recorded. Closed intervals show
+    up in the aggregates after the next compaction (about a minute).
+
+    Attributes:
+        orm (CustomORM): The ORM used for reads.
+        owner (str): The user whose time is tracked.
+        log (TimeEventLog): Where events are written.
+    """
+
+    def __init__(self, owner, orm=None, log=None):
+        self.owner = owner
+        self.orm = orm or CustomORM()
+        self.log = log or get_time_event_log()
+
+    def _event(self, task, event_type, at):
+        return {"_id": ObjectId(), "owner": self.owner, "task": task, "type": event_type, "at": at}
+
+    def timer(self):
+        """
+        Returns:
+            dict: The user's timer (task, state "running" or "paused", since), or None.
+        """
+        return self.orm.db[TIMER_COLLECTION].find_one({"_id": self.owner})
+
+    def start(self, task_id):
+        """
+        Start (or resume) the timer on a task, stopping the timer of any other task.
+
+        Returns:
+            bool: True if the timer is running on the task, False otherwise.
+        """
+        task_id = ObjectId(task_id)
+        if self.orm.find_one(TASK_COLLECTION, {"_id": task_id, "owner": self.owner}) is None:
+            logger.warning(f"Cannot start a timer on unknown task {task_id}.")
+            return False
+        now = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            previous = self.orm.db[TIMER_COLLECTION].find_one_and_update(
+                {"_id": self.owner},
+                {"$set": {"task": task_id, "state": "running", "since": now}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+        except Exception as e:
+            logger.error(f"Failed to start the timer: {e}")
+            return False
+        events = []
+        if previous is not None and previous["task"] != task_id:
+            events.append(self._event(previous["task"], "stop", now))
+        if previous is None or previous["task"] != task_id or previous["state"] != "running":
+            events.append(self._event(task_id, "start", now))
+        self.log.append(events)
+        return True
+
+    def pause(self):
+        """
+        Returns:
+            bool: True if a running timer was paused, False otherwise.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            previous = self.orm.db[TIMER_COLLECTION].find_one_and_update(
+                {"_id": self.owner, "state": "running"}, {"$set": {"state": "paused", "since": now}}
+            )
+        except Exception as e:
+            logger.error(f"Failed to pause the timer: {e}")
+            return False
+        if previous is None:
+            return False
+        self.log.append([self._event(previous["task"], "pause", now)])
+        return True
+
+    def stop(self):
+        """
+        Returns:
+            bool: True if a timer was stopped, False otherwise.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            previous = self.orm.db[TIMER_COLLECTION].find_one_and_delete({"_id": self.owner})
+        except Exception as e:
+            logger.error(f"Failed to stop the timer: {e}")
+            return False
+        if previous is None:
+            return False
+        self.log.append([self._event(previous["task"], "stop", now)])
+        return True
+
+    def daily_totals(self, first_day, last_day):
+        """
+        Seconds worked per task and day, read from the aggregates.
+
+        The running timer's time so far is included.
+
+        Args:
+            first_day (str): "YYYY-MM-DD", inclusive.
+            last_day (str): "YYYY-MM-DD", inclusive.
+
+        Returns:
+            dict: (task _id, day) -> seconds, or None if the aggregates could not be read.
+        """
+        documents = self.orm.find_many(
+            DAILY_COLLECTION, {"owner": self.owner, "day": {"$gte": first_day, "$lte": last_day}},
+            projection={"task": 1, "day": 1, "seconds": 1},
+        )
+        if documents is None:
+            return None
+        totals = {}
+        for document in documents:
+            key = (document["task"], document["day"])
+            totals[key] = totals.get(key, 0) + document["seconds"]
+        timer = self.timer()
+        if timer is not None and timer["state"] == "running":
+            for day, seconds in split_by_day(timer["since"], datetime.datetime.now(datetime.timezone.utc)):
+                if first_day <= day <= last_day:
+                    totals[(timer["task"], day)] = totals.get((timer["task"], day), 0) + seconds
+        return totals
+
+    def week(self, day=None):
+        """
+        Time worked in the ISO week (Monday to Sunday) containing `day`.
+
+        Args:
+            day (date, optional): Defaults to today (UTC).
+
+        Returns:
+            dict: {"days": the week's 7 days, "totals": (task _id, day) -> seconds}, or None on failure.
+        """
+        day = day or datetime.datetime.now(datetime.timezone.utc).date()
+        monday = datetime.date.fromisoformat(period_start(day, "week"))
+        days = [(monday + datetime.timedelta(days=offset)).isoformat() for offset in range(7)]
+        totals = self.daily_totals(days[0], days[-1])
+        if totals is None:
+            return None
+        return {"days": days, "totals": totals}
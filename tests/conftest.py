@@ -0,0 +1,27 @@
+"""
+Shared fixtures: an in-memory MongoDB (mongomock) and Redis (fakeredis) installed
+as the process-wide clients of modules.connections.
+"""
+import os
+
+import pytest
+
+from modules import connections
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(connections, "_redis_client", client)
+    return client
+
+
+@pytest.fixture
+def database(monkeypatch, redis_client):
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr(connections, "_mongo_client", mongomock.MongoClient())
+    monkeypatch.setattr(connections, "_mongo_pid", os.getpid())
+    from modules.health import get_health_monitor
+    get_health_monitor().check_now()
+    return connections.get_database()
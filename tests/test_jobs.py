@@ -0,0 +1,68 @@
+"""
+Round trip of the background job queue: enqueue, run on a worker, retry, dead-letter.
+"""
+import json
+import runpy
+import sys
+
+from modules import jobs
+
+calls = []
+
+
+@jobs.job(queue="tests", max_attempts=2, backoff=0)
+def record_job(value):
+    if value == "fail":
+        raise ValueError("failed on purpose")
+    calls.append(value)
+
+
+def test_worker_runs_an_enqueued_job(redis_client):
+    calls.clear()
+    assert record_job.delay("hello")
+    worker = jobs.JobWorker({"tests": 1}, client=redis_client, poll_timeout=0.1)
+
+    assert worker.run_once("tests") == "succeeded"
+    assert calls == ["hello"]
+    assert worker.run_once("tests") is None
+    assert jobs.queue_stats(["tests"], redis_client)["tests"] == {"ready": 0, "delayed": 0, "running": 0, "dead": 0}
+
+
+def test_failed_job_is_retried_then_dead_lettered(redis_client):
+    assert record_job.delay("fail")
+    worker = jobs.JobWorker({"tests": 1}, client=redis_client, poll_timeout=0.1)
+
+    assert worker.run_once("tests") == "retried"
+    assert worker.promote_delayed() == 1
+    assert worker.run_once("tests") == "dead"
+    dead = json.loads(redis_client.lindex(jobs._key("dead", "tests"), 0))
+    assert dead["attempt"] == 2 and dead["error"].startswith("ValueError")
+
+
+def test_cluster_limit_blocks_extra_runs(redis_client):
+    assert record_job.delay("limited")
+    worker = jobs.JobWorker({"tests": 1}, limits={"tests": 1}, client=redis_client, poll_timeout=0.1)
+    redis_client.zadd(jobs._key("running", "tests"), {"other-worker": 9e12})
+
+    assert worker.run_once("tests") == "busy"
+    redis_client.delete(jobs._key("running", "tests"))
+    assert worker.run_once("tests") == "succeeded"
+
+
+def test_module_worker_runs_registered_jobs(database, monkeypatch):
+    # `python -m modules.jobs worker` runs the file as __main__; jobs registered by the
+    # JOB_MODULES must still be found by the worker it starts
+    from modules.indexes import ensure_indexes_job
+
+    assert ensure_indexes_job.delay()
+    outcomes = []
+
+    def run(worker):
+        outcomes.append(worker.run_once(ensure_indexes_job.spec.queue))
+
+    monkeypatch.setattr(jobs.JobWorker, "run", run)
+    monkeypatch.setattr(sys, "argv", ["modules.jobs", "worker", "--queue", "indexes=1", "--metrics-port", "0"])
+    runpy.run_module("modules.jobs", run_name="__main__")
+
+    assert outcomes == ["succeeded"]
+    assert "date_id" in database["mood_journal"].index_information()
@@ -0,0 +1,83 @@
+"""
+Startup profile of the application factory.
+
+Builds the app in a fresh interpreter with -X importtime while every socket connect
+fails, and checks that boot neither connects anywhere nor exceeds STARTUP_BUDGET_S
+(default 10) seconds. Run with `pytest -s tests/test_startup.py` to print the
+slowest imports.
+"""
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_BUDGET_S = float(os.getenv("STARTUP_BUDGET_S", 10))
+
+PROFILE = """
+import json, socket, sys, threading, time
+
+attempts = []
+
+def connect(self, address):
+    # Background services connect from their own threads; only boot itself must stay offline
+    if threading.current_thread() is threading.main_thread():
+        attempts.append(str(address))
+    raise OSError("network disabled during the startup test")
+
+socket.socket.connect = connect
+
+started = time.perf_counter()
+import modules.main
+imported = time.perf_counter()
+dash_loaded_on_import = "dash" in sys.modules
+modules.main.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "create_app_s": created - imported,
+    "dash_loaded_on_import": dash_loaded_on_import,
+    "connections": attempts,
+}))
+"""
+
+
+def slowest_imports(importtime_output, count=15):
+    """
+    Returns:
+        list: (cumulative microseconds, module) of the slowest imports in -X importtime output.
+    """
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def test_startup_is_lazy_and_fast(tmp_path):
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT,
+        "REDIS_HOST": "192.0.2.1",
+        "MONGO_HOST": "192.0.2.1",
+        "LOG_LEVEL": "WARNING",
+    }
+    for name in ("LOKI_URL", "PROMETHEUS_MULTIPROC_DIR", "JOB_QUEUE_ENABLED"):
+        env.pop(name, None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print(f"\nimport modules.main: {profile['import_s'] * 1000:.0f} ms, "
+          f"create_app(): {profile['create_app_s'] * 1000:.0f} ms")
+    for cumulative, module in slowest_imports(result.stderr):
+        print(f"{cumulative / 1000:10.1f} ms  {module}")
+
+    assert profile["connections"] == []
+    assert not profile["dash_loaded_on_import"]
+    assert profile["import_s"] + profile["create_app_s"] < STARTUP_BUDGET_S
@@ -0,0 +1,494 @@
+"""
+Benchmark suite for the ORM, the mood journal callback and the HTTP endpoints.
+
+    python tools/benchmark.py                                   # orm + render on mongomock
+    python tools/benchmark.py --suite http --url http://localhost:8000 --username admin --password ...
+    python tools/benchmark.py --compare benchmark-abc1234.json  # flag regressions against an earlier run
+
+Suites:
+    orm     CustomORM CRUD throughput and latency per operation.
+    render  refresh_mood_journal and the mood trends charts through Dash's
+            /_dash-update-component, in process, with 100 / 10k / 100k journal entries
+            (--rows). Reports latency and payload size.
+    http    End-to-end load on GET /login and the mood journal callback of a running server.
+    tasks   In-memory task dependency graph and scheduler operations on a synthetic DAG (--tasks).
+    time    Time event compaction throughput, and the week's timesheet read after
+            1k / 10k raw events (--events).
+    credentials
+            Login password checks per scrypt cost (--scrypt-n), one at a time and
+            from 8 concurrent logins through the verification pool.
+    login   A storm of concurrent failed logins against the login rate limiter: latency,
+            and how many attempts got past the limit, compared with the former
+            GET/INCR/EXPIRE counter. Uses fakeredis unless --redis-url is given.
+
+The orm, render and time suites use an in-memory mongomock database unless --mongo-uri is
+given. Point --mongo-uri only at a scratch mongod: the suites drop and refill the
+collections they use, including mood_journal and the time tracking collections.
+
+Results are written as JSON (--output, default benchmark-<commit>.json) so runs from
+different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from tools.loadtest import percentile, run_load  # noqa: E402
+
+# Metrics where a larger value is better; for every other metric smaller is better
+HIGHER_IS_BETTER = {"ops_per_s", "rps", "events_per_s"}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(latencies, elapsed, **extra):
+    """
+    Summarize per-call latencies (seconds) measured over `elapsed` seconds.
+    """
+    latencies = sorted(latencies)
+    return {
+        "ops": len(latencies),
+        "ops_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        **extra,
+    }
+
+
+def measure(function, iterations):
+    """
+    Call `function(i)` `iterations` times and summarize the latencies.
+    """
+    latencies = []
+    began = time.perf_counter()
+    for i in range(iterations):
+        started = time.perf_counter()
+        function(i)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies, time.perf_counter() - began)
+
+
+def use_database(mongo_uri=None):
+    """
+    Point modules.connections at mongomock (default) or at `mongo_uri`.
+    """
+    from modules import connections
+
+    if mongo_uri:
+        import pymongo
+        client = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=5_000)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock is not installed; run `pip install mongomock` or pass --mongo-uri.")
+        client = mongomock.MongoClient()
+    connections._mongo_client = client
+    connections._mongo_pid = os.getpid()
+    try:
+        import fakeredis
+        connections._redis_client = fakeredis.FakeRedis()
+    except ImportError:
+        pass
+
+    from modules.health import get_health_monitor
+    get_health_monitor().check_now()
+    return connections.get_database()
+
+
+def mood_documents(count, offset=0):
+    for i in range(offset, offset + count):
+        yield {
+            "date": f"{2000 + i // 365_000:04d}-{(i // 28) % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "mood": i % 10 + 1,
+            "notes": f"Benchmark entry {i}",
+        }
+
+
+def bench_orm(iterations):
+    """
+    Time each CustomORM CRUD operation on a scratch collection.
+    """
+    from modules.customORM import CustomORM
+
+    orm = CustomORM()
+    name = "benchmark_crud"
+    orm.drop_collection(name)
+    results = {}
+    results["insert_one"] = measure(
+        lambda i: orm.insert_one(name, {"key": i, "value": i % 100, "tags": ["a", "b"]}), iterations
+    )
+    results["insert_many"] = measure(
+        lambda i: orm.insert_many(name, [{"key": iterations + i * 100 + j, "value": j} for j in range(100)]),
+        max(iterations // 100, 1),
+    )
+    results["insert_many"]["docs_per_op"] = 100
+    results["find_one"] = measure(lambda i: orm.find_one(name, {"key": i}), iterations)
+    results["find_many"] = measure(lambda i: orm.find_many(name, {"value": i % 100}, limit=50), iterations)
+    results["find_page"] = measure(lambda i: orm.find_page(name, {}, limit=50), iterations)
+    results["count_documents"] = measure(lambda i: orm.count_documents(name, {"value": i % 100}), iterations)
+    results["update_one"] = measure(lambda i: orm.update_one(name, {"key": i}, {"$set": {"value": -i}}), iterations)
+    results["upsert_many"] = measure(
+        lambda i: orm.upsert_many(name, [{"key": i * 100 + j, "value": j} for j in range(100)], ["key"]),
+        max(iterations // 100, 1),
+    )
+    results["upsert_many"]["docs_per_op"] = 100
+    results["delete_one"] = measure(lambda i: orm.delete_one(name, {"key": i}), iterations)
+    orm.drop_collection(name)
+    return results
+
+
+def dash_update_payload(dependencies, output_id, trigger, states=None, output_property=None):
+    """
+    Build a /_dash-update-component request body for the callback that updates `output_id`.
+
+    Args:
+        dependencies (list): The JSON served at /_dash-dependencies.
+        output_id (str): A component id among the callback's outputs.
+        trigger (str): The input that fired, e.g. "refresh-button.n_clicks".
+        states (dict, optional): Values for inputs and states keyed by "id.property".
+        output_property (str, optional): Also match the output's property, for components
+            updated by several callbacks.
+
+    Returns:
+        dict: The request body.
+    """
+    states = states or {}
+    for dependency in dependencies:
+        output = dependency["output"]
+        specs = output.strip(".").split("...") if output.startswith("..") else [output]
+        outputs = [dict(zip(("id", "property"), spec.rsplit(".", 1))) for spec in specs]
+        if not any(spec["id"] == output_id and output_property in (None, spec["property"]) for spec in outputs):
+            continue
+
+        def value(item):
+            if item["id"].startswith("{"):
+                return []  # Wildcard (ALL) inputs with no matching components
+            return {**item, "value": states.get(f"{item['id']}.{item['property']}", 1)}
+
+        return {
+            "output": output,
+            "outputs": outputs if len(outputs) > 1 else outputs[0],
+            "inputs": [value(item) for item in dependency["inputs"]],
+            "state": [value(item) for item in dependency["state"]],
+            "changedPropIds": [trigger],
+        }
+    raise LookupError(f"No callback outputs {output_id!r}")
+
+
+MOOD_JOURNAL_STATES = {"mood-journal-page.data": {"tokens": [None], "page": 0, "next": None}}
+MOOD_ANALYTICS_STATES = {"mood-analytics-period.value": "day", "mood-analytics-range.value": "all"}
+
+
+def bench_render(row_counts, iterations):
+    """
+    Time refresh_mood_journal end to end (query, render, JSON) for journals of each size.
+    """
+    from modules.connections import get_database
+    from modules.main import create_app
+    from modules.mood_analytics import rebuild_rollups
+
+    client = create_app().test_client()
+    with client.session_transaction() as session:
+        session["username"] = "benchmark"
+    dependencies = client.get("/_dash-dependencies").get_json()
+    payload = dash_update_payload(dependencies, "mood-journal-table", "refresh-button.n_clicks", MOOD_JOURNAL_STATES)
+
+    results = {}
+    collection = get_database()["mood_journal"]
+    for rows in row_counts:
+        collection.drop()
+        for offset in range(0, rows, 10_000):
+            collection.insert_many(list(mood_documents(min(10_000, rows - offset), offset)))
+        sizes = []
+
+        def render(_):
+            response = client.post("/_dash-update-component", json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f"Callback failed with HTTP {response.status_code}: {response.data[:200]!r}")
+            sizes.append(len(response.data))
+
+        render(0)  # Warm up query plans and Dash's serializer
+        sizes.clear()
+        results[f"rows_{rows}"] = measure(render, iterations)
+        results[f"rows_{rows}"]["payload_bytes"] = max(sizes)
+
+        # Mood trends read the rollups; their cost should not grow with the journal
+        rebuild_rollups(get_database())
+        analytics_payload = dash_update_payload(
+            dependencies, "mood-analytics-trend", "mood-analytics-refresh.n_clicks", MOOD_ANALYTICS_STATES
+        )
+        results[f"analytics_rows_{rows}"] = measure(
+            lambda _: client.post("/_dash-update-component", json=analytics_payload), iterations
+        )
+    collection.drop()
+    return results
+
+
+def time_events(count, owner="benchmark", tasks=20, seed=0):
+    """
+    Yield `count` synthetic timer events for one user, a few minutes apart.
+    """
+    import random
+    from bson import ObjectId
+
+    rng = random.Random(seed)
+    task_ids = [ObjectId() for _ in range(tasks)]
+    at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for _ in range(count):
+        at += timedelta(minutes=rng.randint(1, 30))
+        yield {"_id": ObjectId(), "owner": owner, "task": rng.choice(task_ids),
+               "type": rng.choice(("start", "start", "pause", "stop")), "at": at}
+
+
+def bench_time(event_counts, iterations):
+    """
+    Time compacting the raw time events, then the week's timesheet, which reads only the aggregates.
+    """
+    from modules.connections import get_database
+    from modules.time_tracking import (
+        COMPACTION_COLLECTION, DAILY_COLLECTION, EVENT_COLLECTION, TimeTracker, compact_events,
+    )
+
+    db = get_database()
+    tracker = TimeTracker("benchmark")
+    results = {}
+    for count in event_counts:
+        for name in (EVENT_COLLECTION, DAILY_COLLECTION, COMPACTION_COLLECTION):
+            db[name].drop()
+        events = list(time_events(count))
+        for offset in range(0, count, 10_000):
+            db[EVENT_COLLECTION].insert_many(events[offset:offset + 10_000])
+        started = time.perf_counter()
+        compact_events(db, now=events[-1]["at"] + timedelta(hours=1), lag=0)
+        elapsed = time.perf_counter() - started
+        results[f"compact_events_{count}"] = {"ms": round(elapsed * 1000, 1),
+                                              "events_per_s": round(count / elapsed, 1)}
+        last_week = events[-1]["at"].date()
+        results[f"week_read_events_{count}"] = measure(lambda _: tracker.week(last_week), iterations)
+    for name in (EVENT_COLLECTION, DAILY_COLLECTION, COMPACTION_COLLECTION):
+        db[name].drop()
+    return results
+
+
+def bench_credentials(costs, iterations, concurrency=8):
+    """
+    Time the login password check for each scrypt cost, alone and under concurrent logins.
+    """
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from modules.credentials import CredentialStore, hash_password
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "credentials.json")
+        for n in costs:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"USER": {"username": "benchmark", "group": "1",
+                                    "password_hash": hash_password("secret", n=n)}}, f)
+            store = CredentialStore(path)
+            results[f"verify_n{n}"] = measure(lambda _: store.verify("benchmark", "secret"), iterations)
+            latencies = []
+
+            def login(_):
+                started = time.perf_counter()
+                store.verify("benchmark", "wrong")
+                latencies.append(time.perf_counter() - started)
+
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(login, range(iterations * concurrency)))
+            results[f"verify_n{n}_concurrent"] = summarize(latencies, time.perf_counter() - began,
+                                                           concurrency=concurrency)
+    return results
+
+
+def bench_login(concurrency, attempts, redis_url=None):
+    """
+    Fire `attempts` failed logins from each of `concurrency` threads at one IP and username.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from modules.connections import get_redis_client
+    from modules.rate_limit import LOGIN_IP_LIMIT, SlidingWindowLimiter, login_keys
+
+    if redis_url:
+        import redis
+        client = redis.Redis.from_url(redis_url)
+    else:
+        client = get_redis_client()
+    keys = login_keys("203.0.113.7", "benchmark")
+    limiter = SlidingWindowLimiter(client)
+    legacy_key = "login_attempts:203.0.113.7"
+
+    def legacy(_):
+        # The counter login() used before: read, compare, then increment in separate round trips
+        attempts_made = client.get(legacy_key)
+        if int(attempts_made or 0) >= LOGIN_IP_LIMIT:
+            return False
+        if client.incr(legacy_key) == 1:
+            client.expire(legacy_key, 3600)
+        return True
+
+    def sliding_window(_):
+        return limiter.hit(keys)[0]
+
+    results = {}
+    for name, attempt, allowed in (("legacy_counter", legacy, LOGIN_IP_LIMIT),
+                                   ("sliding_window", sliding_window, min(keys.values()))):
+        client.delete(legacy_key, *keys)
+        latencies, admitted = [], []
+
+        def timed(i):
+            started = time.perf_counter()
+            admitted.append(attempt(i))
+            latencies.append(time.perf_counter() - started)
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(concurrency * attempts)))
+        results[name] = summarize(latencies, time.perf_counter() - began, concurrency=concurrency,
+                                  admitted=sum(admitted), allowed=allowed)
+    client.delete(legacy_key, *keys)
+    return results
+
+
+def bench_http(url, username, password, concurrency, duration):
+    """
+    Load a running server: the login page, then the mood journal callback as a logged-in user.
+    """
+    import requests
+
+    url = url.rstrip("/")
+    results = {"login_page": run_load(f"{url}/login", concurrency, duration)}
+    if not username:
+        return results
+
+    session = requests.Session()
+    response = session.post(f"{url}/login", data={"username": username, "password": password},
+                            allow_redirects=False)
+    if response.status_code != 302:
+        raise RuntimeError("Login failed; check --username and --password.")
+    payload = dash_update_payload(
+        session.get(f"{url}/_dash-dependencies").json(), "mood-journal-table", "refresh-button.n_clicks",
+        MOOD_JOURNAL_STATES,
+    )
+    results["dash_update_mood_journal"] = run_load(
+        f"{url}/_dash-update-component", concurrency, duration, method="POST", body=payload,
+        cookies=session.cookies.get_dict(),
+    )
+    return results
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(baseline, current, threshold):
+    """
+    Print every metric that changed by more than `threshold` (a fraction) and
+    return the number of regressions.
+    """
+    before = dict(flatten(baseline["results"]))
+    regressions = 0
+    print(f"Comparing {baseline.get('commit')} -> {current.get('commit')}")
+    for name, value in flatten(current["results"]):
+        old = before.get(name)
+        metric = name.rsplit(".", 1)[-1]
+        if not old or metric in ("ops", "requests", "concurrency", "admitted", "allowed", "duration_s", "docs_per_op", "tasks", "edges"):
+            continue
+        change = (value - old) / old
+        worse = change < -threshold if metric in HIGHER_IS_BETTER else change > threshold
+        if abs(change) > threshold:
+            regressions += worse
+            print(f"  {'REGRESSION' if worse else 'improved  '} {name}: {old} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks.")
+    parser.add_argument("--suite", nargs="+", choices=("orm", "render", "http", "tasks", "time", "credentials", "login"),
+                        default=["orm", "render", "tasks", "time"])
+    parser.add_argument("--mongo-uri", help="Scratch mongod to use instead of mongomock.")
+    parser.add_argument("--iterations", type=int, default=1000, help="Calls per ORM operation.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--render-iterations", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=20_000, help="Tasks in the synthetic dependency graph.")
+    parser.add_argument("--events", type=int, nargs="+", default=[1_000, 10_000],
+                        help="Raw time events compacted before reading the timesheet.")
+    parser.add_argument("--scrypt-n", type=int, nargs="+", default=[2 ** 13, 2 ** 14, 2 ** 15],
+                        help="scrypt costs timed by the credentials suite.")
+    parser.add_argument("--redis-url", help="Redis for the login suite instead of fakeredis.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output", help="Result file (default benchmark-<commit>.json).")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change reported (default 0.2).")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "database": "mongod" if args.mongo_uri else "mongomock",
+        "results": {},
+    }
+    if {"orm", "render", "time"} & set(args.suite):
+        use_database(args.mongo_uri)
+    if "orm" in args.suite:
+        report["results"]["orm"] = bench_orm(args.iterations)
+    if "render" in args.suite:
+        report["results"]["render"] = bench_render(args.rows, args.render_iterations)
+    if "tasks" in args.suite:
+        from modules.tasks import task_graph_benchmark
+        report["results"]["tasks"] = task_graph_benchmark(args.tasks)
+    if "time" in args.suite:
+        report["results"]["time"] = bench_time(args.events, args.render_iterations * 10)
+    if "credentials" in args.suite:
+        report["results"]["credentials"] = bench_credentials(args.scrypt_n, args.render_iterations * 2)
+    if "login" in args.suite:
+        if not args.redis_url:
+            use_database(args.mongo_uri)
+        report["results"]["login"] = bench_login(args.concurrency, args.render_iterations * 10, args.redis_url)
+    if "http" in args.suite:
+        report["results"]["http"] = bench_http(args.url, args.username, args.password, args.concurrency,
+                                               args.duration)
+
+    output = args.output or f"benchmark-{report['commit']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if compare(json.load(f), report, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Minimal HTTP load generator.
+
+    python tools/loadtest.py http://localhost:8000/login --concurrency 32 --duration 30
+
+Each worker thread keeps one keep-alive session and sends requests back to back
+for the given duration. Prints throughput and latency percentiles; --json writes
+the same numbers to a file for comparison between runs.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import requests
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_load(url, concurrency=16, duration=10.0, method="GET", body=None, headers=None, cookies=None,
+             warmup=1.0):
+    """
+    Send requests to `url` from `concurrency` threads for `duration` seconds.
+
+    Args:
+        url (str): The target URL.
+        concurrency (int): Number of concurrent clients.
+        duration (float): Measured seconds, after `warmup` seconds that are not recorded.
+        method (str): HTTP method.
+        body (dict | str, optional): JSON body (dict) or form/raw body (str).
+        headers (dict, optional): Extra request headers.
+        cookies (dict, optional): Cookies, e.g. a logged-in session.
+
+    Returns:
+        dict: requests, errors, rps and latency percentiles in milliseconds.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    start_at = time.monotonic() + warmup
+    stop_at = start_at + duration
+
+    def worker():
+        session = requests.Session()
+        if cookies:
+            session.cookies.update(cookies)
+        local, local_errors = [], 0
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            began = time.perf_counter()
+            try:
+                if isinstance(body, dict):
+                    response = session.request(method, url, json=body, headers=headers, timeout=30)
+                else:
+                    response = session.request(method, url, data=body, headers=headers, timeout=30)
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - began
+            if now >= start_at:
+                local.append(elapsed)
+                local_errors += failed
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "url": url,
+        "method": method,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / duration, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send concurrent HTTP requests and report throughput.")
+    parser.add_argument("url")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--json-body", help="JSON request body.")
+    parser.add_argument("--data", help="Raw/form request body.")
+    parser.add_argument("--cookie", action="append", default=[], metavar="NAME=VALUE")
+    parser.add_argument("--json", dest="json_path", help="Also write the result to this file.")
+    args = parser.parse_args(argv)
+
+    body = json.loads(args.json_body) if args.json_body else args.data
+    cookies = dict(cookie.split("=", 1) for cookie in args.cookie)
+    result = run_load(args.url, args.concurrency, args.duration, args.method.upper(), body, cookies=cookies)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-from modules.main import server as application
+from modules.main import create_app
+
+application = create_app()
 
 if __name__ == "__main__":
     application.run(host='0.0.0.0', port=8000, debug=True)
-    
\ No newline at end of file